@@ -0,0 +1,62 @@
+"""
+Times `butterfly_parser.parse` on a generated module with many definitions and
+calls, of which only a few carry directives.
+
+    python benchmarks/directive_parser.py [number of classes]
+"""
+import sys
+import time
+
+import ast_comments
+
+from wildered.ast import ASTSourceCode
+from wildered.context.directives import butterfly_parser
+
+CLASS_TEMPLATE = '''
+class Model{i}(Base):
+    field = compute(1, 2, key=value({i}))
+
+    @property
+    def name(self) -> str:
+        return self.format(self.prefix, str({i})).strip()
+
+    def update(self, other):
+        for item in other.items():
+            self.items.append(transform(item, scale=factor({i})))
+        return merge(self, other)
+'''
+
+DIRECTIVE_TEMPLATE = '''
+@wildered.autocomplete(requirement="Complete this function")
+def generated_{i}(value: int) -> int:
+    pass
+'''
+
+
+def generate_module(n_classes: int) -> str:
+    parts = ["import wildered\n"]
+    for i in range(n_classes):
+        parts.append(CLASS_TEMPLATE.format(i=i))
+        if i % 100 == 0:
+            parts.append(DIRECTIVE_TEMPLATE.format(i=i))
+
+    return "".join(parts)
+
+
+def main(n_classes: int = 2000, repeat: int = 5) -> None:
+    content = generate_module(n_classes)
+    timings = []
+    for _ in range(repeat):
+        source = ASTSourceCode(node=ast_comments.parse(content), filename="generated.py")
+        start = time.perf_counter()
+        entity_list = butterfly_parser.parse(source=source, drop_directive=True)
+        timings.append(time.perf_counter() - start)
+
+    print(
+        f"{n_classes} classes, {len(content.splitlines())} lines, "
+        f"{len(entity_list)} directives: best of {repeat} {min(timings) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(i) for i in sys.argv[1:]])
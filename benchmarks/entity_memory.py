@@ -0,0 +1,58 @@
+"""
+Measures the memory held by the entities, task groups and directives created for
+a generated module in which every function carries a directive.
+
+    python benchmarks/entity_memory.py [number of functions]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+import ast_comments
+
+from wildered.ast import ASTSourceCode
+from wildered.context.directives import butterfly_parser
+from wildered.context.tasks import group_entities
+
+FUNCTION_TEMPLATE = '''
+@wildered.autocomplete(requirement="Complete this function", group="group_{group}")
+def generated_{i}(value: int) -> int:
+    pass
+'''
+
+
+def generate_module(n_functions: int) -> str:
+    parts = ["import wildered\n"]
+    for i in range(n_functions):
+        parts.append(FUNCTION_TEMPLATE.format(i=i, group=i // 10))
+
+    return "".join(parts)
+
+
+def main(n_functions: int = 2000) -> None:
+    source = ASTSourceCode(
+        node=ast_comments.parse(generate_module(n_functions)), filename="generated.py"
+    )
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+
+    entity_list = butterfly_parser.parse(source=source, drop_directive=True)
+    task_groups = group_entities(entity_list=entity_list)
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{len(entity_list)} entities in {len(task_groups)} task groups: "
+        f"{(after - before) / len(entity_list):.0f} bytes per entity, "
+        f"{elapsed * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(i) for i in sys.argv[1:]])
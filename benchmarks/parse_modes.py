@@ -0,0 +1,51 @@
+"""
+Times parsing every Python file of a corpus with `ast_comments.parse`, as files
+scanned for directives are, against the `ast.parse` used for dependency files that
+are only read from (`ASTSourceCode.read_only`).
+
+    python benchmarks/parse_modes.py [corpus directory]
+"""
+import ast
+import sys
+import time
+from pathlib import Path
+
+import ast_comments
+
+from wildered.utils import iter_python_files, read_file
+
+
+def time_parse(contents, parse, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            parse(content)
+
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main(root: str = ".", repeat: int = 5) -> None:
+    contents = []
+    for filename in iter_python_files(Path(root)):
+        try:
+            content = read_file(filename)
+            ast.parse(content)
+
+        except (SyntaxError, UnicodeDecodeError, ValueError):
+            continue
+
+        contents.append(content)
+
+    lines = sum(len(i.splitlines()) for i in contents)
+    print(f"{len(contents)} files, {lines} lines, best of {repeat}:")
+    full = time_parse(contents, ast_comments.parse, repeat=repeat)
+    plain = time_parse(contents, ast.parse, repeat=repeat)
+    print(f"  ast_comments.parse {full * 1000:.1f}ms")
+    print(f"  ast.parse          {plain * 1000:.1f}ms ({full / plain:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
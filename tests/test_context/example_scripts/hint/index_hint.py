@@ -0,0 +1,13 @@
+import wildered
+
+
+@wildered.hint([DummyClass2, "../basic_butterfly.py:DummyClass3"])
+@wildered.autocomplete(requirement="Please complete this function")
+def dummy_function_1(param1: int, param2: str) -> None:
+    """This is a dummy function.
+
+    Args:
+        param1 (int): The first parameter.
+        param2 (str): The second parameter.
+    """
+    # Implementation goes here
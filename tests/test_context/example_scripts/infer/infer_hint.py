@@ -0,0 +1,29 @@
+from typing import List
+
+import wildered
+
+from ..basic_butterfly import DummyClass1
+
+
+class Node:
+    def children(self) -> List["Node"]:
+        pass
+
+
+class Tree(Node):
+    pass
+
+
+def helper(node: Node) -> Tree:
+    return walk(node)
+
+
+def walk(node):
+    # Refers back to helper
+    return helper(node)
+
+
+@wildered.hint([], infer=True)
+@wildered.autocomplete(requirement="Please complete this function")
+def build(node: Node) -> DummyClass1:
+    helper(node).children()
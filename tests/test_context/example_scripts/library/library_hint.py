@@ -0,0 +1,10 @@
+from os import path
+
+import wildered
+from pydantic import BaseModel, fields
+
+
+@wildered.hint([BaseModel, path, fields, "pydantic.fields:Field"])
+@wildered.autocomplete(requirement="Please complete this class")
+class Config(BaseModel):
+    pass
@@ -1,6 +1,16 @@
-import pytest
+import gc
+import tempfile
+from pathlib import Path
 
-from wildered.ast import ASTSourceCode
+from wildered.ast import ASTSourceCode, source_registry
+from wildered.context.commands.scan import _get_task_groups
+from wildered.context.dependency import CodeDependency, DependencySet
+from wildered.context.inference import (
+    _reference_graphs,
+    get_reference_graph,
+    infer_dependencies,
+)
+from wildered.index import SymbolIndex, use_symbol_index
 from wildered.utils import write_file
 
 from .utils import get_task_group_from_file
@@ -46,4 +56,193 @@ def test_non_relative_import():
     assert len(task_group) == 1
     dependencies = task_group[0].task_list[0].dependencies
     assert len(dependencies) == 1
-    assert str(dependencies[0].filepath).endswith("aggregate_hint.py")
\ No newline at end of file
+    assert str(dependencies[0].filepath).endswith("aggregate_hint.py")
+
+def test_shared_source_code():
+    source = ASTSourceCode.from_file(
+        "tests/test_context/example_scripts/hint/aggregate_hint.py"
+    )
+    with source_registry.scope() as registry:
+        task_group = _get_task_groups(source=source, registry=registry)
+        first, second = [i.dependencies for i in task_group[0].task_list]
+        # Same file is only parsed once
+        assert first[0].source_code is second[0].source_code
+        assert first[0].source_code is registry.get(first[0].filepath)
+
+        expression_source = registry.get(
+            "tests/test_context/example_scripts/hint/expression_hint.py"
+        )
+        dependencies = _get_task_groups(source=expression_source, registry=registry)[
+            0
+        ].task_list[0].dependencies
+        # Hint resolved to the scanned file itself
+        assert dependencies[1].source_code is expression_source
+
+        with tempfile.TemporaryDirectory() as f:
+            filename = Path(f) / "relative_hint.py"
+            first[0].source_code.save(filename)
+            registry.get(filename)
+            expression_source.save(filename)
+            assert filename not in registry
+
+    assert first[0].filepath not in registry
+
+
+def test_index_hint(tmp_path):
+    filename = "tests/test_context/example_scripts/hint/index_hint.py"
+    # Without an index, unknown names fall back to the current file
+    dependencies = get_task_group_from_file(filename)[0].task_list[0].dependencies
+    assert len(dependencies) == 2
+    assert str(dependencies[0].filepath).endswith("index_hint.py")
+
+    with SymbolIndex(tmp_path / "index.sqlite") as index:
+        index.build("tests/test_context/example_scripts")
+        use_symbol_index(index)
+        try:
+            dependencies = get_task_group_from_file(filename)[0].task_list[0].dependencies
+
+        finally:
+            use_symbol_index(None)
+
+    # DummyClass3 does not exist, so the string hint is dropped
+    assert len(dependencies) == 1
+    assert str(dependencies[0].filepath).endswith("basic_butterfly.py")
+    assert "class DummyClass2" in dependencies[0].resolve()
+
+
+def test_index_hint_prefers_local(tmp_path):
+    write_file(tmp_path / "other.py", "def helper():\n    return 1\n")
+    write_file(tmp_path / "main.py", "def main():\n    pass\n")
+    with SymbolIndex(tmp_path / "index.sqlite") as index:
+        index.build(tmp_path)
+        # Defined locally after the index was built
+        write_file(
+            tmp_path / "main.py",
+            "import wildered\n\n\n"
+            "def helper():\n    return 2\n\n\n"
+            "@wildered.hint([helper])\n"
+            "@wildered.autocomplete(requirement='Complete')\n"
+            "def main():\n    pass\n",
+        )
+        use_symbol_index(index)
+        try:
+            task_group = get_task_group_from_file(tmp_path / "main.py")
+            dependencies = task_group[0].task_list[0].dependencies
+
+        finally:
+            use_symbol_index(None)
+
+    assert len(dependencies) == 1
+    assert dependencies[0].filepath.name == "main.py"
+
+
+def test_dependency_set():
+    basic = "tests/test_context/example_scripts/basic_butterfly.py"
+    relative = "tests/test_context/example_scripts/hint/relative_hint.py"
+    task_group = get_task_group_from_file(
+        "tests/test_context/example_scripts/hint/aggregate_hint.py"
+    )
+    first, second = [i.dependencies for i in task_group[0].task_list]
+    # Hashable, and equal across tasks
+    assert set(first) == set(second)
+    assert len(DependencySet(first + second)) == 2
+
+    with source_registry.scope() as registry:
+
+        def dependency(
+            filepath: str, entity_name: str = "", skeleton: bool = False
+        ) -> CodeDependency:
+            return CodeDependency(
+                filepath=filepath,
+                entity_name=entity_name,
+                source_code=registry.get(filepath),
+                skeleton=skeleton,
+            )
+
+        dependencies = DependencySet(
+            [
+                dependency(basic, "method_2"),
+                dependency(basic, "DummyClass1"),
+                dependency(relative, "dummy_function_2"),
+            ]
+        )
+        dependencies.update([dependency(basic, "DummyClass2"), dependency(relative)])
+        # Covered by the class and the module respectively
+        assert [i.qualname for i in dependencies] == ["DummyClass1", "DummyClass2", ""]
+
+        rendered = dependencies.render()
+        assert len(rendered) == 2
+        # Imports once, then the entities in the order of the file
+        assert rendered[0].count("import hello") == 1
+        assert rendered[0].index("class DummyClass1") < rendered[0].index("class DummyClass2")
+        assert rendered[1] == registry.get(relative).unparse(source_slice=True)
+
+        # Whole modules default to their skeleton, which covers no full entity
+        skeleton = CodeDependency(filepath=relative, source_code=registry.get(relative))
+        assert skeleton.skeleton
+        dependencies = DependencySet(
+            [skeleton, dependency(relative, "dummy_function_2")]
+        )
+        assert [i.qualname for i in dependencies] == ["", "dummy_function_2"]
+        # The full code replaces the skeleton of the same entity
+        dependencies.add(dependency(relative, skeleton=False))
+        assert [i.qualname for i in dependencies] == [""]
+        assert not list(dependencies)[0].skeleton
+
+
+def test_infer_hint():
+    filename = "tests/test_context/example_scripts/infer/infer_hint.py"
+    dependencies = get_task_group_from_file(filename)[0].task_list[0].dependencies
+    assert [i.entity_name for i in dependencies] == [
+        "Node",
+        "DummyClass1",
+        "helper",
+        # Two references away, while the cycle back to helper ends the search
+        "Tree",
+        "walk",
+    ]
+    assert str(dependencies[1].filepath).endswith("basic_butterfly.py")
+
+    source = ASTSourceCode.from_file(filename)
+    with source_registry.scope() as registry:
+        registry.register(source)
+        build = source.symbols.get_function("build")
+        inferred = infer_dependencies(build, source=source, registry=registry, depth=1)
+        assert [i.entity_name for i in inferred] == [
+            "Node",
+            "DummyClass1",
+            "helper",
+        ]
+        assert len(infer_dependencies(build, source, registry, depth=5, limit=3)) == 3
+
+
+def test_library_hint():
+    dependencies = get_task_group_from_file(
+        "tests/test_context/example_scripts/library/library_hint.py"
+    )[0].task_list[0].dependencies
+    # `os.path` is assigned at runtime and cannot be found, so it is left out
+    assert [(i.module, i.entity_name) for i in dependencies] == [
+        ("pydantic", "BaseModel"),
+        ("pydantic.fields", ""),
+        ("pydantic.fields", "Field"),
+    ]
+    # A submodule is included as the stub of the whole module
+    stub = dependencies[1].resolve()
+    assert stub.startswith("# From pydantic.fields\n")
+    assert "class FieldInfo(" in stub
+    assert "class BaseModel(" in dependencies[0].resolve()
+    assert dependencies[2].resolve().startswith("# From pydantic.fields\ndef Field(")
+
+
+def test_reference_graph_lifetime():
+    # The shared registry keeps its graph for the lifetime of the process
+    shared = len(_reference_graphs)
+    registry = source_registry.spawn()
+    graph = get_reference_graph(registry)
+    assert get_reference_graph(registry) is graph
+    assert len(_reference_graphs) == shared + 1
+
+    # The graph does not keep its registry alive
+    del registry
+    gc.collect()
+    assert len(_reference_graphs) == shared
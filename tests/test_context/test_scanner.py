@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from wildered.cache import get_parse_cache, get_skeleton_cache
+from wildered.context.commands import scan as scan_command
+from wildered.context.scanner import collect_files, scan_files
+from wildered.index import get_symbol_index
+
+EXAMPLE_DIR = "tests/test_context/example_scripts"
+
+
+def get_task_names(task_groups):
+    return [
+        (task.source.filename.name, task.node.qualname)
+        for group in task_groups
+        for task in group.task_list
+    ]
+
+
+def test_collect_files():
+    files = collect_files(
+        [f"{EXAMPLE_DIR}/hint", f"{EXAMPLE_DIR}/*_butterfly.py", f"{EXAMPLE_DIR}/hint/relative_hint.py"]
+    )
+    assert [i.name for i in files] == [
+        "aggregate_hint.py",
+        "expression_hint.py",
+        "index_hint.py",
+        "non_relative_import.py",
+        "relative_hint.py",
+        "basic_butterfly.py",
+        "method_butterfly.py",
+        "without_butterfly.py",
+    ]
+
+
+def test_parallel_scan():
+    files = collect_files([f"{EXAMPLE_DIR}/hint", f"{EXAMPLE_DIR}/basic_butterfly.py"])
+    serial = scan_files(files, workers=1, cache=False)
+    parallel = scan_files(files, workers=2, cache=False)
+    assert len(serial) == 8
+    assert get_task_names(parallel) == get_task_names(serial)
+
+    # Dependencies on the same file share one object once merged
+    sources = {}
+    for group in parallel:
+        for task in group.task_list:
+            for dependency in task.dependencies:
+                path = Path(dependency.filepath).resolve()
+                assert sources.setdefault(path, dependency.source_code) is dependency.source_code
+
+
+def test_scan_teardown_on_error(tmp_path, monkeypatch):
+    script = Path(f"{EXAMPLE_DIR}/basic_butterfly.py").resolve()
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("The LLM is unavailable")
+
+    # The package exports the command under the name of its module
+    monkeypatch.setattr(sys.modules[scan_command.__module__], "task_executor", fail)
+    with pytest.raises(RuntimeError):
+        scan_command([str(script)], workers=1)
+
+    assert get_parse_cache() is None
+    assert get_skeleton_cache() is None
+    assert get_symbol_index() is None
@@ -1,8 +1,11 @@
+import shutil
+
 import pytest
 from pydantic import ValidationError
 
+from wildered.ast import ASTSourceCode
 from wildered.context.commands.scan import _get_task_groups
-from wildered.utils import write_file
+from wildered.utils import read_file, write_file
 
 from .utils import get_task_group_from_file
 
@@ -55,3 +58,31 @@ def test_butterfly_group():
     assert len(result) == 2
 
     write_file("dummy.txt", result[0].format_prompt())
+
+
+def test_group_integrate(tmp_path, monkeypatch):
+    filename = tmp_path / "butterfly_group.py"
+    shutil.copy("./tests/test_context/example_scripts/butterfly_group.py", filename)
+    group = [i for i in get_task_group_from_file(filename) if i.group_name == "foo_2"][0]
+
+    saved = []
+    save = ASTSourceCode.save
+
+    def counting_save(self, *args, **kwargs):
+        saved.append(self)
+        save(self, *args, **kwargs)
+
+    monkeypatch.setattr(ASTSourceCode, "save", counting_save)
+    group.integrate(
+        "import numpy\n\n"
+        "class DummyClass1:\n    pass\n\n"
+        "class DummyClass2:\n    def __init__(self, param: str) -> None:\n        self.param = param\n"
+    )
+    assert len(saved) == 1
+
+    # Definitions are routed by qualified name
+    content = read_file(filename)
+    assert content.startswith("import numpy\n")
+    assert "class DummyClass1:\n    pass\n" in content
+    assert "        self.param = param\n" in content
+    assert "wildered.autocomplete(group=\"foo_2\")" not in content
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+from wildered.context.watch import Watcher
+from wildered.index import SymbolIndex, use_symbol_index
+from wildered.utils import read_file, write_file
+
+
+def test_watch_refresh(tmp_path):
+    shutil.copy("tests/test_context/example_scripts/basic_butterfly.py", tmp_path)
+    (tmp_path / "hint").mkdir()
+    shutil.copy(
+        "tests/test_context/example_scripts/hint/relative_hint.py", tmp_path / "hint"
+    )
+
+    with SymbolIndex(database=tmp_path / "index.sqlite") as index:
+        use_symbol_index(index)
+        try:
+            watcher = Watcher(root=tmp_path, index=index, output_dir=tmp_path / "prompts")
+            written = watcher.start()
+            # Three groups in basic_butterfly.py and one in relative_hint.py
+            assert len(written) == 4
+            assert watcher.poll() == []
+
+            # Edit an entity hinted by relative_hint.py only
+            script = tmp_path / "basic_butterfly.py"
+            content = read_file(script).replace(
+                '"""This is another dummy class."""',
+                '"""This is another dummy class."""\n\n    edited_attribute = 1',
+            )
+            write_file(script, content)
+            stat = os.stat(script)
+            os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+            changed_files = watcher.poll()
+            assert changed_files == [script.resolve()]
+            written = watcher.refresh(changed_files)
+            assert [i.name for i in written] == ["hint__relative_hint.dummy_function_1.md"]
+            assert "edited_attribute" in read_file(written[0])
+
+        finally:
+            use_symbol_index(None)
+
+
+def test_watch_nested_task(tmp_path):
+    shutil.copy("tests/test_context/example_scripts/method_butterfly.py", tmp_path)
+    script = tmp_path / "method_butterfly.py"
+
+    def edit(old: str, new: str) -> None:
+        write_file(script, read_file(script).replace(old, new))
+        stat = os.stat(script)
+        os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with SymbolIndex(database=tmp_path / "index.sqlite") as index:
+        watcher = Watcher(root=tmp_path, index=index, output_dir=tmp_path / "prompts")
+        written = watcher.start()
+        prompt = tmp_path / "prompts" / "method_butterfly.DummyClass1.method_1.md"
+        assert prompt in written
+
+        # The enclosing class is part of the prompt of the method
+        edit("class_attribute_1 = 10", "class_attribute_1 = 99")
+        assert watcher.refresh(watcher.poll()) == [prompt]
+        assert "class_attribute_1 = 99" in read_file(prompt)
+
+        # Prompts of the groups that disappear are removed
+        edit("    @wildered.autocomplete()\n    def method_1", "    def method_1")
+        watcher.refresh(watcher.poll())
+        assert not prompt.exists()
@@ -0,0 +1,101 @@
+import os
+import shutil
+
+import pytest
+
+from wildered.ast import ASTSourceCode
+from wildered.cache import ParseCache, SkeletonCache, get_default_cache_dir
+from wildered.cst.source_code import CSTSourceCode
+from wildered.utils import read_file, write_file
+
+
+@pytest.fixture
+def script(tmp_path):
+    filename = tmp_path / "basic.py"
+    shutil.copy("./tests/test_source_code/example_scripts/basic.py", filename)
+    return filename
+
+
+def test_cache_hit(tmp_path, script):
+    cache = ParseCache(directory=tmp_path / "cache")
+    source = ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["misses"] == 1
+    cache.flush()
+
+    # A fresh cache object should pick up the index written to disk
+    cache = ParseCache(directory=tmp_path / "cache")
+    cached_source = ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["hits"] == 1
+    assert cached_source.unparse() == source.unparse()
+
+    # Different parsers never share entries
+    CSTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_invalidation(tmp_path, script):
+    cache = ParseCache(directory=tmp_path / "cache")
+    ASTSourceCode.from_file(script, cache=cache)
+
+    write_file(script, read_file(script) + "\n\ndef new_function():\n    pass\n")
+    source = ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["misses"] == 2
+    assert "new_function" in source.unparse()
+
+    # Touching the file without changing it is detected by the content hash
+    os.utime(script)
+    ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_version(tmp_path, script):
+    cache = ParseCache(directory=tmp_path / "cache")
+    ASTSourceCode.from_file(script, cache=cache)
+    cache.flush()
+
+    cache = ParseCache(directory=tmp_path / "cache")
+    cache.version = "outdated"
+    ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_eviction(tmp_path, script):
+    other_script = tmp_path / "other.py"
+    shutil.copy(script, other_script)
+
+    cache = ParseCache(directory=tmp_path / "cache")
+    ASTSourceCode.from_file(script, cache=cache)
+    cache.max_size = cache.stats()["size"]
+    ASTSourceCode.from_file(other_script, cache=cache)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 1
+    ASTSourceCode.from_file(script, cache=cache)
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_location(tmp_path, monkeypatch):
+    # Kept out of the project, which may not be trusted
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert ParseCache().directory == tmp_path / "wildered" / "parse"
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert get_default_cache_dir().is_relative_to(os.path.expanduser("~"))
+    assert SkeletonCache().directory == get_default_cache_dir().with_name("skeleton")
+
+
+def test_cache_shared_index(tmp_path, script):
+    other_script = tmp_path / "other.py"
+    shutil.copy(script, other_script)
+
+    # As used by two processes, each flushing its own entries
+    first = ParseCache(directory=tmp_path / "cache")
+    second = ParseCache(directory=tmp_path / "cache")
+    ASTSourceCode.from_file(script, cache=first)
+    ASTSourceCode.from_file(other_script, cache=second)
+    first.flush()
+    second.flush()
+
+    cache = ParseCache(directory=tmp_path / "cache")
+    assert cache.stats()["entries"] == 2
+    assert len(list((tmp_path / "cache").glob("*.pickle"))) == 2
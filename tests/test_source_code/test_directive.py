@@ -1,4 +1,4 @@
-
+import ast_comments
 import pytest
 from pydantic import Field, ValidationError
 
@@ -132,4 +132,49 @@ def test_duplicate_names():
 
         ASTDirectiveParser(
             prefix_name="popcorn", directives=[Pop, Pop2, Hurray]
-        )
\ No newline at end of file
+        )
+
+@pytest.mark.parametrize("filename", ["basic.py", "others.py", "new_class.py"])
+def test_prefilter(filename: str):
+    filename = f"./tests/test_source_code/example_scripts/{filename}"
+    entity_list = popcorn_ast_parser.parse(
+        source=ASTSourceCode.from_file(filename), drop_directive=False
+    )
+    # The prefilter may only skip files without any directive
+    if not popcorn_ast_parser.may_contain_directives(filename):
+        assert entity_list == []
+
+    else:
+        assert len(entity_list) > 0
+
+
+def test_prefilter_ignores_strings_and_comments(tmp_path):
+    filename = tmp_path / "no_directive.py"
+    filename.write_text(
+        'import popcorn\n\n# @popcorn.pop()\ndef f():\n    return "popcorn.pop()"\n'
+    )
+    assert not popcorn_ast_parser.may_contain_directives(filename)
+
+    filename.write_text("import popcorn\n\n@popcorn.pop()\ndef f():\n    pass\n")
+    assert popcorn_ast_parser.may_contain_directives(filename)
+
+
+def test_detect_and_drop_single_pass():
+    code = (
+        "from . import sibling\nimport popcorn\n\n"
+        "@pytest.mark.skip()\n@popcorn.pop(requirement='test')\ndef f():\n    {body}\n"
+    )
+    source = ASTSourceCode(
+        node=ast_comments.parse(code.format(body="pass")), filename="single_pass.py"
+    )
+    entity_list = popcorn_ast_parser.parse(source=source, drop_directive=True)
+    assert [i.name for i in entity_list] == ["f"]
+    assert source.unparse() == "from . import sibling\n\n@pytest.mark.skip()\ndef f():\n    pass"
+
+    source = ASTSourceCode(
+        node=ast_comments.parse(code.format(body="popcorn.run(popcorn.pop())")),
+        filename="single_pass.py",
+    )
+    with pytest.raises(ValueError):
+        # The run directive is only allowed at the top level
+        popcorn_ast_parser.parse(source=source, drop_directive=True)
@@ -0,0 +1,34 @@
+from wildered.ast import ASTSourceCode
+from wildered.utils import read_source
+
+LATIN_1 = '# -*- coding: latin-1 -*-\ndef greet():\n    return "Grüß dich, café"\n'
+
+
+def test_read_source(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_bytes(b"def foo():\n    return 1\n")
+    source = read_source(script)
+    assert source.encoding == "utf-8"
+    assert source.utf8 is source.data
+
+    script.write_bytes(b"\xef\xbb\xbfdef foo():\r\n    return 1\r\n")
+    source = read_source(script)
+    assert source.encoding == "utf-8-sig"
+    assert source.text == "def foo():\n    return 1\n"
+
+    # Without a cookie, the encoding is detected
+    script.write_bytes(("x = '" + "café crème brûlée " * 20 + "'\n").encode("cp1252"))
+    assert "crème" in read_source(script).text
+
+
+def test_coding_cookie(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_bytes(LATIN_1.encode("latin-1"))
+    assert read_source(script).encoding == "iso8859-1"
+
+    source = ASTSourceCode.from_file(script)
+    assert "Grüß" in source.get_function("greet", source_slice=True)
+    source.update_function('def greet():\n    return "Tschüß"\n', func_name="greet")
+    source.save(splice=True)
+    expected = "# -*- coding: latin-1 -*-\ndef greet():\n    return 'Tschüß'\n"
+    assert script.read_bytes() == expected.encode("latin-1")
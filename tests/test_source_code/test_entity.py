@@ -1,8 +1,10 @@
 import tempfile
 
+import ast_comments
 import pytest
 
 from wildered.ast import ASTSourceCode
+from wildered.ast.directive_parser import DetectDirective
 from wildered.models import BaseDirectiveParser
 from wildered.utils import read_file, write_file
 
@@ -141,4 +143,30 @@ def test_update_file(parser: BaseDirectiveParser):
     assert read_file("./tests/test_source_code/example_scripts/basic.py") == orig
     with tempfile.NamedTemporaryFile() as f:
         source.save(f.name)
-        assert read_file(f.name) == read_file("./tests/test_source_code/expected_scripts/updated_script.py")
\ No newline at end of file
+        assert read_file(f.name) == read_file("./tests/test_source_code/expected_scripts/updated_script.py")
+
+def test_wrapping_entities():
+    code = "class Outer:\n" + "".join(
+        f"    def method_{i}(self):\n        pass\n" for i in range(50)
+    ) + "    class Inner:\n        @popcorn.pop()\n        def target(self):\n            pass\n"
+    source = ASTSourceCode(node=ast_comments.parse(code), filename="wrapping.py")
+    detector = DetectDirective(parser=popcorn_ast_parser, source=source, code=source.node)
+    (entity,) = detector.detect()
+
+    # Only the definitions enclosing a detected entity become entities
+    assert len(detector.entities) == 3
+    assert [i.name for i in entity.ancestor] == ["Inner", "Outer"]
+    assert entity.ancestor is entity.ancestor
+    assert entity.qualname == "Outer.Inner.target"
+
+
+def test_compact_entities():
+    source = ASTSourceCode.from_file("./tests/test_source_code/example_scripts/basic.py")
+    entity_list = popcorn_ast_parser.parse(source=source, drop_directive=False)
+    first_entity, second_entity = entity_list[1], entity_list[2]
+    assert first_entity.__fields_set__ is second_entity.__fields_set__
+
+    # Assignments keep working on the shared set of fields
+    first_entity.name = "renamed"
+    assert second_entity.name == "dummy_function_2"
+    assert first_entity.__fields_set__ == set(first_entity.__fields__)
@@ -0,0 +1,47 @@
+import shutil
+
+from wildered.index import SymbolIndex
+from wildered.utils import read_file, write_file
+
+
+def test_build_index(tmp_path):
+    project = tmp_path / "project"
+    shutil.copytree("./tests/test_source_code/example_scripts", project)
+
+    with SymbolIndex(tmp_path / "index.sqlite") as index:
+        stats = index.build(project)
+        # invalid.py and friends are still valid Python
+        assert stats.indexed == len(list(project.glob("*.py")))
+        assert stats.failed == 0
+
+        record = index.find(project / "basic.py", "DummyClass2.__init__")
+        assert record.kind == "function"
+        assert record.signature == "def __init__(self, param: str) -> None"
+        assert (record.lineno, record.end_lineno) == (67, 73)
+        assert index.resolve("DummyClass1", near=project / "basic.py").path == str(
+            project / "basic.py"
+        )
+        # Only top-level definitions resolve, not methods of the same name
+        assert index.resolve("__init__") is None
+
+        # Nothing changed
+        assert index.build(project).unchanged == stats.indexed
+
+        (project / "others.py").unlink()
+        assert index.build(project).removed == 1
+        assert index.get_symbols(project / "others.py") == []
+
+
+def test_update_file(tmp_path):
+    filename = tmp_path / "basic.py"
+    shutil.copy("./tests/test_source_code/example_scripts/basic.py", filename)
+
+    with SymbolIndex(tmp_path / "index.sqlite") as index:
+        index.build(tmp_path)
+        assert index.is_fresh(filename)
+
+        content = read_file(filename).replace("b = 300", "b = 400")
+        write_file(filename, content + "\n\nclass DummyClass3:\n    pass\n")
+        assert not index.is_fresh(filename)
+        assert index.update_file(filename) == ["DummyClass3", "dummy_function_1"]
+        assert index.update_file(filename) == []
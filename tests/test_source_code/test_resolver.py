@@ -0,0 +1,80 @@
+from wildered.ast import ASTSourceCode
+from wildered.resolver import ImportResolver, get_import_resolver
+from wildered.utils import write_file
+
+
+def test_import_resolver(tmp_path):
+    for filename in [
+        "app/script.py",
+        "app/helpers.py",
+        "app/package/__init__.py",
+        "app/package/module.py",
+        "src/library/__init__.py",
+        "src/library/core.py",
+        "src/namespace/part.py",
+    ]:
+        (tmp_path / filename).parent.mkdir(parents=True, exist_ok=True)
+        write_file(tmp_path / filename, "")
+
+    resolver = ImportResolver(roots=[tmp_path, tmp_path / "src"])
+    script = tmp_path / "app/script.py"
+    # Next to the script first, then in the roots
+    assert resolver.resolve("helpers", base=script) == tmp_path / "app/helpers.py"
+    assert resolver.resolve("package", base=script) == tmp_path / "app/package/__init__.py"
+    assert resolver.resolve("library.core", base=script) == tmp_path / "src/library/core.py"
+    assert resolver.resolve("namespace.part") == tmp_path / "src/namespace/part.py"
+    # Namespace packages and modules outside the project have no file
+    assert resolver.resolve("namespace") is None
+    assert resolver.resolve("json", base=script) is None
+
+    module = tmp_path / "app/package/module.py"
+    assert resolver.resolve(None, level=1, base=module) == tmp_path / "app/package/__init__.py"
+    assert resolver.resolve("helpers", level=2, base=module) == tmp_path / "app/helpers.py"
+    assert resolver.resolve_hint_path("library.core", base=script) == (
+        tmp_path / "src/library/core.py"
+    )
+    assert resolver.resolve_hint_path("../src/library/core.py", base=script) == (
+        tmp_path / "src/library/core.py"
+    )
+
+
+def test_entity_map(tmp_path):
+    write_file(tmp_path / "package/__init__.py", "")
+    write_file(tmp_path / "package/module.py", "def function():\n    pass\n")
+    write_file(
+        tmp_path / "script.py",
+        "import json\n"
+        "import package.module as alias\n"
+        "from os import path\n"
+        "from package import module\n"
+        "from package.module import function\n",
+    )
+    source = ASTSourceCode.from_file(tmp_path / "script.py")
+    assert source.get_entity_map() == {
+        "path": None,
+        "function": tmp_path / "package/module.py",
+    }
+    assert source.get_module_map() == {
+        "json": None,
+        "alias": tmp_path / "package/module.py",
+        "module": tmp_path / "package/module.py",
+    }
+
+
+def test_default_resolver(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    resolver = get_import_resolver()
+    assert get_import_resolver() is resolver
+    assert resolver.resolve("module", base=tmp_path / "script.py") is None
+
+    # Lookups are kept until invalidated
+    write_file(tmp_path / "module.py", "")
+    assert resolver.resolve("module", base=tmp_path / "script.py") is None
+    resolver.invalidate()
+    assert resolver.resolve("module", base=tmp_path / "script.py") == (
+        tmp_path / "module.py"
+    )
+
+    (tmp_path / "other").mkdir()
+    monkeypatch.chdir(tmp_path / "other")
+    assert get_import_resolver() is not resolver
@@ -1,8 +1,13 @@
+import ast
 import tempfile
 
+import ast_comments
 import pytest
 
 from wildered.ast import ASTSourceCode
+from wildered.ast.utils import RenderFilter
+from wildered.cache import disable_skeleton_cache, enable_skeleton_cache
+from wildered.cst.source_code import CSTSourceCode
 from wildered.models import BaseDirectiveParser
 from wildered.utils import read_file, write_file
 
@@ -83,4 +88,187 @@ def test_update_imports(parser: BaseDirectiveParser):
     assert read_file("./tests/test_source_code/example_scripts/basic.py") == orig
     with tempfile.NamedTemporaryFile() as f:
         source.save(f.name)
-        assert read_file(f.name) == read_file("./tests/test_source_code/expected_scripts/updated_imports.py")
\ No newline at end of file
+        assert read_file(f.name) == read_file("./tests/test_source_code/expected_scripts/updated_imports.py")
+
+def test_unparse_leaves_tree_untouched():
+    source = ASTSourceCode.from_file("./tests/test_source_code/example_scripts/basic.py")
+    original = ast.dump(source.node, include_attributes=True)
+    source.unparse(drop_directive=True, directive_prefix="popcorn", drop_implementation=True)
+    source.get_class("DummyClass1", drop_directive=True, directive_prefix="popcorn")
+    assert ast.dump(source.node, include_attributes=True) == original
+
+    # Statements without directives are shared rather than copied
+    rendered = RenderFilter(directive_prefix="popcorn").apply(source.node)
+    assert rendered is not source.node
+    assert rendered.body[0] is source.node.body[0]
+    assert rendered.body[-1] is not source.symbols.get_class("DummyClass2")
+
+
+def test_cst_unparse(tmp_path):
+    source = CSTSourceCode.from_file("./tests/test_source_code/example_scripts/basic.py")
+    code = source.node.code
+    unparsed = source.unparse(drop_directive=True, directive_prefix="popcorn")
+    assert "popcorn" not in unparsed
+    assert source.node.code == code
+
+    # Only the directive is dropped from statements joined with `;`
+    write_file(tmp_path / "joined.py", "import popcorn; x = 1\ny = 2\n")
+    source = CSTSourceCode.from_file(tmp_path / "joined.py")
+    unparsed = source.unparse(drop_directive=True, directive_prefix="popcorn")
+    assert unparsed == "x = 1\ny = 2\n"
+
+
+def test_render_cache():
+    source = ASTSourceCode.from_file("./tests/test_source_code/example_scripts/basic.py")
+    flags = dict(drop_directive=True, directive_prefix="popcorn", return_global_import=True)
+    function = source.get_function("dummy_function_1", **flags)
+    method = source.get_function("method_1")
+    module = source.unparse()
+    assert source.get_function("dummy_function_1", **flags) is function
+
+    # Only the renders of the method, its class and the module are dropped
+    source.update_method(
+        "def method_1(self) -> str:\n    return 'updated'\n",
+        func_name="method_1",
+        class_name="DummyClass1",
+    )
+    assert source.get_function("dummy_function_1", **flags) is function
+    assert "updated" in source.get_function("method_1")
+    assert "updated" in source.get_class("DummyClass1")
+    assert "updated" in source.unparse()
+    assert method != source.get_function("method_1")
+
+    source.update_import_statement("import numpy")
+    assert source.get_function("dummy_function_1", **flags).startswith("import numpy")
+    assert source.unparse().startswith("import numpy")
+    assert module != source.unparse()
+
+
+def test_source_slice():
+    filename = "./tests/test_source_code/example_scripts/basic.py"
+    source = ASTSourceCode.from_file(filename)
+    lines = read_file(filename).splitlines()
+    flags = dict(drop_directive=True, directive_prefix="popcorn", source_slice=True)
+
+    # Original formatting is kept, without the lines of the directives
+    assert source.get_function("dummy_function_1", **flags) == "\n".join(lines[15:25])
+    start = lines.index("    def method_2(self) -> int:")
+    assert source.get_function("method_2", **flags) == "\n".join(
+        i[4:] for i in lines[start : start + 6]
+    )
+    sliced_class = source.get_class("DummyClass2", **flags)
+    assert "popcorn" not in sliced_class
+    assert sliced_class.startswith("class DummyClass2:\n")
+    assert source.unparse(source_slice=True) == "\n".join(lines)
+
+    # Modified definitions, and those enclosing them, are unparsed instead
+    source.update_method(
+        "def method_2(self) -> int:\n    return 1\n",
+        func_name="method_2",
+        class_name="DummyClass2",
+    )
+    assert source.get_function("method_2", **flags) == source.get_function("method_2")
+    assert source.get_class("DummyClass2", **flags) == source.get_class(
+        "DummyClass2", drop_directive=True, directive_prefix="popcorn"
+    )
+    assert source.get_function("dummy_function_1", **flags) == "\n".join(lines[15:25])
+
+    popcorn_ast_parser.parse(source, drop_directive=True)
+    assert source.get_function("dummy_function_1", source_slice=True) == (
+        source.get_function("dummy_function_1")
+    )
+
+
+def test_splice_save(tmp_path):
+    filename = "./tests/test_source_code/example_scripts/basic.py"
+    original = read_file(filename)
+    source = ASTSourceCode.from_file(filename)
+    entity_list = popcorn_ast_parser.parse(source, drop_directive=True)
+    function = [i for i in entity_list if i.name == "dummy_function_1"][0]
+    function.update("def dummy_function_1(param1: int, param2: str) -> None:\n    return param1\n")
+    source.update_method(
+        "def method_2(self) -> int:\n    return 2\n",
+        func_name="method_2",
+        class_name="DummyClass2",
+    )
+    source.update_import_statement("import numpy")
+
+    output = tmp_path / "spliced.py"
+    source.save(output, splice=True)
+    spliced = read_file(output)
+    assert ast.dump(ast.parse(spliced)) == ast.dump(ast.parse(str(source)))
+    assert spliced.startswith("import numpy\nimport hello\n")
+    assert "popcorn" not in spliced
+    assert "        return 2\n" in spliced
+
+    # Untouched definitions are copied as is
+    start = original.index("class DummyClass1:")
+    end = original.index("\n\n\nclass DummyClass2:")
+    assert original[start:end] in spliced
+
+    # Changes that cannot be spliced fall back to unparsing the module
+    source.update_module(spliced)
+    source.save(output, splice=True)
+    assert read_file(output) == str(source)
+
+
+def test_import_merge(tmp_path):
+    source = ASTSourceCode.from_file("./tests/test_source_code/example_scripts/basic.py")
+    source.update_import_statement(
+        "import hello as hi, numpy\n"
+        "import numpy\n"
+        "from hello import there, foo as bar\n"
+        "from os import path\n"
+        "from os import path, sep\n"
+    )
+    imports = source.get_import_statement()
+    assert imports.startswith("from os import path, sep\nimport hello as hi, numpy\nimport hello\n")
+    assert "from hello import there, foo as bar\n" in imports
+
+    # The extended import is rewritten in place by a spliced save
+    output = tmp_path / "merged.py"
+    source.save(output, splice=True)
+    assert read_file(output).startswith(imports)
+
+
+def test_read_only_parse(tmp_path):
+    filename = "./tests/test_source_code/example_scripts/basic.py"
+    source = ASTSourceCode.read_only(filename)
+    assert not any(isinstance(i, ast_comments.Comment) for i in ast.walk(source.node))
+    # Slices of the text keep the comments
+    assert "# Implementation goes here" in source.get_function(
+        "dummy_function_1", source_slice=True
+    )
+
+    # A change re-parses the module with its comments first
+    source.update_function("def dummy_function_1():\n    pass\n", "dummy_function_1")
+    assert "# Implementation goes here" in str(source)
+    output = tmp_path / "promoted.py"
+    source.save(output, splice=True)
+    assert read_file(output).count("# Implementation goes here") == (
+        read_file(filename).count("# Implementation goes here") - 1
+    )
+
+
+def test_skeleton(tmp_path):
+    filename = "./tests/test_source_code/example_scripts/basic.py"
+    skeleton = ASTSourceCode.read_only(filename).get_skeleton(directive_prefix="popcorn")
+    assert "import hello" in skeleton
+    assert "def dummy_function_1(param1: int, param2: str) -> None:" in skeleton
+    assert "This is a dummy function." in skeleton
+    assert "b = 300" not in skeleton
+    assert "popcorn.pop" not in skeleton
+
+    cache = enable_skeleton_cache(tmp_path)
+    try:
+        assert ASTSourceCode.read_only(filename).get_skeleton("popcorn") == skeleton
+        assert len(list(tmp_path.iterdir())) == 1
+        # Loaded back from the file of the same content
+        cache._skeletons.clear()
+        for i in tmp_path.iterdir():
+            write_file(i, "cached")
+
+        assert ASTSourceCode.read_only(filename).get_skeleton("popcorn") == "cached"
+
+    finally:
+        disable_skeleton_cache()
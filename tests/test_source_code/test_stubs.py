@@ -0,0 +1,41 @@
+import json
+
+from wildered.stubs import (
+    StubCache,
+    extract_stub,
+    find_library_source,
+    get_package_version,
+)
+
+
+def test_extract_stub():
+    assert find_library_source("pydantic.main").name == "main.py"
+    assert find_library_source("not_a_module") is None
+    # Plain modules have no submodules, e.g. the top-level `json`
+    assert find_library_source("pydantic.main.json") is None
+    assert find_library_source("os.path") is None
+
+    # Re-exported by `from pydantic.main import *`, followed to its definition
+    stub = extract_stub("pydantic", "BaseModel")
+    assert stub.startswith("# From pydantic.main\nclass BaseModel(")
+    # Signatures and docstrings only
+    assert "def dict(self, *, include" in stub
+    assert "self._iter(" not in stub
+    assert extract_stub("pydantic", "NotDefined") is None
+
+
+def test_stub_cache(tmp_path):
+    cache = StubCache(tmp_path)
+    stub = cache.get("pydantic", "BaseModel")
+    cache_file = tmp_path / f"pydantic-{get_package_version('pydantic')}.json"
+    assert json.loads(cache_file.read_text()) == {"pydantic:BaseModel": stub}
+
+    # Later scans read it from the file
+    cache_file.write_text(json.dumps({"pydantic:BaseModel": "cached"}))
+    assert StubCache(tmp_path).get("pydantic", "BaseModel") == "cached"
+
+
+def test_stub_cache_location(tmp_path, monkeypatch):
+    # Next to the other caches of the user, out of the project
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert StubCache().directory == tmp_path / "wildered" / "stubs"
@@ -0,0 +1,80 @@
+import inspect
+
+import ast_comments
+import pytest
+
+from wildered.ast import ASTSourceCode
+from wildered.ast.symbols import SymbolTable
+from wildered.ast.utils import locate_entity
+
+CODE = inspect.cleandoc(
+    '''
+    def dummy():
+        def nested():
+            pass
+
+    async def dummy_async():
+        pass
+
+    class DummyClass:
+        def method(self):
+            pass
+
+        class Inner:
+            async def method(self):
+                pass
+
+    if True:
+        def method():
+            pass
+    '''
+)
+
+
+def test_qualified_names():
+    table = SymbolTable(ast_comments.parse(CODE))
+    assert list(table.symbols.keys()) == [
+        "dummy",
+        "dummy.nested",
+        "dummy_async",
+        "DummyClass",
+        "DummyClass.method",
+        "DummyClass.Inner",
+        "DummyClass.Inner.method",
+        "method",
+    ]
+    assert table.get("DummyClass.Inner.method").lineno == 13
+    assert table.get("DummyClass.Inner").end_lineno == 14
+    # Unqualified lookups prefer the shallowest definition
+    assert table.get("method").qualname == "method"
+    assert table.get_function("dummy_async").name == "dummy_async"
+    assert table.get_method(func_name="method", class_name="Inner").lineno == 13
+
+
+def test_locate_entity():
+    code = ast_comments.parse(CODE)
+    assert locate_entity(code, "dummy").name == "dummy"
+    # Names are matched exactly rather than as substrings
+    assert locate_entity(code, "dum") is None
+
+
+def test_update_patches_symbols():
+    source = ASTSourceCode(node=ast_comments.parse(CODE))
+    table = source.symbols
+
+    source.update_method(
+        "def method(self):\n    def helper():\n        pass\n",
+        func_name="method",
+        class_name="DummyClass",
+    )
+    assert source.symbols is table
+    assert "DummyClass.method.helper" in table
+    assert source.get_function("helper") == "def helper():\n    pass"
+
+    source.update_class("class DummyClass:\n    pass\n", class_name="DummyClass")
+    assert "DummyClass.Inner" not in table
+    assert "DummyClass.method" not in table
+    assert table.get("method").qualname == "method"
+
+    with pytest.raises(ValueError):
+        source.get_class("Inner")
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from wildered.ast import ASTSourceCode
+from wildered.cache import ParseCache
+from wildered.utils import WriteBatch, batch_writes, read_file, write_file
+
+
+def test_batch_writes(tmp_path):
+    script = tmp_path / "script.py"
+    write_file(script, "def foo():\n    pass\n")
+    source = ASTSourceCode.from_file(script)
+    source.update_function("def foo():\n    return 1\n", func_name="foo")
+
+    with batch_writes() as batch:
+        source.save(splice=True)
+        source.save(tmp_path / "new" / "copy.py")
+        assert len(batch) == 2
+        # Nothing is written before the end of the block, but reads see the new content
+        assert os.listdir(tmp_path) == ["script.py"]
+        assert "return 1" in read_file(script)
+
+    assert read_file(script) == "def foo():\n    return 1\n"
+    assert "return 1" in read_file(tmp_path / "new" / "copy.py")
+    assert sorted(os.listdir(tmp_path)) == ["new", "script.py"]
+
+
+def test_batch_reload_cached(tmp_path):
+    script = tmp_path / "script.py"
+    write_file(script, "def foo():\n    pass\n")
+    cache = ParseCache(directory=tmp_path / "cache")
+    source = ASTSourceCode.from_file(script, cache=cache)
+    source.update_function("def foo():\n    return 1\n", func_name="foo")
+
+    with batch_writes():
+        source.save(splice=True)
+        source.save(tmp_path / "copy.py")
+        # The cached tree predates the pending write
+        for filename in [script, tmp_path / "copy.py"]:
+            source = ASTSourceCode.from_file(filename, cache=cache)
+            assert "return 1" in source.unparse()
+
+    assert "return 1" in ASTSourceCode.from_file(script, cache=cache).unparse()
+
+
+def test_all_or_nothing(tmp_path, monkeypatch):
+    first, second = tmp_path / "first.py", tmp_path / "second.py"
+    write_file(first, "first = 1\n")
+
+    with pytest.raises(KeyboardInterrupt):
+        with batch_writes(all_or_nothing=True):
+            ASTSourceCode.from_file(first).save(second)
+            raise KeyboardInterrupt
+
+    assert not second.exists()
+
+    # A failed rename restores the files renamed before it
+    replace = os.replace
+
+    def failing_replace(src, dst):
+        if str(dst) == str(second):
+            raise OSError("Disk full")
+
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    batch = WriteBatch(all_or_nothing=True)
+    batch.write(first, "first = 2\n").write(second, "second = 2\n")
+    with pytest.raises(OSError):
+        batch.commit()
+
+    assert read_file(first) == "first = 1\n"
+    assert sorted(os.listdir(tmp_path)) == ["first.py"]
@@ -1,2 +1,3 @@
 from .directive_parser import ASTDirectiveParser
-from .source_code import ASTSourceCode
+from .registry import SourceCodeRegistry
+from .source_code import ASTSourceCode, source_registry
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import ast
-import copy
+import sys
+from pathlib import Path
 from typing import (
-    Annotated,
     Any,
     Dict,
     List,
+    NamedTuple,
     Optional,
     Tuple,
-    Type,
 )
 
 import ast_comments
@@ -17,14 +17,15 @@ from pydantic import validator
 from typing_extensions import assert_never
 
 from wildered.ast.utils import (
-    DropDirective,
-    DropImplementation,
-    get_call_name,
+    BLOCK_FIELDS,
+    get_directive_name,
     locate_function,
 )
 from wildered.directive import Directive, DirectiveContext, Identifier
-from wildered.models import BaseDirectiveParser, BaseEntity
+from wildered.models import BaseDirectiveParser, BaseEntity, construct_model
+from wildered.utils import SourceFile
 
+from .prefilter import may_contain_directives
 from .source_code import ASTSourceCode
 from .utils import (
     locate_class,
@@ -32,26 +33,37 @@ from .utils import (
 
 
 class ASTDirectiveParser(BaseDirectiveParser):
+    def may_contain_directives(
+        self, filename: Path | str, source: Optional[SourceFile] = None
+    ) -> bool:
+        """
+        Whether `filename` needs to be parsed at all. False guarantees that `parse`
+        would not detect any directive in it.
+        """
+        return may_contain_directives(filename, prefix=self.prefix_name, source=source)
+
     def parse(
         self, source: ASTSourceCode, drop_directive: bool = True
     ) -> List[ASTEntity]:
         # Drop_directive will mutate the SourceCode
+        source.promote()
         detector = DetectDirective(
             parser=self,
             source=source,
-            directive_list=self.directives,
             code=source.node,
-            prefix=self.prefix_name,
+            drop_directive=drop_directive,
         )
+        detected = detector.detect()
+        source.record_removal(detector.dropped)
+        for pending in detector.modified:
+            if pending is None:
+                source.invalidate_render(source.node)
 
-        detector.visit(source.node)
-
-        if drop_directive:
-            drop_transformer = DropDirective(prefix=self.prefix_name)
-            drop_transformer.visit(source.node)
+            else:
+                source.invalidate_render(pending.node, ancestors=pending.ancestors)
 
-        self.check_valid_combination(entity_list=detector.detected)
-        return detector.detected
+        self.check_valid_combination(entity_list=detected)
+        return detected
 
 
 class ASTEntity(BaseEntity):
@@ -78,33 +90,18 @@ class ASTEntity(BaseEntity):
     ) -> str:
         if include_ancestor:
             # Top ancestor
-            node = copy.deepcopy(self.ancestor[-1].node)
+            node = self.ancestor[-1].node
 
         else:
-            node = copy.deepcopy(self.node)
-
-        if drop_directive:
-            transformer = DropDirective(prefix=self.parser.prefix_name)
-            transformer.visit(node)
-
-        if drop_implementation:
-            transformer = DropImplementation(exception=[])
-            transformer.visit(node)
-
-        ast.fix_missing_locations(node)
-
-        if return_global_import:
-            return (
-                self.source.get_import_statement(
-                    drop_directive=drop_directive,
-                    directive_prefix=self.parser.prefix_name,
-                )
-                + "\n\n"
-                + ast_comments.unparse(node)
-            )
+            node = self.node
 
-        else:
-            return ast_comments.unparse(node)
+        return self.source._unparse(
+            node=node,
+            drop_directive=drop_directive,
+            directive_prefix=self.parser.prefix_name,
+            drop_implementation=drop_implementation,
+            return_global_import=return_global_import,
+        )
 
 
 class ASTClassEntity(ASTEntity):
@@ -121,6 +118,7 @@ class ASTClassEntity(ASTEntity):
             new_code = ast_comments.parse(new_code)
             new_code = locate_class(new_code, class_name=name if name else self.name)
 
+        self.source.record_edit(self.node)
         self.node.body = new_code.body
         self.node.decorator_list = new_code.decorator_list
         
@@ -129,6 +127,8 @@ class ASTClassEntity(ASTEntity):
             self.node.bases = new_code.bases
             self.node.keywords = new_code.keywords
 
+        self.source.refresh_symbols(self.node)
+
 
 class ASTFunctionEntity(ASTEntity):
     node: ast.FunctionDef
@@ -144,6 +144,7 @@ class ASTFunctionEntity(ASTEntity):
             new_code = ast_comments.parse(new_code)
             new_code = locate_function(new_code, func_name=name if name else self.name)
 
+        self.source.record_edit(self.node)
         self.node.body = new_code.body
         self.node.decorator_list = new_code.decorator_list
         
@@ -152,6 +153,8 @@ class ASTFunctionEntity(ASTEntity):
             self.node.args = new_code.args
             self.node.returns = new_code.returns
 
+        self.source.refresh_symbols(self.node)
+
 
 class ASTModuleEntity(ASTEntity):
     _context = "module"
@@ -169,7 +172,7 @@ class ASTModuleEntity(ASTEntity):
         if isinstance(new_code, str):
             new_code = ast_comments.parse(new_code)
 
-        self.source.node = new_code
+        self.source.update_module(new_code)
         self.node = new_code
 
 
@@ -203,7 +206,7 @@ def extract_value(node: ast.AST):
             return extract_dict(node=node)
 
         case ast.Name():
-            return Identifier(node=node, name=node.id)
+            return construct_model(Identifier, node=node, name=sys.intern(node.id))
 
         case ast.Str():
             return node.s
@@ -229,131 +232,199 @@ def extract_list(node: ast.List):
     return [extract_value(elt) for elt in node.elts]
 
 
-class DetectDirective(ast.NodeVisitor):
-    # Go through the node, return a list of task
+class PendingEntity(NamedTuple):
+    """
+    A definition enclosing the statements being visited. It only becomes an entity
+    when a detected entity nested in it needs its `wrapping_node`.
+    """
+
+    node: ast.FunctionDef | ast.ClassDef
+    wrapping_node: Optional[PendingEntity]
+
+    @property
+    def ancestors(self) -> List[ast.AST]:
+        ancestor_list = []
+        cur_pending = self.wrapping_node
+        while cur_pending is not None:
+            ancestor_list.append(cur_pending.node)
+            cur_pending = cur_pending.wrapping_node
+
+        return ancestor_list
+
+
+class DetectDirective:
+    """
+    Detects the directives of a module in a single pass over its statements. Only
+    decorator lists and expression statements (for `prefix.run(...)`) are inspected,
+    and with `drop_directive` the directives and the imports of the directive package
+    are removed during the same pass.
+    """
+
     def __init__(
         self,
         parser: ASTDirectiveParser,
         source: ASTSourceCode,
-        directive_list: List[Type[Directive]],
         code: ast.AST,
-        prefix: str,
+        drop_directive: bool = False,
     ):
         self.parser = parser
         self.code = code
         self.source = source
-        self.prefix = prefix
-        self.detected = []
-        self.task_list = []
-        self.wrapping_node = None
-
-        self.directives = {}
-        self.config_map = {}
-
-        for directive_cls in directive_list:
-            config = directive_cls.config
-            alias = config.alias
-            name = config.name
-            self.directives[name] = {"alias": alias, "cls": directive_cls}
-            self.config_map[name] = config
-
-    def visit_Call(self, node: ast.Call) -> Any:
-        try:
-            prefix, node_name = get_call_name(node)
-            if (prefix == self.prefix) and (node_name == "run"):
-                directives = self.extract_directives(
-                    decorators=node.args,
-                )
-                if len(directives) != 0:
+        self.prefix = parser.prefix_name
+        self.directive_table = parser.directive_table
+        self.drop_directive = drop_directive
+        self.detected: List[ASTEntity] = []
+        self.entities: Dict[int, ASTEntity] = {}
+        # Definitions changed by dropping directives, None standing for the module
+        self.modified: List[Optional[PendingEntity]] = []
+        self.dropped: List[ast.AST] = []
+
+    def detect(self) -> List[ASTEntity]:
+        self.visit_block(self.code, wrapping_node=None)
+        return self.detected
+
+    def materialize(self, pending: Optional[PendingEntity]) -> Optional[ASTEntity]:
+        """Return the entity of an enclosing definition, creating it on first use."""
+        if pending is None:
+            return None
+
+        entity = self.entities.get(id(pending.node), None)
+        if entity is None:
+            entity = self.create_entity(
+                pending.node,
+                directives={},
+                wrapping_node=self.materialize(pending.wrapping_node),
+            )
+
+        return entity
+
+    def create_entity(
+        self,
+        node: ast.FunctionDef | ast.ClassDef,
+        directives: Dict[str, List[Directive]],
+        wrapping_node: Optional[ASTEntity],
+    ) -> ASTEntity:
+        entity_cls = ASTFunctionEntity if isinstance(node, ast.FunctionDef) else ASTClassEntity
+        # Every field comes from the tree being visited, so validation is skipped
+        entity = construct_model(
+            entity_cls,
+            parser=self.parser,
+            source=self.source,
+            wrapping_node=wrapping_node,
+            node=node,
+            name=sys.intern(node.name),
+            directives=directives,
+        )
+        self.entities[id(node)] = entity
+        return entity
+
+    def visit_block(self, node: ast.AST, wrapping_node: Optional[PendingEntity]) -> None:
+        for field_name in BLOCK_FIELDS:
+            statements = getattr(node, field_name, None)
+            if not statements:
+                continue
+
+            kept = [
+                statement
+                for statement in statements
+                if self.visit_statement(statement, wrapping_node=wrapping_node)
+            ]
+            if len(kept) != len(statements):
+                kept_ids = {id(i) for i in kept}
+                self.dropped.extend(i for i in statements if id(i) not in kept_ids)
+                # In place, as symbol tables hold on to the statement lists
+                statements[:] = kept
+                if isinstance(node, ast.AsyncFunctionDef):
+                    # Not an entity, but a definition whose text changed all the same
+                    self.modified.append(PendingEntity(node, wrapping_node))
+
+                else:
+                    self.modified.append(wrapping_node)
+
+    def visit_statement(
+        self, node: ast.AST, wrapping_node: Optional[PendingEntity]
+    ) -> bool:
+        """Detect the directives of a statement, returning whether to keep it."""
+        match node:
+            case ast.FunctionDef() | ast.ClassDef():
+                self.visit_definition(node, wrapping_node=wrapping_node)
+                return True
+
+            case ast.Expr(value=ast.Call() as call) if (
+                get_directive_name(call, prefix=self.prefix) == "run"
+            ):
+                directives = self.extract_directives(decorators=call.args)
+                if (len(directives) != 0) and (self.source.filename is not None):
                     node_task = ASTModuleEntity(
                         parser=self.parser,
                         source=self.source,
-                        wrapping_node=self.wrapping_node,
+                        wrapping_node=self.materialize(wrapping_node),
                         node=self.code,
                         name=self.source.filename.name,
                         directives=directives,
                     )
                     self.detected.append(node_task)
 
-        except AttributeError:
-            pass
-
-        finally:
-            self.generic_visit(node)
+                return not self.drop_directive
 
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> Any:
-        directives = self.extract_directives(decorators=node.decorator_list)
-        node_task = ASTFunctionEntity(
-            parser=self.parser,
-            source=self.source,
-            wrapping_node=self.wrapping_node,
-            node=node,
-            name=node.name,
-            directives=directives,
-        )
+            case ast.Import():
+                return not (
+                    self.drop_directive and node.names[0].name.startswith(self.prefix)
+                )
 
-        if len(directives) > 0:
-            self.detected.append(node_task)
+            case ast.ImportFrom():
+                return not (
+                    self.drop_directive
+                    and (node.module is not None)
+                    and node.module.startswith(self.prefix)
+                )
 
-        previous = self.wrapping_node
-        self.wrapping_node = node_task
-        self.generic_visit(node=node)
-        self.wrapping_node = previous
-
-    def visit_ClassDef(self, node: ast.ClassDef) -> Any:
-        directives = self.extract_directives(
-            decorators=node.decorator_list,
-        )
-        node_task = ASTClassEntity(
-            parser=self.parser,
-            source=self.source,
-            wrapping_node=self.wrapping_node,
-            node=node,
-            name=node.name,
-            directives=directives,
-        )
+            case _:
+                # Compound statements such as if/try/with share the enclosing entity
+                self.visit_block(node, wrapping_node=wrapping_node)
+                return True
 
+    def visit_definition(
+        self,
+        node: ast.FunctionDef | ast.ClassDef,
+        wrapping_node: Optional[PendingEntity],
+    ) -> None:
+        directives = self.extract_directives(decorators=node.decorator_list)
         if len(directives) > 0:
+            node_task = self.create_entity(
+                node,
+                directives=directives,
+                wrapping_node=self.materialize(wrapping_node),
+            )
             self.detected.append(node_task)
 
-        previous = self.wrapping_node
-        self.wrapping_node = node_task
-        self.generic_visit(node=node)
-        self.wrapping_node = previous
-
-    def extract_directives(self, decorators: ast.AST) -> Dict[str, List[Directive]]:
+        pending = PendingEntity(node=node, wrapping_node=wrapping_node)
+        if self.drop_directive:
+            decorator_list = [
+                i
+                for i in node.decorator_list
+                if get_directive_name(i, prefix=self.prefix) is None
+            ]
+            if len(decorator_list) != len(node.decorator_list):
+                self.dropped.extend(i for i in node.decorator_list if i not in decorator_list)
+                node.decorator_list = decorator_list
+                self.modified.append(pending)
+
+        self.visit_block(node, wrapping_node=pending)
+
+    def extract_directives(self, decorators: List[ast.AST]) -> Dict[str, List[Directive]]:
         directive_map = {}
         for node in decorators:
-            if isinstance(node, ast.Call):
-                prefix_name, name = get_call_name(node)
-                if prefix_name != self.prefix:
-                    continue
-
-                matched_directive = self.directive_lookup(name)
-                if matched_directive is not None:
-                    pos_args, keyword_args = parse_arguments(node)
-                    directive = matched_directive[1](
-                        args=pos_args, **keyword_args, _name=matched_directive[0]
-                    )
-                    directive_map.setdefault(matched_directive[2], [])
-                    directive_map[matched_directive[2]].append(directive)
+            name = get_directive_name(node, prefix=self.prefix)
+            if name is None:
+                continue
+
+            matched_directive = self.directive_table.get(name, None)
+            if matched_directive is not None:
+                directive_cls, directive_name = matched_directive
+                pos_args, keyword_args = parse_arguments(node)
+                directive = directive_cls(args=pos_args, **keyword_args, _name=name)
+                directive_map.setdefault(directive_name, [])
+                directive_map[directive_name].append(directive)
 
         return directive_map
-
-    def directive_lookup(
-        self, name: str
-    ) -> (
-        Tuple(
-            Annotated[str, "The currently used alias"],
-            Type[Directive],
-            Annotated[str, "Name of the directive"],
-        )
-        | None
-    ):
-        for i, j in self.directives.items():
-            aliases = j["alias"]
-            for alias in aliases:
-                if alias == name:
-                    return (name, j["cls"], i)
-
-        return None
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import io
+import mmap
+import tokenize
+from pathlib import Path
+from typing import List, Optional
+
+from wildered.utils import SourceFile, read_file
+
+SKIPPED_TOKENS = {tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT}
+
+
+def contains_bytes(filename: Path | str, needle: bytes) -> bool:
+    """Search `filename` for `needle` without decoding it, through mmap."""
+    with open(filename, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return m.find(needle) != -1
+
+        except ValueError:
+            # Empty files cannot be mapped
+            return False
+
+
+def find_directive_lines(content: str, prefix: str) -> List[int]:
+    """
+    Return the lines where `prefix.<name>` is accessed, outside of strings and
+    comments. Every directive, whether a decorator or a `prefix.run(...)` call,
+    is such an access, so a file without any cannot contain directives.
+    """
+    lines = []
+    expected = [(tokenize.NAME, prefix), (tokenize.OP, "."), (tokenize.NAME, None)]
+    matched = 0
+    start_line = 0
+    tokens = tokenize.generate_tokens(io.StringIO(content).readline)
+    for token in tokens:
+        if token.type in SKIPPED_TOKENS:
+            continue
+
+        token_type, token_string = expected[matched]
+        if token.type == token_type and token_string in (None, token.string):
+            if matched == 0:
+                start_line = token.start[0]
+
+            matched += 1
+            if matched == len(expected):
+                lines.append(start_line)
+                matched = 0
+
+        else:
+            matched = 1 if (token.type, token.string) == expected[0] else 0
+            if matched:
+                start_line = token.start[0]
+
+    return lines
+
+
+def may_contain_directives(
+    filename: Path | str, prefix: str, source: Optional[SourceFile] = None
+) -> bool:
+    """
+    Cheap check run before building a full tree: a byte search for the prefix,
+    then a tokenize pass over the few files that mention it. The file is only
+    read when its `source` is not given.
+    """
+    if source is not None:
+        # Source encodings are ASCII compatible, so the prefix is found in the bytes
+        if prefix.encode("utf-8") not in source.data:
+            return False
+
+    elif not contains_bytes(filename, prefix.encode("utf-8")):
+        return False
+
+    try:
+        content = source.text if source is not None else read_file(filename)
+        return len(find_directive_lines(content, prefix)) > 0
+
+    except (tokenize.TokenError, SyntaxError, UnicodeDecodeError):
+        # Let the parser report the error
+        return True
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .source_code import ASTSourceCode
+
+
+class SourceCodeRegistry:
+    """
+    Hands out a single source code object per resolved path, so that every hint and
+    dependency pointing at the same file shares one parsed tree.
+    """
+
+    _registries: weakref.WeakSet[SourceCodeRegistry] = weakref.WeakSet()
+
+    def __init__(self, loader: Callable[[str], ASTSourceCode]) -> None:
+        self.loader = loader
+        self._sources: Dict[Path, ASTSourceCode] = {}
+        self._registries.add(self)
+
+    @classmethod
+    def invalidate_all(
+        cls, filename: Path | str, keep: Optional[ASTSourceCode] = None
+    ) -> None:
+        """Invalidate `filename` in every live registry, called whenever a file is written."""
+        for registry in list(cls._registries):
+            registry.invalidate(filename, keep=keep)
+
+    def spawn(self) -> SourceCodeRegistry:
+        """Return a new empty registry using the same loader."""
+        return type(self)(loader=self.loader)
+
+    def get(self, filename: Path | str) -> ASTSourceCode:
+        key = Path(filename).resolve()
+        if key not in self._sources:
+            self._sources[key] = self.loader(key)
+
+        return self._sources[key]
+
+    def register(self, source: ASTSourceCode) -> ASTSourceCode:
+        """
+        Make `source` the shared object for its file, replacing any object
+        handed out previously.
+        """
+        if source.filename is not None:
+            self._sources[Path(source.filename).resolve()] = source
+
+        return source
+
+    def invalidate(
+        self, filename: Path | str, keep: Optional[ASTSourceCode] = None
+    ) -> None:
+        """
+        Drop the entry of `filename` unless it is `keep`, the object whose content
+        was just written to the file.
+        """
+        key = Path(filename).resolve()
+        if self._sources.get(key, None) is not keep:
+            self._sources.pop(key, None)
+
+    def clear(self) -> None:
+        self._sources.clear()
+
+    @contextmanager
+    def scope(self) -> Iterator[SourceCodeRegistry]:
+        """Share source code objects only until the end of the block, e.g. a single scan."""
+        try:
+            yield self
+
+        finally:
+            self.clear()
+
+    def __contains__(self, filename: Path | str) -> bool:
+        return Path(filename).resolve() in self._sources
@@ -1,32 +1,41 @@
 from __future__ import annotations
 
 import ast
-import copy
 import pickle
 from pathlib import Path
-from typing import Annotated, Dict, List, Optional, TypeAlias
+from typing import Annotated, Dict, List, Optional, Set, Tuple, TypeAlias
 
 import ast_comments
 from pydantic import PrivateAttr
 
+from wildered.ast.registry import SourceCodeRegistry
+from wildered.ast.symbols import SymbolTable
+from wildered.ast.text import SourceText, TextEdit
 from wildered.ast.utils import (
-    DropDirective,
-    DropImplementation,
+    ImportIndex,
+    RenderFilter,
     ReplaceNode,
-    diff_import_list,
+    build_skeleton,
     extract_import_list,
+    find_directive_nodes,
     locate_class,
-    locate_entity,
     locate_function,
     locate_method,
 )
+from wildered.cache import ParseCache, get_parse_cache, get_skeleton_cache
 from wildered.models import BaseSourceCode
-from wildered.utils import read_file, resolve_module_filepath, write_file
+from wildered.resolver import get_import_resolver
+from wildered.utils import SourceFile, read_source, write_source
 
 EntityMap: TypeAlias = Dict[
     Annotated[str, "The entity name"],
-    Annotated[str, "The path of the file containing the entity"],
+    Annotated[Optional[Path], "The path of the file containing the entity"],
 ]
+# Node id, drop_directive, directive_prefix, drop_implementation, exception,
+# return_global_import, source_slice
+RenderKey: TypeAlias = Tuple[int, bool, str, bool, Tuple[str, ...], bool, bool]
+# drop_directive, directive_prefix, relative_only
+ImportKey: TypeAlias = Tuple[bool, str, bool]
 
 
 class ASTSourceCode(BaseSourceCode):
@@ -39,6 +48,173 @@ class ASTSourceCode(BaseSourceCode):
     node: ast.AST
     filename: Optional[Path] = None
     _entity_map: Optional[EntityMap] = PrivateAttr(default=None)
+    _module_map: Optional[EntityMap] = PrivateAttr(default=None)
+    # Names imported from installed libraries, with the module they are imported from
+    _library_map: Optional[Dict[str, str]] = PrivateAttr(default=None)
+    _symbols: Optional[SymbolTable] = PrivateAttr(default=None)
+    # Rendered text along with the node it was rendered from, as ids can be reused
+    _render_cache: Dict[RenderKey, Tuple[ast.AST, str]] = PrivateAttr(default_factory=dict)
+    _import_cache: Dict[ImportKey, Tuple[ast.AST, str]] = PrivateAttr(default_factory=dict)
+    # Skeletons of the unmodified module by directive prefix
+    _skeletons: Dict[str, str] = PrivateAttr(default_factory=dict)
+    # The text `node` was parsed from, and the ids of the nodes that no longer match it
+    _text: Optional[SourceText] = PrivateAttr(default=None)
+    _modified: Set[int] = PrivateAttr(default_factory=set)
+    _encoding: str = PrivateAttr(default="utf-8")
+    # Changes to splice into the original text on save, None when they cannot be
+    _edits: Optional[List[TextEdit]] = PrivateAttr(default_factory=list)
+    # Whether `node` keeps the comments, False for files only read from (`read_only`)
+    _comments: bool = PrivateAttr(default=True)
+
+    @property
+    def symbols(self) -> SymbolTable:
+        """
+        Symbol table of the module, built on first use and rebuilt whenever
+        `node` has been replaced.
+        """
+        if (self._symbols is None) or (self._symbols.tree is not self.node):
+            self._symbols = SymbolTable(self.node)
+
+        return self._symbols
+
+    def refresh_symbols(self, node: ast.AST) -> None:
+        """Patch the symbol table after `node` has been modified in place."""
+        self.invalidate_render(node)
+        if (self._symbols is not None) and (self._symbols.symbol_of(node) is not None):
+            self._symbols.replace(node, node)
+
+        else:
+            self._symbols = None
+
+    def invalidate_render(
+        self, node: Optional[ast.AST] = None, ancestors: Optional[List[ast.AST]] = None
+    ) -> None:
+        """
+        Drop the cached renders affected by a change to `node`: those of the node,
+        of the definitions enclosing it (`ancestors`, looked up when not given) and
+        of the module. Every cached render is dropped when `node` is None or unknown,
+        and the original text is no longer sliced from either.
+        """
+        if (node is not None) and (node is self.node):
+            self._modified.add(id(node))
+            self._invalidate_imports()
+            return
+
+        if (node is not None) and (ancestors is None):
+            symbol = self.symbols.symbol_of(node)
+            ancestors = [i.node for i in symbol.ancestors] if symbol else None
+
+        if ancestors is None:
+            self._clear_render_cache()
+            self._text = None
+            return
+
+        affected = {id(node), id(self.node)} | {id(i) for i in ancestors}
+        self._modified |= affected
+        self._render_cache = {
+            key: value
+            for key, value in self._render_cache.items()
+            if key[0] not in affected
+        }
+
+    def record_edit(self, node: ast.AST, new_node: Optional[ast.AST] = None) -> None:
+        """
+        Record that the definition or top-level statement `node` is replaced by
+        `new_node`, or is about to be modified in place when not given, so that a
+        spliced save only rewrites its lines. Must be called before the change.
+        """
+        new_node = new_node if new_node else node
+        if (self._text is None) or (self._edits is None):
+            return
+
+        for edit in self._edits:
+            for i, edit_node in enumerate(edit.nodes):
+                if edit_node is node:
+                    # Not from the original text, the edit renders it anyway
+                    edit.nodes[i] = new_node
+                    return
+
+        symbol = self.symbols.symbol_of(node)
+        if symbol is not None:
+            edited = {id(i) for edit in self._edits for i in edit.nodes}
+            if any(id(i.node) in edited for i in symbol.ancestors):
+                # Rewritten along with the enclosing definition
+                return
+
+            first = symbol.lineno
+
+        elif any(i is node for i in self.node.body) and self._text.is_isolated(node):
+            first = node.lineno
+
+        else:
+            self._edits = None
+            return
+
+        self._edits.append(
+            TextEdit(
+                first=first,
+                last=node.end_lineno,
+                indent=self._text.get_indent(node),
+                nodes=[new_node],
+                order=len(self._edits),
+            )
+        )
+
+    def record_removal(self, nodes: List[ast.AST]) -> None:
+        """Record that the decorators or statements `nodes` were removed from the tree."""
+        if (self._text is None) or (self._edits is None):
+            return
+
+        for node in nodes:
+            if isinstance(node, ast.stmt) and not self._text.is_isolated(node):
+                # Sharing a line with another statement, which cannot be spliced
+                self._edits = None
+                return
+
+            self._edits.append(
+                TextEdit(
+                    first=node.lineno,
+                    last=node.end_lineno,
+                    indent="",
+                    nodes=[],
+                    order=len(self._edits),
+                )
+            )
+
+    def promote(self) -> None:
+        """
+        Re-parse a module read without comments with them, so that they survive
+        its changes. Must be called before handing out nodes to be changed, as
+        every node is replaced.
+        """
+        if self._comments:
+            return
+
+        self._comments = True
+        if self._text is None:
+            return
+
+        self.node = ast_comments.parse(self._text.content)
+        self._symbols = None
+        self._entity_map = None
+        self._module_map = None
+        self._library_map = None
+        self._modified.clear()
+        self._clear_render_cache()
+
+    def _invalidate_imports(self) -> None:
+        self._import_cache.clear()
+        # Renders of the module, or including the imports
+        self._render_cache = {
+            key: value
+            for key, value in self._render_cache.items()
+            if (key[0] != id(self.node)) and not key[5]
+        }
+
+    def _clear_render_cache(self) -> None:
+        self._render_cache.clear()
+        self._import_cache.clear()
+        self._skeletons.clear()
 
     def get_import_statement(
         self,
@@ -50,6 +226,11 @@ class ASTSourceCode(BaseSourceCode):
         Return the leading import statements (statements that are placed at the top of the file)
         in string format
         """
+        key = (drop_directive, directive_prefix, relative_only)
+        cached = self._import_cache.get(key, None)
+        if (cached is not None) and (cached[0] is self.node):
+            return cached[1]
+
         import_list = extract_import_list(
             self.node,
             drop_directive=drop_directive,
@@ -59,27 +240,37 @@ class ASTSourceCode(BaseSourceCode):
         import_strings = [ast_comments.unparse(node) for node in import_list]
 
         # Combine the import strings into a single string
-        return "\n".join(import_strings)
+        import_statement = "\n".join(import_strings)
+        self._import_cache[key] = (self.node, import_statement)
+        return import_statement
 
     def __str__(self) -> str:
         return ast_comments.unparse(self.node)
 
     def update(self, class_to_replace, method_to_replace, function_to_replace):
+        self.promote()
         replacer = ReplaceNode(
             class_to_replace=class_to_replace,
             function_to_replace=function_to_replace,
             method_to_replace=method_to_replace,
         )
         self.node = replacer.visit(self.node)
+        self._symbols = None
+        self.invalidate_render()
 
     def update_function(self, new_code: str | ast.FunctionDef, func_name: str) -> None:
         if isinstance(new_code, str):
             new_code = ast_comments.parse(new_code)
             new_code = locate_function(ast_obj=new_code, func_name=func_name)
 
-        replace_transformer = ReplaceNode(function_to_replace={func_name: new_code})
-        replace_transformer.visit(self.node)
-        ast.fix_missing_locations(self.node)
+        self.promote()
+        old_node = self.symbols.get_function(func_name)
+        self.record_edit(old_node, new_code)
+        self.invalidate_render(old_node)
+        self.symbols.replace(old_node, new_code)
+        # Not parsed from the original text, nor is anything nested in it
+        self._modified.add(id(new_code))
+        ast.fix_missing_locations(new_code)
 
     def update_method(self, new_code: str, func_name: str, class_name: str) -> None:
         new_code = ast_comments.parse(new_code)
@@ -87,45 +278,68 @@ class ASTSourceCode(BaseSourceCode):
             new_method = locate_method(
                 ast_obj=new_code, func_name=func_name, class_name=class_name
             )
-            replace_transformer = ReplaceNode(
-                method_to_replace={class_name: {func_name: new_method}}
-            )
         except ValueError:
             new_method = locate_function(ast_obj=new_code, func_name=func_name)
-            replace_transformer = ReplaceNode(
-                method_to_replace={class_name: {func_name: new_method}}
-            )
-        self.node = replace_transformer.visit(self.node)
-        ast.fix_missing_locations(self.node)
+
+        self.promote()
+        old_node = self.symbols.get_method(func_name=func_name, class_name=class_name)
+        self.record_edit(old_node, new_method)
+        self.invalidate_render(old_node)
+        self.symbols.replace(old_node, new_method)
+        # Not parsed from the original text, nor is anything nested in it
+        self._modified.add(id(new_method))
+        ast.fix_missing_locations(new_method)
 
     def update_class(self, new_code: str, class_name: str) -> None:
         if isinstance(new_code, str):
             new_code = ast_comments.parse(new_code)
             new_code = locate_class(ast_obj=new_code, class_name=class_name)
 
-        replace_transformer = ReplaceNode(class_to_replace={class_name: new_code})
-        replace_transformer.visit(self.node)
-        ast.fix_missing_locations(self.node)
+        self.promote()
+        old_node = self.symbols.get_class(class_name)
+        self.record_edit(old_node, new_code)
+        self.invalidate_render(old_node)
+        self.symbols.replace(old_node, new_code)
+        # Not parsed from the original text, nor is anything nested in it
+        self._modified.add(id(new_code))
+        ast.fix_missing_locations(new_code)
 
     def update_module(self, new_code: str | ast.Module) -> None:
         if isinstance(new_code, str):
             new_code = ast_comments.parse(new_code)
 
         self.node = new_code
+        self._comments = True
+        self.invalidate_render()
 
-    def update_import_statement(self, new_code: str) -> None:
+    def update_import_statement(self, new_code: str | ast.Module) -> None:
         """
         import_list should be a list of ast node
         replace the import lines in self.code to the one in import_list
         """
-        code = ast_comments.parse(new_code)
-        existing_import_list = extract_import_list(self.node)
-        new_import_list = extract_import_list(code)
-        new_import = diff_import_list(
-            existing_import_list, new_import_list
-        )
-        for i in new_import:
-            self.node.body.insert(0, i)
+        code = ast_comments.parse(new_code) if isinstance(new_code, str) else new_code
+        self.promote()
+        import_index = ImportIndex(extract_import_list(self.node))
+        new_import, extended_import = import_index.merge(extract_import_list(code))
+        for i in extended_import:
+            self.record_edit(i)
+
+        if new_import:
+            # A single splice, in the order of the previous insertions one at a time at the top
+            self.node.body[0:0] = new_import[::-1]
+            if self._edits is not None:
+                self._edits.append(
+                    TextEdit(
+                        first=1,
+                        last=0,
+                        indent="",
+                        nodes=new_import[::-1],
+                        order=len(self._edits),
+                    )
+                )
+
+        if new_import or extended_import:
+            self.invalidate_render(self.node)
 
     def get_function(
         self,
@@ -134,14 +348,16 @@ class ASTSourceCode(BaseSourceCode):
         directive_prefix: str = "",
         drop_implementation: bool = False,
         return_global_import: bool = False,
+        source_slice: bool = False,
     ) -> str:
-        function_node = locate_function(ast_obj=self.node, func_name=func_name)
+        function_node = self.symbols.get_function(func_name)
         return self._unparse(
             node=function_node,
             drop_directive=drop_directive,
             directive_prefix=directive_prefix,
             drop_implementation=drop_implementation,
             return_global_import=return_global_import,
+            source_slice=source_slice,
         )
 
     def get_class(
@@ -151,14 +367,16 @@ class ASTSourceCode(BaseSourceCode):
         directive_prefix: str = "",
         drop_implementation: bool = False,
         return_global_import: bool = False,
+        source_slice: bool = False,
     ) -> str:
-        class_node = locate_class(ast_obj=self.node, class_name=class_name)
+        class_node = self.symbols.get_class(class_name)
         return self._unparse(
             node=class_node,
             drop_directive=drop_directive,
             directive_prefix=directive_prefix,
             drop_implementation=drop_implementation,
             return_global_import=return_global_import,
+            source_slice=source_slice,
         )
 
     def get_entity(
@@ -168,8 +386,13 @@ class ASTSourceCode(BaseSourceCode):
         directive_prefix: str = "",
         drop_implementation: bool = False,
         return_global_import: bool = False,
+        source_slice: bool = False,
     ) -> str:
-        entity_node: ast.AST = locate_entity(code=self.node, entity_name=entity_name)
+        """
+        With `source_slice`, the entity is sliced out of the text it was parsed from,
+        keeping its formatting and comments, unless it was modified since.
+        """
+        entity_node: ast.AST = self.symbols.get_entity(entity_name)
 
         return self._unparse(
             node=entity_node,
@@ -177,40 +400,110 @@ class ASTSourceCode(BaseSourceCode):
             directive_prefix=directive_prefix,
             drop_implementation=drop_implementation,
             return_global_import=return_global_import,
+            source_slice=source_slice,
         )
 
+    def get_skeleton(self, directive_prefix: Optional[str] = None) -> str:
+        """
+        Return the skeleton of the module: its imports, the signatures and docstrings
+        of its classes and functions, and the attributes of its classes, without the
+        directives starting with `directive_prefix`. Skeletons of unmodified modules
+        are cached by the hash of their text when the skeleton cache is enabled.
+        """
+
+        def build() -> str:
+            return ast_comments.unparse(
+                build_skeleton(self.node, directive_prefix=directive_prefix)
+            )
+
+        if (self._text is None) or not self._is_original(self.node):
+            return build()
+
+        key = directive_prefix if directive_prefix else ""
+        if key not in self._skeletons:
+            cache = get_skeleton_cache()
+            if cache is not None:
+                self._skeletons[key] = cache.load(self._text.content, key=key, build=build)
+
+            else:
+                self._skeletons[key] = build()
+
+        return self._skeletons[key]
+
     def get_entity_map(
         self, path: List[str] = None, refresh: bool = False
     ) -> EntityMap:
+        """
+        Map the names imported from other modules to the files of the project that
+        define them. Names imported from elsewhere, e.g. the standard library, map
+        to None.
+        """
         if (self._entity_map is None) or refresh:
-            entity_map = {}
+            self._resolve_imports()
+
+        return self._entity_map
 
-            # Extract relative import
-            import_list = extract_import_list(
-                self.node, 
-                drop_directive=True, 
-                relative_only=False
+    def get_module_map(self, refresh: bool = False) -> EntityMap:
+        """Map the names bound to whole modules, as in `import x.y as z`, to their files."""
+        if (self._module_map is None) or refresh:
+            self._resolve_imports()
+
+        return self._module_map
+
+    def get_library_map(self, refresh: bool = False) -> Dict[str, str]:
+        """
+        Map the names imported from modules outside the project, e.g. installed
+        libraries, to the name of the module they are imported from.
+        """
+        if (self._library_map is None) or refresh:
+            self._resolve_imports()
+
+        return self._library_map
+
+    def _resolve_imports(self) -> None:
+        resolver = get_import_resolver()
+        entity_map = {}
+        module_map = {}
+        library_map = {}
+        import_list = extract_import_list(
+            self.node, drop_directive=True, relative_only=False
+        )
+        for import_node in import_list:
+            if isinstance(import_node, ast.Import):
+                for alias in import_node.names:
+                    # `import x.y` binds `x`, `import x.y as z` binds the submodule
+                    bound = alias.asname if alias.asname else alias.name.split(".")[0]
+                    module_name = alias.name if alias.asname else bound
+                    module_map[bound] = resolver.resolve(module_name, base=self.filename)
+
+                continue
+
+            module_path = resolver.resolve(
+                import_node.module, level=import_node.level, base=self.filename
             )
-            for import_node in import_list:
-                if isinstance(import_node, ast.ImportFrom):
-                    module_name = import_node.module
-                    imported_items = [alias.name for alias in import_node.names]
-                    module_path = resolve_module_filepath(
-                        module_name,
-                        relative_level=max([1, import_node.level]),
-                        absolute_base_path=self.filename,
+            for alias in import_node.names:
+                if alias.name == "*":
+                    continue
+
+                # `from package import module` imports a module rather than an entity
+                if (module_path is None) or (module_path.name == "__init__.py"):
+                    submodule = ".".join(i for i in [import_node.module, alias.name] if i)
+                    submodule_path = resolver.resolve(
+                        submodule, level=import_node.level, base=self.filename
                     )
-                    # Resolve filepath from module_name
-                    for i in imported_items:
-                        entity_map[i] = module_path
-            self._entity_map = entity_map
-            
-            
+                    if submodule_path is not None:
+                        module_map[alias.asname if alias.asname else alias.name] = (
+                            submodule_path
+                        )
+                        continue
 
-            return entity_map
+                entity_map[alias.name] = module_path
+                if (module_path is None) and (import_node.level == 0):
+                    library_map[alias.name] = import_node.module
 
-        else:
-            return self._entity_map
+        self._entity_map = entity_map
+        self._module_map = module_map
+        self._library_map = library_map
 
     def unparse(
         self,
@@ -219,6 +512,7 @@ class ASTSourceCode(BaseSourceCode):
         drop_implementation: bool = False,
         exception: Optional[List[str]] = None,
         return_global_import: bool = False,
+        source_slice: bool = False,
     ) -> str:
         return self._unparse(
             node=self.node,
@@ -227,6 +521,7 @@ class ASTSourceCode(BaseSourceCode):
             drop_implementation=drop_implementation,
             exception=exception,
             return_global_import=return_global_import,
+            source_slice=source_slice,
         )
 
     def _unparse(
@@ -237,22 +532,54 @@ class ASTSourceCode(BaseSourceCode):
         drop_implementation: bool = False,
         exception: Optional[List[str]] = None,
         return_global_import: bool = False,
+        source_slice: bool = False,
     ) -> str:
-        # We need to create a copy to avoid mutation
-        node = copy.deepcopy(node)
-        if drop_directive:
-            if directive_prefix == "":
-                raise ValueError(
-                    "Must specify a directive_prefix when drop_directive set to True"
-                )
-            transformer = DropDirective(prefix=directive_prefix)
-            node = transformer.visit(node)
+        if drop_directive and directive_prefix == "":
+            raise ValueError(
+                "Must specify a directive_prefix when drop_directive set to True"
+            )
 
-        if drop_implementation:
-            transformer = DropImplementation(exception=exception if exception else [])
-            node = transformer.visit(node)
+        key = (
+            id(node),
+            drop_directive,
+            directive_prefix,
+            drop_implementation,
+            tuple(exception) if exception else (),
+            return_global_import,
+            source_slice,
+        )
+        cached = self._render_cache.get(key, None)
+        if (cached is not None) and (cached[0] is node):
+            return cached[1]
+
+        text = self._render(node, *key[1:])
+        self._render_cache[key] = (node, text)
+        return text
 
-        ast.fix_missing_locations(node)
+    def _render(
+        self,
+        node: ast.AST,
+        drop_directive: bool,
+        directive_prefix: str,
+        drop_implementation: bool,
+        exception: Tuple[str, ...],
+        return_global_import: bool,
+        source_slice: bool,
+    ) -> str:
+        code = None
+        if source_slice and not drop_implementation:
+            code = self._slice(
+                node, drop_directive=drop_directive, directive_prefix=directive_prefix
+            )
+
+        if code is None:
+            # Renders from a structurally shared copy, leaving `node` untouched
+            render_filter = RenderFilter(
+                directive_prefix=directive_prefix if drop_directive else None,
+                drop_implementation=drop_implementation,
+                exception=exception,
+            )
+            code = ast_comments.unparse(render_filter.apply(node))
 
         if return_global_import:
             return (
@@ -260,27 +587,114 @@ class ASTSourceCode(BaseSourceCode):
                     drop_directive=drop_directive, directive_prefix=directive_prefix
                 )
                 + "\n\n"
-                + ast_comments.unparse(node)
+                + code
             )
 
         else:
-            return ast_comments.unparse(node)
+            return code
+
+    def _slice(
+        self, node: ast.AST, drop_directive: bool, directive_prefix: str
+    ) -> Optional[str]:
+        """
+        Slice the text of `node` out of the text it was parsed from, leaving out the
+        lines of its directives. Returns None when that text no longer matches `node`.
+        """
+        if (self._text is None) or not self._is_original(node):
+            return None
 
-    def save(self, filename: Optional[str] = None) -> None:
+        skip_lines = set()
+        if drop_directive:
+            for i in find_directive_nodes(node, prefix=directive_prefix):
+                # Decorators always have lines of their own, statements may not
+                if isinstance(i, ast.stmt) and not self._text.is_isolated(i):
+                    return None
+
+                skip_lines.update(range(i.lineno, i.end_lineno + 1))
+
+        if node is self.node:
+            return self._text.get_lines(1, self._text.line_count, skip_lines=skip_lines)
+
+        return self._text.get_segment(node, skip_lines=skip_lines)
+
+    def _is_original(self, node: ast.AST) -> bool:
+        if node is self.node:
+            return id(node) not in self._modified
+
+        symbol = self.symbols.symbol_of(node)
+        if symbol is None:
+            return False
+
+        return all(id(i.node) not in self._modified for i in [symbol] + symbol.ancestors)
+
+    def save(self, filename: Optional[str] = None, splice: bool = False) -> None:
+        """
+        Write the module to `filename`. With `splice`, only the changed definitions,
+        imports and directives are rewritten in the text the module was parsed from,
+        keeping the formatting of the rest of the file. The whole module is unparsed
+        when the changes cannot be spliced, e.g. after `update_module`.
+        """
         filename = filename if filename else self.filename
-        write_file(filename, ast_comments.unparse(self.node))
+        self.promote()
+        if splice and (self._text is not None) and (self._edits is not None):
+            write_source(filename, self._text.splice(self._edits), encoding=self._encoding)
+
+        else:
+            write_source(filename, ast_comments.unparse(self.node), encoding=self._encoding)
+
+        self._clear_render_cache()
+        SourceCodeRegistry.invalidate_all(filename, keep=self)
 
     def serialize(self, output_file: str) -> None:
         with open(output_file, "wb") as f:
             pickle.dump(self, f)
 
     @classmethod
-    def from_file(cls, filename: str) -> ASTSourceCode:
-        content = read_file(filename)
-        code = ast_comments.parse(content)
-        return cls(node=code, filename=filename)
+    def from_file(
+        cls,
+        filename: str,
+        cache: Optional[ParseCache] = None,
+        source: Optional[SourceFile] = None,
+        comments: bool = True,
+    ) -> ASTSourceCode:
+        """
+        `source` is the content of the file when it has already been read. Without
+        `comments`, the file is parsed by the much faster `ast.parse`, for files that
+        are only read from: slices of the text still keep the comments, and the
+        module is re-parsed with them once it is changed (see `promote`).
+        """
+        cache = cache if cache else get_parse_cache()
+        parser = "ast_comments" if comments else "ast"
+        parse = ast_comments.parse if comments else ast.parse
+        if cache is not None:
+            code, content, encoding = cache.load(
+                filename, parser=parser, parse=parse, source=source
+            )
+
+        else:
+            source = source if source else read_source(filename)
+            content, encoding = source.text, source.encoding
+            code = parse(content)
+
+        source_code = cls(node=code, filename=filename)
+        source_code._encoding = encoding
+        source_code._comments = comments
+        # The bytes read are reused when they are the utf-8 encoding of the content
+        source_code._text = SourceText(
+            content, buffer=source.utf8 if (source and source.text == content) else None
+        )
+        return source_code
+
+    @classmethod
+    def read_only(cls, filename: str) -> ASTSourceCode:
+        """Load a file that is only read from, e.g. a dependency, without its comments."""
+        return cls.from_file(filename, comments=False)
 
     @classmethod
     def from_pickle(cls, pickle_file: str) -> ASTSourceCode:
         with open(pickle_file, "rb") as f:
             return pickle.load(f)
+
+
+# Files are loaded for their dependencies, those scanned for directives are registered
+source_registry = SourceCodeRegistry(loader=ASTSourceCode.read_only)
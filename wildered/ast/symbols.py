@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Type, Union
+
+DefinitionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef]
+
+FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+@dataclass(eq=False)
+class Symbol:
+    """A function, async function or class definition found in a module"""
+
+    qualname: str
+    node: DefinitionNode
+    parent: Optional[Symbol]
+    container: List[ast.AST]  # The statement list holding the node
+    path: Tuple[int, ...]  # Position of the definition, used for ordering
+    children: List[Symbol] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.node.name
+
+    @property
+    def depth(self) -> int:
+        return len(self.path)
+
+    @property
+    def lineno(self) -> int:
+        """First line of the definition, including its decorators"""
+        return min(
+            [self.node.lineno] + [i.lineno for i in self.node.decorator_list]
+        )
+
+    @property
+    def end_lineno(self) -> int:
+        return self.node.end_lineno
+
+    @property
+    def ancestors(self) -> List[Symbol]:
+        ancestor_list = []
+        cur_symbol = self.parent
+        while cur_symbol is not None:
+            ancestor_list.append(cur_symbol)
+            cur_symbol = cur_symbol.parent
+
+        return ancestor_list
+
+    def walk(self) -> Iterator[Symbol]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class SymbolTable:
+    """
+    Maps the qualified names (`Class.method`, `function.nested`) of every definition
+    in a tree to its node, built in a single pass over the statements of the tree.
+    Unqualified lookups return the shallowest definition first, following the order
+    of `ast.walk`.
+    """
+
+    def __init__(self, tree: ast.AST) -> None:
+        self.tree = tree
+        self.symbols: Dict[str, Symbol] = {}
+        self.by_name: Dict[str, List[Symbol]] = {}
+        self.by_node: Dict[int, Symbol] = {}
+        self.top_level: List[Symbol] = []
+
+        if isinstance(tree, DEFINITION_TYPES):
+            # Mirror ast.walk, which yields the root itself
+            self._add(node=tree, parent=None, container=[tree], path=(0,))
+
+        else:
+            self._collect(tree, parent=None, path=(), counter=[0])
+
+        for same_name in self.by_name.values():
+            same_name.sort(key=lambda x: (x.depth, x.path))
+
+    def __reduce__(self):
+        # `by_node` is keyed by object ids, which do not survive pickling
+        return (type(self), (self.tree,))
+
+    def __contains__(self, qualname: str) -> bool:
+        return qualname in self.symbols
+
+    def __iter__(self) -> Iterator[Symbol]:
+        return iter(self.symbols.values())
+
+    def get(
+        self, name: str, types: Tuple[Type[ast.AST], ...] = DEFINITION_TYPES
+    ) -> Optional[Symbol]:
+        """
+        Look up a definition by its qualified name, falling back to the shallowest
+        definition with the unqualified `name`.
+        """
+        symbol = self.symbols.get(name, None)
+        if symbol is not None and isinstance(symbol.node, types):
+            return symbol
+
+        for symbol in self.by_name.get(name, []):
+            if isinstance(symbol.node, types):
+                return symbol
+
+        return None
+
+    def get_function(self, func_name: str) -> DefinitionNode:
+        symbol = self.get(func_name, types=FUNCTION_TYPES)
+        if symbol is None:
+            raise ValueError(f"Function with function name '{func_name}' does not exist")
+
+        return symbol.node
+
+    def get_class(self, class_name: str) -> ast.ClassDef:
+        symbol = self.get(class_name, types=(ast.ClassDef,))
+        if symbol is None:
+            raise ValueError(f"Class with class name '{class_name}' does not exist")
+
+        return symbol.node
+
+    def get_method(self, func_name: str, class_name: str) -> DefinitionNode:
+        class_symbol = self.get(class_name, types=(ast.ClassDef,))
+        if class_symbol is None:
+            raise ValueError(f"Class with class name '{class_name}' does not exist")
+
+        method = self.symbols.get(f"{class_symbol.qualname}.{func_name}", None)
+        if method is not None and isinstance(method.node, FUNCTION_TYPES):
+            return method.node
+
+        for symbol in self.by_name.get(func_name, []):
+            if isinstance(symbol.node, FUNCTION_TYPES) and (
+                class_symbol in symbol.ancestors
+            ):
+                return symbol.node
+
+        raise ValueError(f"Function with function name '{func_name}' does not exist")
+
+    def get_entity(self, entity_name: str) -> Optional[DefinitionNode]:
+        symbol = self.get(entity_name)
+        return symbol.node if symbol is not None else None
+
+    def symbol_of(self, node: ast.AST) -> Optional[Symbol]:
+        return self.by_node.get(id(node), None)
+
+    def replace(self, old_node: DefinitionNode, new_node: DefinitionNode) -> None:
+        """
+        Replace `old_node` with `new_node` in the tree and patch the table. Passing
+        the same node twice refreshes the entries of a node mutated in place.
+        """
+        symbol = self.symbol_of(old_node)
+        if symbol is None:
+            raise ValueError(f"Node {old_node} is not part of the symbol table")
+
+        if old_node is not new_node:
+            for i, node in enumerate(symbol.container):
+                if node is old_node:
+                    symbol.container[i] = new_node
+                    break
+
+        self._remove(symbol)
+        new_symbol = self._add(
+            node=new_node,
+            parent=symbol.parent,
+            container=symbol.container,
+            path=symbol.path,
+        )
+        siblings = symbol.parent.children if symbol.parent else self.top_level
+        siblings.remove(new_symbol)
+        siblings[siblings.index(symbol)] = new_symbol
+
+        for cur_symbol in new_symbol.walk():
+            self.by_name[cur_symbol.name].sort(key=lambda x: (x.depth, x.path))
+
+    def _collect(
+        self,
+        node: ast.AST,
+        parent: Optional[Symbol],
+        path: Tuple[int, ...],
+        counter: List[int],
+    ) -> None:
+        for _, value in ast.iter_fields(node):
+            if not isinstance(value, list):
+                continue
+
+            for child in value:
+                if isinstance(child, DEFINITION_TYPES):
+                    self._add(
+                        node=child,
+                        parent=parent,
+                        container=value,
+                        path=path + (counter[0],),
+                    )
+                    counter[0] += 1
+
+                elif isinstance(child, (ast.stmt, ast.excepthandler, ast.match_case)):
+                    # Compound statements such as if/try/with share the enclosing scope
+                    self._collect(child, parent=parent, path=path, counter=counter)
+
+    def _add(
+        self,
+        node: DefinitionNode,
+        parent: Optional[Symbol],
+        container: List[ast.AST],
+        path: Tuple[int, ...],
+    ) -> Symbol:
+        qualname = f"{parent.qualname}.{node.name}" if parent else node.name
+        symbol = Symbol(
+            qualname=qualname,
+            node=node,
+            parent=parent,
+            container=container,
+            path=path,
+        )
+        if parent is not None:
+            parent.children.append(symbol)
+
+        else:
+            self.top_level.append(symbol)
+
+        # The first definition wins on redefinition, like the previous ast.walk lookups
+        self.symbols.setdefault(qualname, symbol)
+        self.by_node[id(node)] = symbol
+        self.by_name.setdefault(node.name, []).append(symbol)
+
+        self._collect(node, parent=symbol, path=path, counter=[0])
+        return symbol
+
+    def _remove(self, symbol: Symbol) -> None:
+        for cur_symbol in list(symbol.walk()):
+            if self.symbols.get(cur_symbol.qualname, None) is cur_symbol:
+                del self.symbols[cur_symbol.qualname]
+                # Expose a redefinition shadowed by the removed symbol
+                for other in self.by_name.get(cur_symbol.name, []):
+                    if other is not cur_symbol and other.qualname == cur_symbol.qualname:
+                        self.symbols[other.qualname] = other
+                        break
+
+            self.by_node.pop(id(cur_symbol.node), None)
+            same_name = self.by_name.get(cur_symbol.name, [])
+            if cur_symbol in same_name:
+                same_name.remove(cur_symbol)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import ast
+import io
+import re
+import tokenize
+from dataclasses import dataclass
+from typing import Collection, List, Optional, Set
+
+import ast_comments
+
+NEWLINE = re.compile(b"\n")
+
+
+@dataclass
+class TextEdit:
+    """
+    Replaces lines `first` to `last` (inclusive) of the original text with `nodes`,
+    unparsed and indented by `indent`. Insertions before line `first` have `last`
+    set to `first - 1`, and removals have no nodes.
+    """
+
+    first: int
+    last: int
+    indent: str
+    nodes: List[ast.AST]
+    order: int  # Position in the order of recording
+
+    @property
+    def is_insertion(self) -> bool:
+        return self.last < self.first
+
+
+def indent_code(code: str, indent: str) -> str:
+    """Indent the lines of `code`, except for those continuing a multi-line string."""
+    if not indent:
+        return code
+
+    continued: Set[int] = set()
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if (token.type == tokenize.STRING) and (token.end[0] > token.start[0]):
+            continued.update(range(token.start[0] + 1, token.end[0] + 1))
+
+    return "\n".join(
+        line if (lineno in continued or not line) else indent + line
+        for lineno, line in enumerate(code.split("\n"), start=1)
+    )
+
+
+class SourceText:
+    """
+    The text a module was parsed from, kept as utf-8 bytes (the unit of the column
+    offsets of ast nodes) along with the offset of every line, so that the text of
+    a node can be sliced out of it instead of unparsing the node.
+    """
+
+    def __init__(self, content: str, buffer: Optional[bytes] = None) -> None:
+        self.content = content
+        self._buffer = buffer
+        self._line_offsets: Optional[List[int]] = None
+
+    @property
+    def buffer(self) -> bytes:
+        """The content as utf-8, encoded on first use unless given"""
+        if self._buffer is None:
+            self._buffer = self.content.encode("utf-8")
+
+        return self._buffer
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """Offset of the start of every line, followed by the end of the buffer"""
+        if self._line_offsets is None:
+            offsets = [0]
+            offsets.extend(i.end() for i in NEWLINE.finditer(self.buffer))
+            if offsets[-1] != len(self.buffer):
+                offsets.append(len(self.buffer))
+
+            self._line_offsets = offsets
+
+        return self._line_offsets
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_offsets) - 1
+
+    def get_line(self, lineno: int) -> memoryview:
+        """Line `lineno` (1-based) without its line break, as a view into the buffer."""
+        start, end = self.line_offsets[lineno - 1], self.line_offsets[lineno]
+        while (end > start) and (self.buffer[end - 1] in b"\r\n"):
+            end -= 1
+
+        return memoryview(self.buffer)[start:end]
+
+    def is_isolated(self, node: ast.AST) -> bool:
+        """Whether no other statement shares a line with `node`."""
+        before = self.get_line(node.lineno)[: node.col_offset]
+        after = bytes(self.get_line(node.end_lineno)[node.end_col_offset :]).strip()
+        return (bytes(before).strip() == b"") and (after == b"" or after.startswith(b"#"))
+
+    def get_segment(
+        self, node: ast.AST, skip_lines: Collection[int] = ()
+    ) -> Optional[str]:
+        """
+        Return the text of a statement, from its first decorator to its end, dedented
+        by its indentation and without the lines in `skip_lines`. Returns None when
+        another statement shares a line with it.
+        """
+        if not self.is_isolated(node):
+            return None
+
+        decorators = getattr(node, "decorator_list", [])
+        first = min([node.lineno] + [i.lineno for i in decorators])
+        indent = bytes(self.get_line(node.lineno)[: node.col_offset])
+        return self.get_lines(first, node.end_lineno, indent=indent, skip_lines=skip_lines)
+
+    def get_lines(
+        self,
+        first: int,
+        last: int,
+        indent: bytes = b"",
+        skip_lines: Collection[int] = (),
+    ) -> str:
+        """
+        Return lines `first` to `last` (inclusive), removing `indent` from the lines
+        starting with it. Lines inside multi-line strings may not, and are kept as is.
+        """
+        lines = []
+        for lineno in range(first, last + 1):
+            if lineno in skip_lines:
+                continue
+
+            line = self.get_line(lineno)
+            if indent and (line[: len(indent)] == indent):
+                line = line[len(indent) :]
+
+            lines.append(line)
+
+        return b"\n".join(lines).decode("utf-8")
+
+    def get_indent(self, node: ast.AST) -> str:
+        return bytes(self.get_line(node.lineno)[: node.col_offset]).decode("utf-8")
+
+    def splice(self, edits: List[TextEdit]) -> str:
+        """
+        Apply `edits` to the text. Only the nodes of the edits are unparsed, every
+        other region is copied from the buffer as is. Edits within the lines of
+        another edit are covered by it and skipped.
+        """
+        edits = sorted(
+            edits, key=lambda x: (x.first, not x.is_insertion, -x.last, -x.order)
+        )
+        offsets = self.line_offsets
+        view = memoryview(self.buffer)
+        chunks = []
+        position = 0
+        covered = 0  # Last line replaced so far
+        for edit in edits:
+            if (not edit.is_insertion) and (edit.first <= covered):
+                continue
+
+            start = offsets[edit.first - 1]
+            chunks.append(view[position:start])
+            for node in edit.nodes:
+                code = indent_code(ast_comments.unparse(node), edit.indent)
+                chunks.append((code + "\n").encode("utf-8"))
+
+            position = offsets[edit.last]
+            covered = max(covered, edit.last)
+
+        chunks.append(view[position:])
+        return b"".join(chunks).decode("utf-8")
@@ -1,9 +1,11 @@
 import ast
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple, Union
+import copy
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeAlias, Union
 
 from typing_extensions import assert_never
 
+from .symbols import SymbolTable
+
 
 def get_call_name(call_node: ast.Call) -> str:
     if hasattr(call_node.func, "id"):
@@ -13,55 +15,99 @@ def get_call_name(call_node: ast.Call) -> str:
         return (call_node.func.value.id, call_node.func.attr)
 
 
-# TODO: Split the function
-def locate_import(
-    imports: List[Union[ast.Import, ast.ImportFrom]], keyword: str
-) -> Optional[Union[ast.Import, ast.ImportFrom]]:
-    """Locates the import statement with the given `keyword`.
-    Args:
-        imports: A list of `ast.Import` or `ast.ImportFrom` nodes representing import statements.
-        keyword: The name or module being searched.
-    Returns:
-        The matching `ast.Import` or `ast.ImportFrom` node if found, or `None` if not found.
-    Raises:
-        None.
-    """
-    for imp in imports:
-        if isinstance(imp, ast.Import):
-            for name in imp.names:
-                if name.name == keyword:
-                    return imp
-                
-        elif isinstance(imp, ast.ImportFrom):
-            continue
-        
-        else:
-            assert_never(imp)
+def get_directive_name(node: ast.AST, prefix: str) -> Optional[str]:
+    """Return `name` if `node` is a `prefix.name(...)` call, otherwise None."""
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == prefix
+    ):
+        return node.func.attr
 
     return None
 
-def locate_import_from(imports: List[Union[ast.Import, ast.ImportFrom]], keyword: str, level: int
-) -> Optional[ast.ImportFrom]:
-    for imp in imports:
-        if isinstance(imp, ast.Import):
-            continue
-        
-        elif isinstance(imp, ast.ImportFrom):
-            if imp.module == keyword and imp.level == level:
-                return imp
-        
-        else:
-            assert_never(imp)
-            
-    return None
 
-def integrate_alias(old_aliases: List[ast.alias], new_aliases: List[ast.alias]) -> None:
-    old_alias_names = [i.name for i in old_aliases]
-    def is_new_alias(alias: ast.alias) -> bool:
-        return not(alias.name in old_alias_names)
+# The name and asname of an imported alias
+AliasKey: TypeAlias = Tuple[str, Optional[str]]
+
+
+class ImportIndex:
+    """
+    Indexes import statements by what they import: the (name, asname) of the aliases
+    of `import` statements, and for `from` imports the first statement and every
+    alias per (module, level). Merging other imports into it then takes constant
+    time per alias instead of a scan over the existing imports.
+    """
+
+    def __init__(self, imports: List[Union[ast.Import, ast.ImportFrom]]) -> None:
+        self.imported: Set[AliasKey] = set()
+        self.from_imports: Dict[Tuple[Optional[str], int], ast.ImportFrom] = {}
+        self.from_aliases: Dict[Tuple[Optional[str], int], Set[AliasKey]] = {}
+        for node in imports:
+            if isinstance(node, ast.Import):
+                self.imported.update((i.name, i.asname) for i in node.names)
+
+            elif isinstance(node, ast.ImportFrom):
+                key = (node.module, node.level)
+                self.from_imports.setdefault(key, node)
+                self.from_aliases.setdefault(key, set()).update(
+                    (i.name, i.asname) for i in node.names
+                )
+
+            else:
+                assert_never(node)
+
+    def merge(
+        self, new_imports: List[Union[ast.Import, ast.ImportFrom]]
+    ) -> Tuple[List[Union[ast.Import, ast.ImportFrom]], List[ast.ImportFrom]]:
+        """
+        Merge `new_imports` into the indexed imports, skipping the aliases already
+        imported, duplicates in `new_imports` included. Returns the statements to
+        add, which are copies, and the indexed `from` imports that new aliases were
+        appended to in place.
+        """
+        added = []
+        added_ids = set()
+        extended: Dict[int, ast.ImportFrom] = {}
+        for node in new_imports:
+            if isinstance(node, ast.Import):
+                names = self._filter(node.names, seen=self.imported)
+                if names:
+                    added.append(replace_fields(node, {"names": names}))
+
+            elif isinstance(node, ast.ImportFrom):
+                key = (node.module, node.level)
+                names = self._filter(node.names, seen=self.from_aliases.setdefault(key, set()))
+                if not names:
+                    continue
+
+                match = self.from_imports.get(key, None)
+                if match is None:
+                    match = self.from_imports[key] = replace_fields(node, {"names": names})
+                    added.append(match)
+                    added_ids.add(id(match))
+
+                else:
+                    match.names.extend(names)
+                    if id(match) not in added_ids:
+                        extended[id(match)] = match
+
+            else:
+                assert_never(node)
+
+        return added, list(extended.values())
+
+    def _filter(self, aliases: List[ast.alias], seen: Set[AliasKey]) -> List[ast.alias]:
+        new_aliases = []
+        for alias in aliases:
+            key = (alias.name, alias.asname)
+            if key not in seen:
+                seen.add(key)
+                new_aliases.append(alias)
+
+        return new_aliases
 
-    new_alias_list = filter(is_new_alias, new_aliases)
-    old_aliases.extend(new_alias_list)
 
 def diff_import_list(
     old_imports: List[Union[ast.Import, ast.ImportFrom]],
@@ -72,27 +118,12 @@ def diff_import_list(
         old_imports: A list of `ast.Import` or `ast.ImportFrom` nodes representing the old import statements.
         new_imports: A list of `ast.Import` or `ast.ImportFrom` nodes representing the new import statements.
     Returns:
-        A tuple containing two lists:
-        - `new_import_ast`: A list of new import statements found in `new_imports`.
-        - `modified_import_from_ast`: A list of modified `ast.ImportFrom` statements found in `new_imports`.
+        The import statements to add. New aliases of a module already imported from
+        in `old_imports` are appended to that statement in place.
     Raises:
         None.
     """
-    # Will modify the import from inplace if available.
-    new_import_ast = []
-
-    for i in new_imports:
-        if isinstance(i, ast.Import):
-            match = locate_import(old_imports, i.names[0].name)
-            if match is None:  # Meaning it is a new import
-                new_import_ast.append(i)
-        elif isinstance(i, ast.ImportFrom):
-            match = locate_import_from(old_imports, i.module, level=i.level)
-            if match is None:  # New import
-                new_import_ast.append(i)
-            else:
-                # TODO: Not elegant
-                integrate_alias(old_aliases=match.names, new_aliases=i.names)
+    new_import_ast, _ = ImportIndex(old_imports).merge(new_imports)
     return new_import_ast
 
 
@@ -101,12 +132,12 @@ class DropDirective(ast.NodeTransformer):
         self.prefix = prefix
 
     def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.FunctionDef:
-        node.decorator_list = filter(self.filter_directive, node.decorator_list)
+        node.decorator_list = list(filter(self.filter_directive, node.decorator_list))
         self.generic_visit(node)
         return node
 
     def visit_ClassDef(self, node: ast.ClassDef) -> ast.ClassDef:
-        node.decorator_list = filter(self.filter_directive, node.decorator_list)
+        node.decorator_list = list(filter(self.filter_directive, node.decorator_list))
         self.generic_visit(node)
         return node
 
@@ -131,23 +162,14 @@ class DropDirective(ast.NodeTransformer):
             return node
 
     def visit_ImportFrom(self, node: ast.ImportFrom) -> Optional[ast.ImportFrom]:
-        if node.module.startswith(self.prefix):
+        if (node.module is not None) and node.module.startswith(self.prefix):
             return None
 
         else:
             return node
 
     def filter_directive(self, decorator: Union[ast.Call, ast.Name]) -> bool:
-        if isinstance(decorator, ast.Call):
-            prefix, node_name = get_call_name(decorator)
-
-            if prefix == self.prefix:
-                return False
-
-            return True
-
-        else:
-            return True
+        return get_directive_name(decorator, prefix=self.prefix) is None
 
 
 class ReplaceNode(ast.NodeTransformer):
@@ -211,27 +233,255 @@ class DropImplementation(ast.NodeTransformer):
             return node
 
 
-def locate_function(ast_obj: ast.AST, func_name: str) -> ast.FunctionDef:
-    for node in ast.walk(ast_obj):
-        if isinstance(node, ast.FunctionDef):
-            if node.name == func_name:
-                return node
+# Fields holding the statements nested in a statement
+BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
 
-    raise ValueError(f"Function with function name '{func_name}' does not exist")
 
+class RenderFilter:
+    """
+    Non-mutating counterpart of DropDirective followed by DropImplementation. Nodes
+    on the path to a change are shallow-copied, while every other node is shared
+    with the original tree, which is never modified.
+    """
 
-def locate_class(ast_obj: ast.AST, class_name: str) -> ast.ClassDef:
-    for node in ast.walk(ast_obj):
-        if isinstance(node, ast.ClassDef) and node.name == class_name:
-            return node
+    def __init__(
+        self,
+        directive_prefix: Optional[str] = None,
+        drop_implementation: bool = False,
+        exception: Optional[List[str]] = None,
+    ) -> None:
+        self.directive_prefix = directive_prefix
+        self.drop_implementation = drop_implementation
+        self.exception = exception if exception else []
+
+    def apply(self, node: ast.AST) -> ast.AST:
+        if self.directive_prefix is not None:
+            node = self.drop_directive(node)
+
+        if self.drop_implementation:
+            node = self.drop_body(node)
+
+        return node
+
+    def drop_directive(self, node: ast.AST) -> Optional[ast.AST]:
+        """Return `node` without its directives, or None if it is a directive itself."""
+        prefix = self.directive_prefix
+        match node:
+            case ast.FunctionDef() | ast.ClassDef():
+                changes = self.filter_blocks(node, self.drop_directive)
+                decorator_list = [
+                    i for i in node.decorator_list if get_directive_name(i, prefix) is None
+                ]
+                if len(decorator_list) != len(node.decorator_list):
+                    changes["decorator_list"] = decorator_list
+
+                return replace_fields(node, changes)
+
+            case ast.Expr():
+                is_run = get_directive_name(node.value, prefix) == "run"
+                return None if is_run else node
+
+            case ast.Import():
+                return None if node.names[0].name.startswith(prefix) else node
+
+            case ast.ImportFrom():
+                is_directive = (node.module is not None) and node.module.startswith(prefix)
+                return None if is_directive else node
+
+            case _:
+                return replace_fields(node, self.filter_blocks(node, self.drop_directive))
+
+    def drop_body(self, node: ast.AST) -> ast.AST:
+        """Return `node` with the body of its functions replaced by their docstring."""
+        if isinstance(node, ast.FunctionDef) and (node.name not in self.exception):
+            docstring = ast.get_docstring(node)
+            if docstring:
+                body = [ast.Expr(value=ast.Constant(value=docstring))]
+
+            else:
+                body = []
+
+            return replace_fields(node, {"body": body})
+
+        return replace_fields(node, self.filter_blocks(node, self.drop_body))
+
+    def filter_blocks(
+        self, node: ast.AST, visit: Callable[[ast.AST], Optional[ast.AST]]
+    ) -> Dict[str, List[ast.AST]]:
+        """Apply `visit` to the nested statements of `node`, returning the changed lists."""
+        changes = {}
+        for field_name in BLOCK_FIELDS:
+            statements = getattr(node, field_name, None)
+            if not statements:
+                continue
+
+            new_statements = [visit(i) for i in statements]
+            if any(i is not j for i, j in zip(new_statements, statements)):
+                changes[field_name] = [i for i in new_statements if i is not None]
 
-    raise ValueError(f"Class with class name '{class_name}' does not exist")
+        return changes
+
+
+def build_skeleton(node: ast.Module, directive_prefix: Optional[str] = None) -> ast.Module:
+    """
+    Reduce a module to its docstring, top-level imports, and the signatures and
+    docstrings of its classes and functions, along with the attributes of its
+    classes. The module is not modified, and the skeleton shares its nodes.
+    """
+    if directive_prefix is not None:
+        node = RenderFilter(directive_prefix=directive_prefix).apply(node)
+
+    def summarize(body: List[ast.stmt], in_class: bool) -> List[ast.stmt]:
+        statements = []
+        for i, statement in enumerate(body):
+            match statement:
+                case ast.Expr(value=ast.Constant(value=str())) if i == 0:
+                    statements.append(statement)
+
+                case ast.Import() | ast.ImportFrom() if not in_class:
+                    statements.append(statement)
+
+                case ast.Assign() | ast.AnnAssign() if in_class:
+                    statements.append(statement)
+
+                case ast.FunctionDef() | ast.AsyncFunctionDef():
+                    docstring = ast.get_docstring(statement, clean=False)
+                    placeholder = docstring if docstring is not None else ...
+                    function_body = [ast.Expr(value=ast.Constant(placeholder))]
+                    statements.append(replace_fields(statement, {"body": function_body}))
+
+                case ast.ClassDef():
+                    class_body = summarize(statement.body, in_class=True)
+                    if not class_body:
+                        class_body = [ast.Expr(value=ast.Constant(...))]
+
+                    statements.append(replace_fields(statement, {"body": class_body}))
+
+        return statements
+
+    return ast.Module(body=summarize(node.body, in_class=False), type_ignores=[])
+
+
+def find_directive_nodes(node: ast.AST, prefix: str) -> List[ast.AST]:
+    """
+    Return the decorators and statements of `node` that RenderFilter drops with
+    `directive_prefix=prefix`, without copying anything.
+    """
+    found = []
+    match node:
+        case ast.FunctionDef() | ast.ClassDef():
+            found.extend(
+                i for i in node.decorator_list if get_directive_name(i, prefix) is not None
+            )
+
+        case ast.Expr():
+            if get_directive_name(node.value, prefix) == "run":
+                found.append(node)
+
+            return found
+
+        case ast.Import():
+            if node.names[0].name.startswith(prefix):
+                found.append(node)
+
+            return found
+
+        case ast.ImportFrom():
+            if (node.module is not None) and node.module.startswith(prefix):
+                found.append(node)
+
+            return found
+
+    for field_name in BLOCK_FIELDS:
+        for statement in getattr(node, field_name, None) or []:
+            found.extend(find_directive_nodes(statement, prefix))
+
+    return found
+
+
+def get_root_name(node: ast.AST) -> Optional[str]:
+    """Name at the root of an attribute, call or subscript chain, e.g. `a` of `a.b().c`."""
+    while isinstance(node, (ast.Attribute, ast.Call, ast.Subscript)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def collect_references(node: ast.AST) -> List[str]:
+    """
+    Return the names `node` refers to in its annotations, base classes, calls and
+    at the root of its attribute accesses, without duplicates. Local and builtin
+    names are included, they are left to the caller to resolve or ignore.
+    """
+    annotations: List[ast.AST] = []
+    roots: List[ast.AST] = []
+    for child in ast.walk(node):
+        match child:
+            case ast.FunctionDef() | ast.AsyncFunctionDef():
+                arguments = child.args
+                annotations.extend(
+                    i.annotation
+                    for i in (
+                        arguments.posonlyargs
+                        + arguments.args
+                        + arguments.kwonlyargs
+                        + [arguments.vararg, arguments.kwarg]
+                    )
+                    if (i is not None) and (i.annotation is not None)
+                )
+                if child.returns is not None:
+                    annotations.append(child.returns)
+
+            case ast.ClassDef():
+                roots.extend(child.bases)
+
+            case ast.AnnAssign():
+                annotations.append(child.annotation)
+
+            case ast.Call():
+                roots.append(child.func)
+
+            case ast.Attribute():
+                roots.append(child.value)
+
+    names = {}
+    for annotation in annotations:
+        # Every name of e.g. `Dict[str, Model]`
+        for i in ast.walk(annotation):
+            if isinstance(i, ast.Name):
+                names.setdefault(i.id, (i.lineno, i.col_offset))
+
+    for root in roots:
+        name = get_root_name(root)
+        if name is not None:
+            names.setdefault(name, (root.lineno, root.col_offset))
+
+    # In the order they appear in
+    return sorted(names, key=lambda x: names[x])
+
+
+def replace_fields(node: ast.AST, changes: Dict[str, Any]) -> ast.AST:
+    """Return a shallow copy of `node` with `changes` applied, or `node` itself if none."""
+    if not changes:
+        return node
+
+    new_node = copy.copy(node)
+    for field_name, value in changes.items():
+        setattr(new_node, field_name, value)
+
+    return new_node
+
+
+def locate_function(ast_obj: ast.AST, func_name: str) -> ast.FunctionDef:
+    return SymbolTable(ast_obj).get_function(func_name)
+
+
+def locate_class(ast_obj: ast.AST, class_name: str) -> ast.ClassDef:
+    return SymbolTable(ast_obj).get_class(class_name)
 
 
 def locate_method(ast_obj: ast.AST, func_name: str, class_name: str) -> ast.FunctionDef:
-    class_node = locate_class(ast_obj, class_name=class_name)
-    method_node = locate_function(class_node, func_name=func_name)
-    return method_node
+    return SymbolTable(ast_obj).get_method(func_name=func_name, class_name=class_name)
 
 
 def is_directive_import(
@@ -287,37 +537,5 @@ def extract_import_list(
     return imports
 
 
-class NodeFinder(ast.NodeVisitor):
-    def __init__(
-        self,
-        entity_list: Optional[List[str]] = None,
-    ) -> None:
-        """
-        Initialize the NodeFinder class.
-        Args:
-            entity_list: Optional[List[str]] = None
-        """
-        self.entity_list = entity_list if entity_list else []
-        self.found_node = defaultdict(lambda: None)
-
-    def visit_FunctionDef(self, node):
-        if node.name in self.entity_list:
-            self.found_node[node.name] = node
-
-        self.generic_visit(node)
-        
-        return node
-
-    def visit_ClassDef(self, node):
-        if node.name in self.entity_list:
-            self.found_node[node.name] = node
-
-        self.generic_visit(node)
-        
-        return node
-
-
 def locate_entity(code: ast.AST, entity_name: str):
-    finder = NodeFinder(entity_name)
-    finder.visit(code)
-    return finder.found_node[entity_name]
+    return SymbolTable(code).get_entity(entity_name)
@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from wildered.logger import logger
+from wildered.utils import SourceFile, get_write_batch, read_source, write_file
+
+try:
+    import fcntl
+
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # 256 MiB of pickled trees
+CACHE_FORMAT = 2
+# The index is written every this many stores, and when the cache is flushed
+FLUSH_INTERVAL = 256
+SKELETON_FORMAT = 1
+
+# Entries whose mtime is this close to the time they were written are
+# re-verified by content hash, as the filesystem clock may be too coarse
+# to notice an edit made right after the file was cached.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def get_default_cache_dir(name: str = "parse") -> Path:
+    """
+    The cache `name` of the current user, e.g. `~/.cache/wildered/parse`. Caches
+    are never kept in the project, as a cloned repository could ship a directory
+    of pickles to be loaded.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME", "")
+    cache_home = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return cache_home / "wildered" / name
+
+
+def get_cache_version() -> str:
+    """
+    Version stamp of the cache. Entries written under another stamp are discarded,
+    so that upgrading wildered or Python never loads an incompatible tree.
+    """
+    try:
+        wildered_version = version("wildered")
+
+    except PackageNotFoundError:
+        wildered_version = "unknown"
+
+    return f"{CACHE_FORMAT}-{wildered_version}-{sys.implementation.cache_tag}-{sys.version_info.releaselevel}{sys.version_info.micro}"
+
+
+def hash_content(content: str) -> str:
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def lock_file(f: IO[bytes]) -> None:
+    """Block until the exclusive lock of `f` is acquired, released when it is closed."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+class ParseCache:
+    """
+    An on-disk cache of parsed source files.
+
+    Each entry is keyed by the resolved path of the file and the parser used,
+    and is validated against the size, mtime and content hash of the file.
+    The total size of the stored trees is capped at `max_size` bytes, with the
+    least recently used entries evicted first. The index is written
+    every `FLUSH_INTERVAL` stores, and on `flush` or exit, merged with the index
+    on disk so that several processes can share the cache.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path | str] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.directory = Path(directory) if directory else get_default_cache_dir()
+        self.max_size = max_size
+        self.version = get_cache_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._total_size = 0  # Sum of the `nbytes` of the entries
+        self._pending_stores = 0
+        # Changes since the last flush, to be merged into the index on disk
+        self._stored: Set[str] = set()
+        self._touched: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._dirty = False
+        atexit.register(self.flush)
+
+    @property
+    def index_file(self) -> Path:
+        return self.directory / "index.json"
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._load_index()
+            self._total_size = sum(i["nbytes"] for i in self._entries.values())
+
+        return self._entries
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size": self._total_size,
+        }
+
+    def load(
+        self,
+        filename: Path | str,
+        parser: str,
+        parse: Callable[[str], Any],
+        source: Optional[SourceFile] = None,
+    ) -> Tuple[Any, str, str]:
+        """
+        Return the parsed tree, the content and the encoding of `filename`, parsing
+        the file with `parse` only when no valid cache entry exists. The file is read
+        unless its `source` is given. Files written to the active write batch are
+        parsed from their pending content, which is not cached.
+        """
+        path = Path(filename).resolve()
+        batch = get_write_batch()
+        if (batch is not None) and (path in batch):
+            source = source if source else read_source(path)
+            return parse(source.text), source.text, source.encoding
+
+        key = self._get_key(path=path, parser=parser)
+        stat = os.stat(path)
+        entry = self.entries.get(key, None)
+
+        if entry is not None and self._is_fresh(entry=entry, stat=stat):
+            payload = self._read_payload(key)
+            if payload is not None:
+                self._touch(key)
+                self.hits += 1
+                return payload
+
+        source = source if source else read_source(path)
+        content = source.text
+        digest = hash_content(content)
+        if entry is not None and entry["digest"] == digest:
+            payload = self._read_payload(key)
+            if payload is not None:
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["written_ns"] = time.time_ns()
+                self._stored.add(key)
+                self._touch(key)
+                self.hits += 1
+                return payload
+
+        self.misses += 1
+        tree = parse(content)
+        self._store(
+            key=key,
+            path=path,
+            parser=parser,
+            stat=stat,
+            digest=digest,
+            payload=(tree, content, source.encoding),
+        )
+        return tree, content, source.encoding
+
+    def invalidate(self, filename: Path | str) -> None:
+        path = str(Path(filename).resolve())
+        for key, entry in list(self.entries.items()):
+            if entry["path"] == path:
+                self._remove(key)
+
+    def clear(self) -> None:
+        for key in list(self.entries.keys()):
+            self._remove(key)
+
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the index, merging the changes made since the last flush into the
+        index on disk, which other processes may have written in the meantime.
+        """
+        if not self._dirty:
+            return
+
+        self.directory.mkdir(exist_ok=True, parents=True)
+        with self._lock_index():
+            entries = self._read_index()
+            entries = entries if entries is not None else {}
+            for key in self._removed:
+                entries.pop(key, None)
+
+            for key in self._touched:
+                if (key in entries) and (key in self.entries):
+                    entries[key]["last_access"] = max(
+                        entries[key]["last_access"],
+                        self.entries[key]["last_access"],
+                    )
+
+            for key in self._stored:
+                if key in self.entries:
+                    entries[key] = self.entries[key]
+
+            self._entries = entries
+            self._total_size = sum(i["nbytes"] for i in entries.values())
+            self._evict()
+
+            index = {"version": self.version, "entries": entries}
+            tmp_file = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(json.dumps(index))
+            os.replace(tmp_file, self.index_file)
+
+        self._stored.clear()
+        self._touched.clear()
+        self._removed.clear()
+        self._dirty = False
+        self._pending_stores = 0
+
+    @contextmanager
+    def _lock_index(self) -> Iterator[None]:
+        with open(self.directory / "index.lock", "a+b") as f:
+            lock_file(f)
+            yield
+
+    def _get_key(self, path: Path, parser: str) -> str:
+        return hashlib.sha1(f"{parser}\0{path}".encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, entry: Dict[str, Any], stat: os.stat_result) -> bool:
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return False
+
+        # Racy entry, let the caller verify it by its content hash
+        return entry["written_ns"] - entry["mtime_ns"] > RACY_WINDOW_NS
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_file.exists():
+            return {}
+
+        entries = self._read_index()
+        if entries is None:
+            logger.debug("Discarding parse cache written by another version")
+            for payload_file in self.directory.glob("*.pickle"):
+                payload_file.unlink(missing_ok=True)
+
+            self._dirty = True
+            return {}
+
+        return entries
+
+    def _read_index(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """The entries of the index on disk, or None if written by another version."""
+        try:
+            index = json.loads(self.index_file.read_text())
+
+        except (OSError, ValueError):
+            return {}
+
+        if index.get("version", None) != self.version:
+            return None
+
+        return index["entries"]
+
+    def _read_payload(self, key: str) -> Optional[Tuple[Any, str, str]]:
+        try:
+            with open(self.directory / f"{key}.pickle", "rb") as f:
+                return pickle.load(f)
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            self._remove(key)
+            return None
+
+    def _store(
+        self,
+        key: str,
+        path: Path,
+        parser: str,
+        stat: os.stat_result,
+        digest: str,
+        payload: Tuple[Any, str, str],
+    ) -> None:
+        try:
+            data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+        except (pickle.PicklingError, RecursionError, TypeError) as e:
+            logger.debug(f"Unable to cache parse result of {path}: {e}")
+            return
+
+        if len(data) > self.max_size:
+            return
+
+        self.directory.mkdir(exist_ok=True, parents=True)
+        payload_file = self.directory / f"{key}.pickle"
+        tmp_file = payload_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, payload_file)
+
+        self._remove_entry(key)
+        self.entries[key] = {
+            "path": str(path),
+            "parser": parser,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+            "nbytes": len(data),
+            "written_ns": time.time_ns(),
+            "last_access": 0,
+        }
+        self._total_size += len(data)
+        self._stored.add(key)
+        self._removed.discard(key)
+        self._touch(key)
+        self._evict()
+        self._pending_stores += 1
+        if self._pending_stores >= FLUSH_INTERVAL:
+            self.flush()
+
+    def _touch(self, key: str) -> None:
+        entry = self.entries.get(key, None)
+        if entry is not None:
+            entry["last_access"] = time.time_ns()
+            self._touched.add(key)
+            self._dirty = True
+
+    def _evict(self) -> None:
+        if self._total_size <= self.max_size:
+            return
+
+        lru_order = sorted(self.entries.items(), key=lambda x: x[1]["last_access"])
+        for key, entry in lru_order:
+            if self._total_size <= self.max_size:
+                break
+
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self._remove_entry(key)
+        (self.directory / f"{key}.pickle").unlink(missing_ok=True)
+        self._stored.discard(key)
+        self._removed.add(key)
+        self._dirty = True
+
+    def _remove_entry(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self._total_size -= entry["nbytes"]
+
+
+class SkeletonCache:
+    """
+    An on-disk cache of module skeletons (see `build_skeleton`), keyed by the hash
+    of the content they were built from, so that a module is only summarized once
+    until it changes, whichever path it is found at.
+    """
+
+    def __init__(self, directory: Optional[Path | str] = None) -> None:
+        self.directory = (
+            Path(directory) if directory else get_default_cache_dir("skeleton")
+        )
+        self._skeletons: Dict[str, str] = {}
+
+    def load(self, content: str, key: str, build: Callable[[], str]) -> str:
+        """
+        Return the skeleton of `content`, calling `build` when there is none yet.
+        `key` tells apart the skeletons of the same content, e.g. by directive prefix.
+        """
+        digest = hash_content(f"{SKELETON_FORMAT}\0{key}\0{content}")
+        skeleton = self._skeletons.get(digest, None)
+        if skeleton is not None:
+            return skeleton
+
+        skeleton_file = self.directory / f"{digest}.py"
+        try:
+            skeleton = skeleton_file.read_text(encoding="utf-8")
+
+        except (OSError, UnicodeDecodeError):
+            skeleton = build()
+            try:
+                self.directory.mkdir(exist_ok=True, parents=True)
+                write_file(skeleton_file, skeleton)
+
+            except OSError as e:
+                logger.debug(f"Unable to cache skeleton {digest}: {e}")
+
+        self._skeletons[digest] = skeleton
+
+        return skeleton
+
+
+_parse_cache: Optional[ParseCache] = None
+_skeleton_cache: Optional[SkeletonCache] = None
+
+
+def enable_parse_cache(
+    directory: Optional[Path | str] = None, max_size: int = DEFAULT_MAX_SIZE
+) -> ParseCache:
+    """
+    Enable the process-wide parse cache used by `from_file` of the source code classes.
+    """
+    global _parse_cache
+    _parse_cache = ParseCache(directory=directory, max_size=max_size)
+    return _parse_cache
+
+
+def disable_parse_cache() -> None:
+    global _parse_cache
+    if _parse_cache is not None:
+        _parse_cache.flush()
+
+    _parse_cache = None
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    return _parse_cache
+
+
+def enable_skeleton_cache(directory: Optional[Path | str] = None) -> SkeletonCache:
+    global _skeleton_cache
+    _skeleton_cache = SkeletonCache(directory=directory)
+    return _skeleton_cache
+
+
+def disable_skeleton_cache() -> None:
+    global _skeleton_cache
+    _skeleton_cache = None
+
+
+def get_skeleton_cache() -> Optional[SkeletonCache]:
+    return _skeleton_cache
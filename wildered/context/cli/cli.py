@@ -1,38 +1,73 @@
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 
 import typer
 
+from ..commands import index as _index
 from ..commands import scan as _scan
+from ..commands import watch as _watch
 
 app = typer.Typer()
 
-SCAN_HELP = "Scan for autocomplete directives in the specified filename and output the result in a markdown file."
+SCAN_HELP = "Scan for autocomplete directives in the specified files, directories or glob patterns and output the result in a markdown file."
 SCAN_CLIPBOARD_HELP = "Whether to copy the formatted prompt to your clipboard"
 SCAN_REMOVE_DIRECTIVE_HELP = """\
 Whether to remove the directive after the program exits. \
-WARNING: This will mess up your code formatting as AST is used. \
-In the future, we will allow manipulation of source code without messing up the formatting.\
+Only the lines of the directives are removed, the rest of the file is left as is.\
 """
 SCAN_AUTO_INTEGRATE = """\
-Whether to integrate the LLM response automatically into your script.
-WARNING: This will mess up your code formatting as AST is used. \
-In the future, we will allow manipulation of source code without messing up the formatting.\
+Whether to integrate the LLM response automatically into your script. \
+Only the updated entities and imports are rewritten, the rest of the file keeps its formatting.\
 """
+SCAN_CACHE_HELP = "Whether to reuse parsed files from the parse cache in your user cache directory ($XDG_CACHE_HOME or ~/.cache)/wildered"
+SCAN_WORKERS_HELP = "Number of processes scanning files in parallel, defaults to the number of CPUs"
+SCAN_ALL_OR_NOTHING_HELP = "Whether to leave every file untouched when the run fails or any file cannot be written"
 
 @app.command(help=SCAN_HELP)
 def scan(
-    filename: str,
+    paths: Annotated[List[str], typer.Argument()],
     clipboard: Annotated[bool, typer.Option(help=SCAN_CLIPBOARD_HELP, show_default="True")] = True,
     remove_directive: Annotated[bool, typer.Option(help=SCAN_REMOVE_DIRECTIVE_HELP, show_default="False")] = False,
-    auto_integrate: Annotated[bool, typer.Option(help=SCAN_AUTO_INTEGRATE, show_default="False")] = False
+    auto_integrate: Annotated[bool, typer.Option(help=SCAN_AUTO_INTEGRATE, show_default="False")] = False,
+    cache: Annotated[bool, typer.Option(help=SCAN_CACHE_HELP, show_default="True")] = True,
+    workers: Annotated[Optional[int], typer.Option(help=SCAN_WORKERS_HELP)] = None,
+    all_or_nothing: Annotated[bool, typer.Option(help=SCAN_ALL_OR_NOTHING_HELP, show_default="False")] = False,
 ):
     _scan(
-        filename=filename,
+        paths=paths,
         clipboard=clipboard,
         remove_directive=remove_directive,
-        auto_integrate=auto_integrate
+        auto_integrate=auto_integrate,
+        cache=cache,
+        workers=workers,
+        all_or_nothing=all_or_nothing,
     )
 
 
+INDEX_HELP = "Build or refresh the project symbol index used to resolve hints."
+INDEX_DATABASE_HELP = "Where to store the SQLite index"
+INDEX_REBUILD_HELP = "Whether to re-index every file, even the unchanged ones"
+
+@app.command(help=INDEX_HELP)
+def index(
+    root: Annotated[str, typer.Argument()] = ".",
+    database: Annotated[str, typer.Option(help=INDEX_DATABASE_HELP)] = ".wildered/index.sqlite",
+    rebuild: Annotated[bool, typer.Option(help=INDEX_REBUILD_HELP, show_default="False")] = False,
+):
+    _index(root=root, database=database, rebuild=rebuild)
+
+
+WATCH_HELP = "Watch a directory and regenerate the prompts of the directives affected by each change."
+WATCH_INTERVAL_HELP = "Seconds between two checks for modified files"
+WATCH_OUTPUT_DIR_HELP = "Where to write the generated prompts"
+
+@app.command(help=WATCH_HELP)
+def watch(
+    directory: Annotated[str, typer.Argument()] = ".",
+    interval: Annotated[float, typer.Option(help=WATCH_INTERVAL_HELP)] = 1.0,
+    output_dir: Annotated[str, typer.Option(help=WATCH_OUTPUT_DIR_HELP)] = ".wildered/prompts",
+):
+    _watch(directory=directory, interval=interval, output_dir=output_dir)
+
+
 def main():
     app()
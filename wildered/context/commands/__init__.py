@@ -1 +1,3 @@
+from .index import index
 from .scan import scan
+from .watch import watch
@@ -0,0 +1,15 @@
+import time
+
+from wildered.index import DEFAULT_INDEX_FILE, SymbolIndex
+
+
+def index(root: str = ".", database: str = str(DEFAULT_INDEX_FILE), rebuild: bool = False) -> None:
+    start = time.perf_counter()
+    with SymbolIndex(database=database) as symbol_index:
+        stats = symbol_index.build(root=root, rebuild=rebuild)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Indexed {stats.indexed} files ({stats.unchanged} unchanged, "
+        f"{stats.removed} removed, {stats.failed} failed) in {elapsed:.2f}s"
+    )
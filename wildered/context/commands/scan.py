@@ -1,37 +1,93 @@
-from typing import List
+from typing import List, Optional
 
-from wildered.ast import ASTSourceCode
+from wildered.ast import ASTSourceCode, SourceCodeRegistry, source_registry
+from wildered.cache import (
+    disable_parse_cache,
+    disable_skeleton_cache,
+    enable_parse_cache,
+    enable_skeleton_cache,
+)
+from wildered.index import SymbolIndex, use_symbol_index
+from wildered.logger import logger
+from wildered.resolver import ImportResolver, use_import_resolver
+from wildered.stubs import disable_stub_cache, enable_stub_cache
+from wildered.utils import batch_writes
 
 from ..autocomplete import task_executor
 from ..directives import butterfly_parser
-from ..tasks import TaskGroup, task_grouper
+from ..scanner import collect_files, scan_files
+from ..tasks import TaskGroup, group_entities
 
 
 def scan(
-    filename: str,
+    paths: List[str],
     clipboard: bool = False,
     remove_directive: bool = False,
     auto_integrate: bool = False,
+    cache: bool = True,
+    workers: Optional[int] = None,
+    all_or_nothing: bool = False,
 ) -> None:
-    source_code = ASTSourceCode.from_file(filename)
-    task_groups = _get_task_groups(source=source_code)
-    if task_groups:
-        task_executor(
-            task_groups,
-            clipboard=clipboard,
-            auto_integrate=auto_integrate
-        )
-        
-        if remove_directive:
-            # Since directive is already removed during parsing
-            source_code.save()
-
-    else:
-        print("No directive detected.")
-
-
-def _get_task_groups(source: ASTSourceCode) -> List[TaskGroup]:
+    files = collect_files(paths)
+    if cache:
+        parse_cache = enable_parse_cache()
+        enable_skeleton_cache()
+        enable_stub_cache()
+
+    symbol_index = None
+    try:
+        # Resolve hints through the project index when `wildered index` has been run
+        symbol_index = SymbolIndex.open_default()
+        use_symbol_index(symbol_index)
+        # Imports are resolved once for the whole scan
+        use_import_resolver(ImportResolver())
+
+        with source_registry.scope() as registry:
+            task_groups = scan_files(
+                files, workers=workers, cache=cache, registry=registry
+            )
+            if task_groups:
+                # Modified files are only written once the run is over
+                with batch_writes(all_or_nothing=all_or_nothing):
+                    task_executor(
+                        task_groups,
+                        clipboard=clipboard,
+                        auto_integrate=auto_integrate
+                    )
+
+                    if remove_directive:
+                        # Since directive is already removed during parsing
+                        for source_code in _get_scanned_sources(task_groups):
+                            source_code.save(splice=True)
+
+            else:
+                print("No directive detected.")
+
+    finally:
+        # Also torn down when the run fails, e.g. on an error of the LLM
+        use_import_resolver(None)
+        if symbol_index is not None:
+            use_symbol_index(None)
+            symbol_index.close()
+
+        if cache:
+            logger.debug(f"Parse cache statistics: {parse_cache.stats()}")
+            disable_parse_cache()
+            disable_skeleton_cache()
+            disable_stub_cache()
+
+
+def _get_task_groups(
+    source: ASTSourceCode, registry: Optional[SourceCodeRegistry] = None
+) -> List[TaskGroup]:
     entity_list = butterfly_parser.parse(source=source, drop_directive=True)
-    entity_groups = task_grouper.group(entity_list=entity_list)
-    task_groups = [TaskGroup.from_entity_group(i) for i in entity_groups]
-    return task_groups
+    return group_entities(entity_list=entity_list, registry=registry)
+
+
+def _get_scanned_sources(task_groups: List[TaskGroup]) -> List[ASTSourceCode]:
+    sources = {}
+    for group in task_groups:
+        for task in group.task_list:
+            sources.setdefault(id(task.source), task.source)
+
+    return list(sources.values())
@@ -0,0 +1,23 @@
+from wildered.index import DEFAULT_INDEX_FILE, SymbolIndex, use_symbol_index
+from wildered.resolver import ImportResolver, use_import_resolver
+
+from ..watch import DEFAULT_PROMPT_DIR, Watcher
+
+
+def watch(
+    directory: str = ".",
+    interval: float = 1.0,
+    output_dir: str = str(DEFAULT_PROMPT_DIR),
+) -> None:
+    symbol_index = SymbolIndex(database=DEFAULT_INDEX_FILE)
+    use_symbol_index(symbol_index)
+    # Kept for the whole session, and invalidated when files are added or removed
+    use_import_resolver(ImportResolver())
+    try:
+        watcher = Watcher(root=directory, index=symbol_index, output_dir=output_dir)
+        watcher.run(interval=interval)
+
+    finally:
+        use_import_resolver(None)
+        use_symbol_index(None)
+        symbol_index.close()
@@ -24,11 +24,13 @@ def autocomplete(
     return
 
 
-def hint(*, entity: list, infer: bool = False):
+def hint(*, entity: list, infer: bool = False, depth: int = 2, limit: int = 10):
     """
     Declare that this task will depend on some specific functions and class
     if module is None, then by default it is the current module
-    - infer will get additional dependencies on top of the already specified hint
+    - infer will get additional dependencies on top of the already specified hint:
+    the functions and classes used in annotations, base classes and calls, followed
+    up to `depth` references away and up to `limit` of them
     """
 
 
@@ -2,15 +2,37 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeAlias,
+)
 
 from pydantic import BaseModel, Field, root_validator
 from wildered.logger import logger
-from wildered.ast import ASTSourceCode
+from wildered.ast import ASTSourceCode, SourceCodeRegistry, source_registry
 from wildered.directive import Identifier
+from wildered.index import SymbolIndex, get_symbol_index
+from wildered.resolver import get_import_resolver
+from wildered.stubs import find_library_source, get_library_stub
 
 from .directives import HintDirective
 
+# Resolved path of the file, qualified name of the entity or "" for the module
+DependencyKey: TypeAlias = Tuple[Path, str]
+
+
+class HintTarget(NamedTuple):
+    filepath: Optional[Path]  # None for the current file and for libraries
+    entity_name: str
+    module: Optional[str] = None  # Module of an installed library
+
 
 class Dependency(BaseModel, ABC):
     @abstractmethod
@@ -26,20 +48,40 @@ class CodeDependency(Dependency):
     filepath: Path  # Where to find the code
     entity_name: str = ""
     source_code: ASTSourceCode
+    # Signatures and docstrings only, the default for whole modules
+    skeleton: bool = False
 
     @root_validator(pre=True)
     def initialize_source_code(cls, v):
-        v.setdefault(
-            "source_code", ASTSourceCode.from_file(filename=str(v["filepath"]))
-        )
+        if v.get("source_code", None) is None:
+            v["source_code"] = ASTSourceCode.read_only(filename=str(v["filepath"]))
+
+        if v.get("skeleton", None) is None:
+            v["skeleton"] = not v.get("entity_name", "")
+
         return v
 
-    def __eq__(self, __value: CodeDependency) -> bool:
+    @property
+    def qualname(self) -> str:
+        """Qualified name of the entity, or an empty string for the whole module."""
+        if not self.entity_name:
+            return ""
+
+        symbol = self.source_code.symbols.get(self.entity_name)
+        return symbol.qualname if symbol else self.entity_name
+
+    @property
+    def key(self) -> DependencyKey:
+        return (self.filepath.resolve(), self.qualname)
+
+    def __eq__(self, __value: Any) -> bool:
         if not isinstance(__value, CodeDependency):
-            raise ValueError("CodeDependency can only compare with its own type")
-        return (__value.filepath == self.filepath) and (
-            self.entity_name == __value.entity_name
-        )
+            return NotImplemented
+
+        return self.key == __value.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
 
     def resolve(self) -> str:
         if self.entity_name:
@@ -47,11 +89,47 @@ class CodeDependency(Dependency):
                 entity_name=self.entity_name,
                 drop_directive=True,
                 directive_prefix="wildered",
+                drop_implementation=self.skeleton,
                 return_global_import=True,
+                source_slice=True,
             )
 
+        elif self.skeleton:
+            return self.source_code.get_skeleton(directive_prefix="wildered")
+
         else:
-            return self.source_code.unparse()
+            return self.source_code.unparse(source_slice=True)
+
+
+class LibraryDependency(Dependency):
+    """
+    A class or function of an installed library, or a whole module when there is
+    no `entity_name`, included as its signatures and docstrings only. The library
+    is located without being imported.
+    """
+
+    module: str  # Where it is imported from, e.g. `pydantic`
+    entity_name: str = ""
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.module, self.entity_name)
+
+    def __eq__(self, __value: Any) -> bool:
+        if not isinstance(__value, LibraryDependency):
+            return NotImplemented
+
+        return self.key == __value.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def resolve(self) -> str:
+        stub = get_library_stub(self.module, self.entity_name)
+        if stub is None:
+            return f"# Cannot find {self.entity_name} in {self.module}"
+
+        return stub
 
 
 class ReferenceDependency(Dependency):
@@ -60,70 +138,307 @@ class ReferenceDependency(Dependency):
     filter_criteria: Any  # Any other filtering criteria?
 
 
-def infer_hint_list(hint_list: List[HintDirective], source: ASTSourceCode):
+class DependencySet:
+    """
+    An ordered set of dependencies, keyed by the resolved path and the qualified
+    name of code dependencies. An entity is left out when its whole module, or a
+    definition enclosing it, is part of the set too, unless only the skeleton of
+    those is. Other dependencies are kept as they are.
+    """
+
+    def __init__(self, dependencies: Iterable[Dependency] = ()) -> None:
+        # Code dependencies by file, in order of first appearance
+        self.files: Dict[Path, Dict[str, CodeDependency]] = {}
+        self.others: List[Dependency] = []
+        self.update(dependencies)
+
+    def add(self, dependency: Dependency) -> None:
+        if not isinstance(dependency, CodeDependency):
+            if dependency not in self.others:
+                self.others.append(dependency)
+
+            return
+
+        path, qualname = dependency.key
+        entities = self.files.setdefault(path, {})
+        current = entities.setdefault(qualname, dependency)
+        if current.skeleton and not dependency.skeleton:
+            # The full code covers the skeleton
+            entities[qualname] = dependency
+
+    def update(self, dependencies: Iterable[Dependency]) -> None:
+        for dependency in dependencies:
+            self.add(dependency)
+
+    def __or__(self, other: DependencySet) -> DependencySet:
+        return DependencySet(list(self) + list(other))
+
+    def __contains__(self, dependency: Dependency) -> bool:
+        return any(i is dependency or i == dependency for i in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __iter__(self) -> Iterator[Dependency]:
+        for entities in self.files.values():
+            yield from self._collapse(entities)
+
+        yield from self.others
+
+    def render(self) -> List[str]:
+        """
+        Return the code of every file of the set, followed by that of the other
+        dependencies.
+        """
+        return [render_file(self._collapse(i)) for i in self.files.values()] + [
+            i.resolve() for i in self.others
+        ]
+
+    @staticmethod
+    def _collapse(entities: Dict[str, CodeDependency]) -> List[CodeDependency]:
+        def is_covered(qualname: str, dependency: CodeDependency) -> bool:
+            return any(
+                (i == "" or qualname.startswith(f"{i}."))
+                and (dependency.skeleton or not other.skeleton)
+                for i, other in entities.items()
+                if i != qualname
+            )
+
+        return [
+            dependency
+            for qualname, dependency in entities.items()
+            if not is_covered(qualname, dependency)
+        ]
+
+
+def render_file(dependencies: List[CodeDependency]) -> str:
+    """
+    Render entities of the same file with its imports once, in the order of the
+    file. A dependency on the whole module renders the module, or its skeleton
+    followed by the entities whose full code is requested.
+    """
+    if len(dependencies) == 1:
+        return dependencies[0].resolve()
+
+    source = dependencies[0].source_code
+    module = [i for i in dependencies if not i.entity_name]
+    dependencies = [i for i in dependencies if i.entity_name]
+    symbols = [source.symbols.get(i.entity_name) for i in dependencies]
+    if any(i is None for i in symbols):
+        # Unknown to the table, resolved one by one to report it
+        return "\n\n".join(i.resolve() for i in module + dependencies)
+
+    entities = [
+        source.get_entity(
+            entity_name=symbol.qualname,
+            drop_directive=True,
+            directive_prefix="wildered",
+            drop_implementation=dependency.skeleton,
+            source_slice=True,
+        )
+        for symbol, dependency in sorted(
+            zip(symbols, dependencies), key=lambda x: x[0].path
+        )
+    ]
+    if module:
+        # The skeleton includes the imports
+        header = module[0].resolve()
+
+    else:
+        header = source.get_import_statement(
+            drop_directive=True, directive_prefix="wildered"
+        )
+
+    return header + "\n\n" + "\n\n".join(entities)
+
+
+def infer_hint_list(
+    hint_list: List[HintDirective],
+    source: ASTSourceCode,
+    registry: Optional[SourceCodeRegistry] = None,
+):
     # All should point to the same ASTSourceCode
+    registry = registry if registry else source_registry.spawn()
+    registry.register(source)
 
-    dependency_list = []
+    dependency_lookup = source.get_entity_map()
+    located = []
     for hint in hint_list:
-        cur_list = infer_hint(
-            hint_directive=hint,
-            source=source,
-            dependency_lookup=source.get_entity_map(),
+        located.extend(
+            locate_hint(
+                hint_directive=hint, source=source, dependency_lookup=dependency_lookup
+            )
         )
-        dependency_list.extend(cur_list)
-    return dependency_list
+
+    return build_dependencies(located, source=source, registry=registry)
 
 
 def infer_hint(
-    hint_directive: HintDirective, source: ASTSourceCode, dependency_lookup: dict
+    hint_directive: HintDirective,
+    source: ASTSourceCode,
+    dependency_lookup: dict,
+    registry: Optional[SourceCodeRegistry] = None,
+    index: Optional[SymbolIndex] = None,
 ) -> List[Dependency]:
+    registry = registry if registry else source_registry.spawn()
+    located = locate_hint(
+        hint_directive=hint_directive,
+        source=source,
+        dependency_lookup=dependency_lookup,
+        index=index,
+    )
+    return build_dependencies(located, source=source, registry=registry)
+
+
+def locate_hint(
+    hint_directive: HintDirective,
+    source: ASTSourceCode,
+    dependency_lookup: dict,
+    index: Optional[SymbolIndex] = None,
+) -> List[HintTarget]:
+    """
+    Return the file and name of every entity of the hint, without loading the
+    files. The file is None for entities of `source` itself, and for those of
+    installed libraries, which have their module instead.
+    """
     logger.debug(f"Receiving {dependency_lookup=} and {hint_directive=}")
-    code_dependency = []
+    index = index if index else get_symbol_index()
+    resolver = get_import_resolver()
+    located = []
 
     for entity in hint_directive.entity_list:
         match entity:
             case Identifier():
-                try:
-                    if module_path := dependency_lookup.get(entity.name, None):
-                        code_dependency.append(
-                            CodeDependency(
-                                filepath=module_path,
-                                entity_name=entity.name,
-                            )
-                        )
-
-                    else:
-                        code_dependency.append(
-                            CodeDependency(
-                                filepath=source.filename,
-                                entity_name=entity.name,
-                            )
-                        )
-                        
-                except FileNotFoundError as e:
-                    logger.debug(f"{entity.name=} not found")
+                module_path = dependency_lookup.get(entity.name, None)
+                if (entity.name in dependency_lookup) and (module_path is None):
+                    library = source.get_library_map().get(entity.name, None)
+                    if library is None:
+                        logger.debug(f"{entity.name=} is not imported from the project")
+                        continue
+
+                    located.append(HintTarget(None, entity.name, module=library))
+                    continue
+
+                module_map = source.get_module_map()
+                if (module_path is None) and module_map.get(entity.name, None):
+                    # A whole module, as in `import package.module as entity`
+                    located.append(HintTarget(module_map[entity.name], ""))
+                    continue
+
+                if (module_path is None) and (index is not None):
+                    module_path = lookup_index(
+                        index=index, entity_name=entity.name, source=source
+                    )
+
+                module_path = module_path if module_path else None
+                located.append(HintTarget(module_path, entity.name))
 
             case str():
                 component = entity.split(":")
                 filepath, entity_name = (component[0], component[1])
                 logger.debug(f"Specifying dependencies in raw string: {filepath=}, {entity_name=}")
-                filepath = apply_relative_path(
-                    relative_path=filepath,
-                    absolute_base_path=source.filename.parent.resolve(),
-                )
-                try:
-                    code_dependency.append(
-                        CodeDependency(filepath=filepath, entity_name=entity_name)
-                    )
-                except FileNotFoundError as e:
-                    logger.debug(f"Cannot find {filepath=}")
+                module = filepath
+                filepath = resolver.resolve_hint_path(module, base=source.filename)
+                if (filepath is None) and find_library_source(module):
+                    located.append(HintTarget(None, entity_name, module=module))
+                    continue
+
+                if filepath is None:
+                    logger.debug(f"Cannot find the module of {entity}")
+                    continue
+
+                if (
+                    (index is not None)
+                    and index.is_fresh(filepath)
+                    and (index.find(filepath, entity_name) is None)
+                ):
+                    logger.debug(f"Cannot find {entity_name} in {filepath=}")
+                    continue
+
+                located.append(HintTarget(filepath, entity_name))
 
             case other:
                 raise TypeError(f"Unknown type {type(other)}")
 
+    return located
+
+
+def build_dependencies(
+    located: List[HintTarget],
+    source: ASTSourceCode,
+    registry: SourceCodeRegistry,
+) -> List[Dependency]:
+    code_dependency = []
+    for filepath, entity_name, module in located:
+        if module is not None:
+            library_dependency = locate_library(module=module, entity_name=entity_name)
+            if library_dependency is None:
+                logger.debug(f"Cannot find {entity_name=} in installed {module=}")
+
+            else:
+                code_dependency.append(library_dependency)
+
+            continue
+
+        if filepath is None:
+            code_dependency.append(
+                CodeDependency(
+                    filepath=source.filename,
+                    entity_name=entity_name,
+                    source_code=source,
+                )
+            )
+            continue
+
+        try:
+            code_dependency.append(
+                CodeDependency(
+                    filepath=filepath,
+                    entity_name=entity_name,
+                    source_code=registry.get(filepath),
+                )
+            )
+
+        except FileNotFoundError as e:
+            logger.debug(f"Cannot find {filepath=} for {entity_name=}")
+
     return code_dependency
 
 
+def locate_library(module: str, entity_name: str) -> Optional[LibraryDependency]:
+    """
+    Return the dependency on `entity_name` imported from the installed `module`,
+    which may name a submodule as in `from package import module`, or None when
+    it cannot be found, e.g. for names assigned at runtime like `os.path`.
+    """
+    submodule = f"{module}.{entity_name}"
+    if find_library_source(submodule) is not None:
+        return LibraryDependency(module=submodule)
+
+    if get_library_stub(module, entity_name) is None:
+        return None
+
+    return LibraryDependency(module=module, entity_name=entity_name)
+
+
+def lookup_index(
+    index: SymbolIndex, entity_name: str, source: ASTSourceCode
+) -> Optional[Path]:
+    """
+    Find the file defining `entity_name` in the symbol index, returning None when
+    it is defined in `source` itself or is unknown to the index.
+    """
+    # The index may predate the current content of `source`
+    if entity_name in source.symbols.symbols:
+        return None
+
+    record = index.resolve(entity_name, near=source.filename)
+    if record is None:
+        return None
+
+    return Path(record.path)
+
+
 def apply_relative_path(relative_path: Path, absolute_base_path: Path) -> Path:
     """
     Applies a relative path to a base path, similar to the behavior of the 'cd' command in Linux.
@@ -142,14 +457,5 @@ def apply_relative_path(relative_path: Path, absolute_base_path: Path) -> Path:
     return result_path.resolve()
 
 
-def union_dependencies(dependencies: List[Dependency]) -> str:
-    cur_dependencies = []
-    for i in dependencies:
-        for j in cur_dependencies:
-            if i == j:
-                break
-        else:
-            # TIPS: Will get here if there is no break
-            cur_dependencies.append(i)
-
-    return cur_dependencies
+def union_dependencies(dependencies: List[Dependency]) -> List[Dependency]:
+    return list(DependencySet(dependencies))
@@ -29,6 +29,9 @@ class AutocompleteDirective(Directive):
 class HintDirective(Directive):
     entity_list: List[str | Identifier]
     infer: bool = False
+    # How many references away, and how many entities, inference may go
+    depth: int = 2
+    limit: int = 10
 
     class Config:
         arbitrary_types_allowed = True
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import ast
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from wildered.ast import ASTSourceCode, SourceCodeRegistry
+from wildered.ast.utils import collect_references
+from wildered.logger import logger
+
+from .dependency import CodeDependency, DependencyKey
+
+
+class ReferenceGraph:
+    """
+    The references between the definitions of the files of a registry, computed
+    once per definition and kept along with the node they were computed from, so
+    that definitions depended on by several tasks are only resolved once. The
+    registry is referenced weakly, as it is the key the graph is kept under.
+    """
+
+    def __init__(self, registry: SourceCodeRegistry) -> None:
+        self._registry = weakref.ref(registry)
+        self._edges: Dict[DependencyKey, Tuple[ast.AST, List[DependencyKey]]] = {}
+
+    @property
+    def registry(self) -> SourceCodeRegistry:
+        registry = self._registry()
+        if registry is None:
+            raise ReferenceError("The registry of the graph no longer exists")
+
+        return registry
+
+    def load(self, key: DependencyKey) -> Optional[Tuple[ASTSourceCode, ast.AST]]:
+        """Return the source code and node of a definition, or None if it does not exist."""
+        path, qualname = key
+        try:
+            source = self.registry.get(path)
+
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            logger.debug(f"Cannot infer from {path}: {e}")
+            return None
+
+        symbol = source.symbols.symbols.get(qualname, None)
+        return (source, symbol.node) if symbol else None
+
+    def references(self, source: ASTSourceCode, node: ast.AST) -> List[DependencyKey]:
+        """
+        The top-level definitions `node` refers to, either imported from another
+        file or defined in the file of `source` unless `node` is the whole module.
+        """
+        symbol = source.symbols.symbol_of(node)
+        key = (Path(source.filename).resolve(), symbol.qualname if symbol else "")
+        enclosing = [symbol] + symbol.ancestors if symbol else []
+        cached = self._edges.get(key, None)
+        if (cached is not None) and (cached[0] is node):
+            return cached[1]
+
+        entity_map = source.get_entity_map()
+        edges = []
+        for name in collect_references(node):
+            local = source.symbols.symbols.get(name, None)
+            if local is not None:
+                # The definitions enclosing `node` are part of its context already
+                if symbol and (local not in enclosing):
+                    edges.append((key[0], name))
+
+            elif entity_map.get(name, None):
+                edges.append((Path(entity_map[name]).resolve(), name))
+
+        self._edges[key] = (node, edges)
+        return edges
+
+
+_reference_graphs: weakref.WeakKeyDictionary[
+    SourceCodeRegistry, ReferenceGraph
+] = weakref.WeakKeyDictionary()
+
+
+def get_reference_graph(registry: SourceCodeRegistry) -> ReferenceGraph:
+    """The graph shared by every inference using `registry`, e.g. during a scan."""
+    if registry not in _reference_graphs:
+        _reference_graphs[registry] = ReferenceGraph(registry)
+
+    return _reference_graphs[registry]
+
+
+def infer_dependencies(
+    node: ast.AST,
+    source: ASTSourceCode,
+    registry: SourceCodeRegistry,
+    depth: int = 2,
+    limit: int = 10,
+) -> List[CodeDependency]:
+    """
+    Infer the dependencies of `node` from the definitions it refers to, breadth
+    first up to `depth` references away and at most `limit` of them. Definitions
+    that were already visited are skipped, so cycles end the search.
+    """
+    graph = get_reference_graph(registry)
+    symbol = source.symbols.symbol_of(node)
+    visited = {(Path(source.filename).resolve(), symbol.qualname if symbol else "")}
+    frontier = [(source, node)]
+    inferred = []
+    for _ in range(depth):
+        next_frontier = []
+        for cur_source, cur_node in frontier:
+            for key in graph.references(cur_source, cur_node):
+                if key in visited:
+                    continue
+
+                visited.add(key)
+                loaded = graph.load(key)
+                if loaded is None:
+                    continue
+
+                inferred.append(
+                    CodeDependency(
+                        filepath=key[0],
+                        entity_name=key[1],
+                        source_code=loaded[0],
+                        # Only what it takes to use them
+                        skeleton=True,
+                    )
+                )
+                if len(inferred) >= limit:
+                    return inferred
+
+                next_frontier.append(loaded)
+
+        frontier = next_frontier
+
+    return inferred
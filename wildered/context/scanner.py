@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from wildered.ast import ASTSourceCode, SourceCodeRegistry, source_registry
+from wildered.cache import enable_parse_cache, enable_skeleton_cache
+from wildered.index import SymbolIndex, use_symbol_index
+from wildered.logger import logger
+from wildered.resolver import ImportResolver, use_import_resolver
+from wildered.stubs import enable_stub_cache
+from wildered.utils import iter_python_files, read_source
+
+from .directives import butterfly_parser
+from .tasks import TaskGroup, group_entities
+
+GLOB_CHARACTERS = "*?["
+
+
+def collect_files(paths: Iterable[Path | str]) -> List[Path]:
+    """
+    Expand files, directories and glob patterns into an ordered list of Python
+    files, without duplicates.
+    """
+    files = {}
+    for path in paths:
+        path = str(path)
+        if any(i in path for i in GLOB_CHARACTERS):
+            matches = [Path(i) for i in sorted(glob.glob(path, recursive=True))]
+
+        else:
+            matches = [Path(path)]
+
+        for match in matches:
+            if match.is_dir():
+                for filename in iter_python_files(match):
+                    files.setdefault(filename.resolve(), filename)
+
+            elif match.is_file() or not any(i in path for i in GLOB_CHARACTERS):
+                # Missing files are reported when they are read
+                files.setdefault(match.resolve(), match)
+
+    return list(files.values())
+
+
+def scan_file(
+    filename: Path | str, registry: Optional[SourceCodeRegistry] = None
+) -> List[TaskGroup]:
+    """Parse `filename` and return its task groups, with its directives dropped."""
+    registry = registry if registry else source_registry.spawn()
+    # Read once for both the prefilter and the parser
+    source_file = read_source(filename)
+    if not butterfly_parser.may_contain_directives(filename, source=source_file):
+        return []
+
+    source = registry.register(ASTSourceCode.from_file(filename, source=source_file))
+    entity_list = butterfly_parser.parse(source=source, drop_directive=True)
+    return group_entities(entity_list=entity_list, registry=registry)
+
+
+def scan_files(
+    files: List[Path],
+    workers: Optional[int] = None,
+    cache: bool = True,
+    registry: Optional[SourceCodeRegistry] = None,
+) -> List[TaskGroup]:
+    """
+    Scan `files` for directives and return their task groups in file order. With
+    several workers the files are spread over a process pool, in which every worker
+    keeps its own registry for its share of the files, and parsed files are shared
+    between workers through the parse cache.
+    """
+    registry = registry if registry else source_registry.spawn()
+    workers = workers if workers else os.cpu_count() or 1
+    workers = min(workers, len(files))
+
+    if workers <= 1:
+        task_groups = []
+        for filename in files:
+            task_groups.extend(_scan_file_safely(filename, registry=registry))
+
+        return task_groups
+
+    # Neighbouring files tend to share dependencies, so hand them out in chunks
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(cache,)
+    ) as executor:
+        results = list(executor.map(_scan_worker, files, chunksize=chunksize))
+
+    task_groups = [group for groups in results for group in groups]
+    share_sources(task_groups, registry=registry)
+    return task_groups
+
+
+def share_sources(task_groups: List[TaskGroup], registry: SourceCodeRegistry) -> None:
+    """
+    Point every task and dependency of `task_groups` at a single source code object
+    per file. Task groups returned by different workers hold their own copies.
+    """
+    for group in task_groups:
+        for task in group.task_list:
+            # The scanned files themselves take precedence, as their directives were dropped
+            registry.register(task.source)
+
+    for group in task_groups:
+        for task in group.task_list:
+            for dependency in task.dependencies:
+                source = getattr(dependency, "source_code", None)
+                if (source is None) or (source.filename is None):
+                    continue
+
+                if source.filename in registry:
+                    dependency.source_code = registry.get(source.filename)
+
+                else:
+                    registry.register(source)
+
+
+_worker_registry: Optional[SourceCodeRegistry] = None
+
+
+def _init_worker(cache: bool) -> None:
+    global _worker_registry
+    _worker_registry = source_registry.spawn()
+    if cache:
+        parse_cache = enable_parse_cache()
+        # Workers exit without running `atexit` handlers
+        Finalize(parse_cache, parse_cache.flush, exitpriority=10)
+        enable_skeleton_cache()
+        enable_stub_cache()
+
+    # Connections cannot be shared with the parent process
+    use_symbol_index(SymbolIndex.open_default())
+    use_import_resolver(ImportResolver())
+
+
+def _scan_worker(filename: Path) -> List[TaskGroup]:
+    return _scan_file_safely(filename, registry=_worker_registry)
+
+
+def _scan_file_safely(
+    filename: Path, registry: SourceCodeRegistry
+) -> List[TaskGroup]:
+    try:
+        return scan_file(filename, registry=registry)
+
+    except (SyntaxError, UnicodeDecodeError) as e:
+        logger.warning(f"Unable to scan {filename}: {e}")
+        return []
@@ -1,24 +1,34 @@
 from __future__ import annotations
 
+import ast
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Literal, Optional
 from uuid import uuid4
 
+import ast_comments
 from pydantic import BaseModel, PrivateAttr, validator
 from typing_extensions import assert_never
 
+from wildered.ast import SourceCodeRegistry, source_registry
 from wildered.ast.directive_parser import (
     ASTClassEntity,
     ASTFunctionEntity,
     ASTModuleEntity,
     BaseEntity,
 )
+from wildered.ast.symbols import FUNCTION_TYPES, SymbolTable
 from wildered.group import EntityGroup, EntityGrouper
-from wildered.models import BaseSourceCode
 from wildered.logger import logger
+from wildered.models import BaseSourceCode, construct_model
 
-from .dependency import Dependency, infer_hint_list, union_dependencies
-from .directives import AutocompleteDirective
+from .dependency import (
+    Dependency,
+    DependencySet,
+    infer_hint_list,
+    union_dependencies,
+)
+from .directives import AutocompleteDirective, HintDirective
+from .inference import infer_dependencies
 from .prompts import CODER_PROMPT
 from .utils import wander_render
 
@@ -41,8 +51,13 @@ class Task(BaseModel):
     source: BaseSourceCode
     node: BaseEntity
 
+    class Config:
+        copy_on_model_validation = "none"
+
     @classmethod
-    def from_entity(cls, node: BaseEntity) -> Task:
+    def from_entity(
+        cls, node: BaseEntity, registry: Optional[SourceCodeRegistry] = None
+    ) -> Task:
         task_type = ""
         match node:
             case ASTClassEntity():
@@ -57,15 +72,31 @@ class Task(BaseModel):
             case other:
                 assert_never(other)
 
-        if node.directives.get("hint", False):
+        registry = registry if registry else source_registry.spawn()
+        hint_list: List[HintDirective] = node.directives.get("hint", [])
+        if hint_list:
             dependency_list = infer_hint_list(
-                hint_list=node.directives["hint"], source=node.source
+                hint_list=hint_list, source=node.source, registry=registry
             )
 
         else:
             dependency_list = []
 
-        return cls(
+        infer_list = [i for i in hint_list if i.infer]
+        if infer_list:
+            dependency_list.extend(
+                infer_dependencies(
+                    node=node.node,
+                    source=node.source,
+                    registry=registry,
+                    depth=max(i.depth for i in infer_list),
+                    limit=max(i.limit for i in infer_list),
+                )
+            )
+
+        # Built from a parsed entity, so validation is skipped
+        return construct_model(
+            cls,
             task_type=task_type,
             entity_name=node.name,
             dependencies=dependency_list,
@@ -87,8 +118,25 @@ class Task(BaseModel):
         **kwargs
     ) -> None:
         self.node.update(new_code=new_code, **kwargs)
-        self.node.save()
-        
+        self.node.save(splice=True)
+
+    def apply(self, response: ast.Module, symbols: SymbolTable) -> None:
+        """
+        Update the entity from an already parsed response, without saving it. The
+        definition is looked up by the qualified name of the entity first, so that
+        e.g. `DummyClass2.__init__` is not taken from another class.
+        """
+        if isinstance(self.node, ASTModuleEntity):
+            self.node.update(new_code=response)
+            return
+
+        types = (ast.ClassDef,) if isinstance(self.node, ASTClassEntity) else FUNCTION_TYPES
+        symbol = symbols.get(self.node.qualname, types=types)
+        symbol = symbol if symbol else symbols.get(self.node.name, types=types)
+        if symbol is None:
+            raise ValueError(f"Cannot find '{self.node.qualname}' in the response")
+
+        self.node.update(new_code=symbol.node)
 
     @property
     def requirement(self):
@@ -169,10 +217,11 @@ class Task(BaseModel):
 
 
 def get_additional_context(dependencies: List[Dependency]) -> str:
+    """Duplicated dependencies are included once, and the entities of a file together."""
     if dependencies != []:
         result = "Below are snippets of code in the current project that you may find useful:\n"
-        for dependency in dependencies:
-            result += "```python\n" + dependency.resolve() + "\n```" + "\n"
+        for code in DependencySet(dependencies).render():
+            result += "```python\n" + code + "\n```" + "\n"
         return result
 
     else:
@@ -184,6 +233,9 @@ class TaskGroup(BaseModel):
     task_list: List[Task]
     _aggregate_dependencies: List[Dependency] = PrivateAttr(default_factory=list)
 
+    class Config:
+        copy_on_model_validation = "none"
+
     @property
     def aggregate_dependencies(self) -> List[Dependency]:
         if self._aggregate_dependencies == []:
@@ -196,18 +248,27 @@ class TaskGroup(BaseModel):
         return self._aggregate_dependencies
 
     @classmethod
-    def from_entity_group(cls, entity_group: EntityGroup) -> TaskGroup:
-        task_list = [Task.from_entity(entity) for entity in entity_group.entity_list]
-        return TaskGroup(group_name=entity_group.group_name, task_list=task_list)
+    def from_entity_group(
+        cls,
+        entity_group: EntityGroup,
+        registry: Optional[SourceCodeRegistry] = None,
+    ) -> TaskGroup:
+        registry = registry if registry else source_registry.spawn()
+        task_list = [
+            Task.from_entity(entity, registry=registry)
+            for entity in entity_group.entity_list
+        ]
+        return construct_model(
+            TaskGroup, group_name=entity_group.group_name, task_list=task_list
+        )
 
     def format_prompt(self, template=CODER_PROMPT) -> str:
         total_requirement = ""
         total_code_context = ""
-        total_add_context = ""
+        # Dependencies shared by several tasks are only included once
+        total_add_context = get_additional_context(self.aggregate_dependencies)
         for i, task in enumerate(self.task_list):
             total_code_context += task.return_task_context()
-            additional_context = get_additional_context(task.dependencies)
-            total_add_context += additional_context
             total_requirement += f"## Task {i + 1}\n" + task.requirement + "\n"
 
         input_dict = {
@@ -220,8 +281,26 @@ class TaskGroup(BaseModel):
         return formatted_prompt
     
     def integrate(self, response: str) -> None:
+        """
+        Integrate the response into every task of the group. The response is parsed
+        once, and every file is written once after all of its tasks are updated.
+        """
+        code = ast_comments.parse(response)
+        symbols = SymbolTable(code)
+        sources: Dict[int, BaseSourceCode] = {}
         for i in self.task_list:
-            i.integrate(new_code=response)
-        
-        # We only have to update the import statement once
-        self.task_list[0].source.update_import_statement(new_code=response)
+            i.apply(response=code, symbols=symbols)
+            sources.setdefault(id(i.source), i.source)
+
+        for source in sources.values():
+            source.update_import_statement(new_code=code)
+            source.save(splice=True)
+
+
+def group_entities(
+    entity_list: List[BaseEntity], registry: Optional[SourceCodeRegistry] = None
+) -> List[TaskGroup]:
+    # Files are parsed once per call and shared by all task groups
+    registry = registry if registry else source_registry.spawn()
+    entity_groups = task_grouper.group(entity_list=entity_list)
+    return [TaskGroup.from_entity_group(i, registry=registry) for i in entity_groups]
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from wildered.ast import ASTSourceCode, source_registry
+from wildered.index import SymbolIndex
+from wildered.logger import logger
+from wildered.resolver import get_import_resolver
+from wildered.utils import iter_python_files, read_source, write_file
+
+from .dependency import CodeDependency
+from .directives import butterfly_parser
+from .tasks import TaskGroup, group_entities
+
+DEFAULT_PROMPT_DIR = Path(".wildered/prompts")
+
+Snapshot = Dict[Path, Tuple[int, int]]
+
+
+def take_snapshot(root: Path) -> Snapshot:
+    snapshot = {}
+    for filename in iter_python_files(root):
+        try:
+            stat = os.stat(filename)
+
+        except OSError:
+            continue
+
+        snapshot[filename.resolve()] = (stat.st_mtime_ns, stat.st_size)
+
+    return snapshot
+
+
+def get_group_key(group: TaskGroup) -> str:
+    if group.group_name and all(i.group_name for i in group.task_list):
+        return group.group_name
+
+    return "+".join(task.node.qualname for task in group.task_list)
+
+
+def get_rendered_qualnames(group: TaskGroup) -> Set[str]:
+    """
+    The qualified names of the tasks of `group` and of the definitions enclosing
+    them, which are rendered along with nested tasks.
+    """
+    qualnames = set()
+    for task in group.task_list:
+        parts = task.node.qualname.split(".")
+        qualnames.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+    return qualnames
+
+
+class Watcher:
+    """
+    Polls the modification time of the Python files under `root` and keeps the task
+    groups of every file with directives up to date. Only the files that changed are
+    parsed again, and a prompt is regenerated only for the task groups that are
+    defined in a changed entity or that depend on one through their hints. The
+    prompts of the task groups that disappear are removed.
+    """
+
+    def __init__(
+        self,
+        root: Path | str,
+        index: SymbolIndex,
+        output_dir: Path | str = DEFAULT_PROMPT_DIR,
+    ) -> None:
+        self.root = Path(root).resolve()
+        self.index = index
+        self.output_dir = Path(output_dir)
+        self.registry = source_registry.spawn()
+        self.snapshot: Snapshot = {}
+        self.groups: Dict[Path, List[TaskGroup]] = {}
+
+    def start(self) -> List[Path]:
+        """Index the project, scan every file and write all prompts."""
+        self.index.build(self.root)
+        self.snapshot = take_snapshot(self.root)
+        written = []
+        for filename in self.snapshot:
+            written.extend(self.rescan(filename, changed=None))
+
+        return written
+
+    def poll(self) -> List[Path]:
+        """Return the files that were added, modified or removed since the last poll."""
+        snapshot = take_snapshot(self.root)
+        changed = [
+            filename
+            for filename in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(filename, None) != self.snapshot.get(filename, None)
+        ]
+        if snapshot.keys() != self.snapshot.keys():
+            # Imports may resolve to the files added or removed
+            get_import_resolver().invalidate()
+
+        self.snapshot = snapshot
+        return sorted(changed)
+
+    def refresh(self, changed_files: List[Path]) -> List[Path]:
+        """Update the index and the affected task groups, returning the prompts written."""
+        changed_entities: Set[Tuple[Path, str]] = set()
+        for filename in changed_files:
+            self.registry.invalidate(filename)
+            for qualname in self.index.update_file(filename):
+                changed_entities.add((filename, qualname))
+
+        written = []
+        for filename in changed_files:
+            changed = {i for path, i in changed_entities if path == filename}
+            written.extend(self.rescan(filename, changed=changed))
+
+        # Groups in other files whose hints point at an edited entity
+        for filename, groups in self.groups.items():
+            if filename in changed_files:
+                continue
+
+            for group in groups:
+                if self._depends_on(group, changed_files, changed_entities):
+                    written.append(self._write_prompt(filename, group))
+
+        return written
+
+    def run(self, interval: float = 1.0) -> None:
+        for prompt_file in self.start():
+            print(f"Prompt wrote into {prompt_file}")
+
+        print(f"Watching {self.root} for changes, press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(interval)
+                changed_files = self.poll()
+                if changed_files:
+                    for prompt_file in self.refresh(changed_files):
+                        print(f"Prompt wrote into {prompt_file}")
+
+        except KeyboardInterrupt:
+            pass
+
+    def rescan(self, filename: Path, changed: Optional[Set[str]]) -> List[Path]:
+        """
+        Re-parse `filename` and write the prompts of its task groups that contain
+        one of the `changed` entities, or of every group if `changed` is None.
+        """
+        old_groups = {get_group_key(i): i for i in self.groups.pop(filename, [])}
+        try:
+            return self._rescan(filename, changed=changed, old_groups=old_groups)
+
+        finally:
+            new_keys = {get_group_key(i) for i in self.groups.get(filename, [])}
+            for key in old_groups.keys() - new_keys:
+                self._get_prompt_file(filename, key).unlink(missing_ok=True)
+
+    def _rescan(
+        self,
+        filename: Path,
+        changed: Optional[Set[str]],
+        old_groups: Dict[str, TaskGroup],
+    ) -> List[Path]:
+        if not filename.exists():
+            return []
+
+        try:
+            source_file = read_source(filename)
+            if not butterfly_parser.may_contain_directives(filename, source=source_file):
+                return []
+
+            # Read the file again rather than reusing the shared object, as parsing
+            # drops the directives from the tree.
+            source = ASTSourceCode.from_file(filename, source=source_file)
+            entity_list = butterfly_parser.parse(source=source, drop_directive=True)
+
+        except (SyntaxError, ValueError, UnicodeDecodeError) as e:
+            logger.warning(f"Unable to scan {filename}: {e}")
+            # Keep the prompts until the file can be parsed again
+            self.groups[filename] = list(old_groups.values())
+            return []
+
+        groups = group_entities(entity_list=entity_list, registry=self.registry)
+        self.groups[filename] = groups
+        written = []
+        for group in groups:
+            qualnames = get_rendered_qualnames(group)
+            is_file_task = any(task.task_type == "file" for task in group.task_list)
+            if (
+                (changed is None)
+                or (get_group_key(group) not in old_groups)
+                or (is_file_task and changed)
+                or (qualnames & changed)
+                or self._depends_on(group, [filename], {(filename, i) for i in changed})
+            ):
+                written.append(self._write_prompt(filename, group))
+
+        return written
+
+    def _depends_on(
+        self,
+        group: TaskGroup,
+        changed_files: List[Path],
+        changed_entities: Set[Tuple[Path, str]],
+    ) -> bool:
+        affected = False
+        for dependency in group.aggregate_dependencies:
+            if not isinstance(dependency, CodeDependency):
+                continue
+
+            filepath = Path(dependency.filepath).resolve()
+            if filepath not in changed_files:
+                continue
+
+            # Point the dependency at the new version of the file
+            dependency.source_code = self.registry.get(filepath)
+            if (not dependency.entity_name) or (
+                (filepath, dependency.entity_name) in changed_entities
+            ):
+                affected = True
+
+        return affected
+
+    def _get_prompt_file(self, filename: Path, group_key: str) -> Path:
+        relative_path = filename.relative_to(self.root)
+        prompt_name = "__".join(relative_path.with_suffix("").parts)
+        return self.output_dir / f"{prompt_name}.{group_key}.md"
+
+    def _write_prompt(self, filename: Path, group: TaskGroup) -> Path:
+        prompt_file = self._get_prompt_file(filename, get_group_key(group))
+        write_file(prompt_file, group.format_prompt())
+        return prompt_file
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import copy
 from typing import Annotated, Any, Dict, List, Optional, Tuple, Type
 
 import libcst as cst
@@ -30,7 +29,7 @@ class CSTDirectiveParser(BaseDirectiveParser):
 
         if drop_directive:
             drop_transformer = CSTDropDirective(prefix=self.prefix_name)
-            source.node.visit(drop_transformer)
+            source.node = source.node.visit(drop_transformer)
 
         self.check_valid_combination(entity_list = detector.detected)
         return detector.detected
@@ -53,10 +52,10 @@ class CSTEntity(BaseEntity):
     ) -> str:
         if include_ancestor:
             # Top ancestor
-            node = copy.deepcopy(self.ancestor[-1].node)
+            node = self.ancestor[-1].node
 
         else:
-            node = copy.deepcopy(self.node)
+            node = self.node
 
         return self.source._unparse(node=node, 
                                     drop_directive=drop_directive, 
@@ -1,19 +1,21 @@
 from __future__ import annotations
 
-import copy
 from pathlib import Path
 from typing import Any, List, Optional
 
 import libcst as cst
+from pydantic import PrivateAttr
 
+from wildered.cache import ParseCache, get_parse_cache
 from wildered.cst.utils import CSTDropDirective, CSTDropImplementation
 from wildered.models import BaseSourceCode
-from wildered.utils import read_file, write_file
+from wildered.utils import SourceFile, read_source, write_source
 
 
 class CSTSourceCode(BaseSourceCode):
     node: Any # Bad things happen when I change to cst.Module
     filename: Path        
+    _encoding: str = PrivateAttr(default="utf-8")
     
     def __str__(self) -> str:
         return self.node.code
@@ -43,31 +45,31 @@ class CSTSourceCode(BaseSourceCode):
         exception: Optional[List[str]] = None,
         return_global_import: bool = False,
     ) -> str:
-        # We need to create a copy to avoid mutation
-        node = copy.deepcopy(node)
+        # Transformers return a new tree, `node` itself is immutable
         if drop_directive:
             if directive_prefix == "":
                 raise ValueError(
                     "Must specify a directive_prefix when drop_directive set to True"
                 )
             transformer = CSTDropDirective(prefix=directive_prefix)
-            node = transformer.visit(node)
+            node = node.visit(transformer)
 
         if drop_implementation:
             transformer = CSTDropImplementation(exception=exception if exception else [])
-            node = transformer.visit(node)
+            node = node.visit(transformer)
 
+        code = node.code if isinstance(node, cst.Module) else self.node.code_for_node(node)
         if return_global_import:
             return (
                 self.get_import_statement(
                     drop_directive=drop_directive, directive_prefix=directive_prefix
                 )
                 + "\n\n"
-                + node.code
+                + code
             )
 
         else:
-            return node.code
+            return code
     
     # def get_import_statement(
     #     self,
@@ -91,11 +93,27 @@ class CSTSourceCode(BaseSourceCode):
     #     return "\n".join(import_strings)
     
     @classmethod
-    def from_file(cls, filename: str) -> CSTSourceCode:
-        content = read_file(filename)
-        node = cst.parse_module(content)
-        return cls(node=node, filename=filename)
+    def from_file(
+        cls,
+        filename: str,
+        cache: Optional[ParseCache] = None,
+        source: Optional[SourceFile] = None,
+    ) -> CSTSourceCode:
+        cache = cache if cache else get_parse_cache()
+        if cache is not None:
+            node, _, encoding = cache.load(
+                filename, parser="libcst", parse=cst.parse_module, source=source
+            )
+
+        else:
+            source = source if source else read_source(filename)
+            encoding = source.encoding
+            node = cst.parse_module(source.text)
+
+        source_code = cls(node=node, filename=filename)
+        source_code._encoding = encoding
+        return source_code
     
     def save(self, filename: Optional[str] = None) -> None:
         filename = filename if filename else self.filename
-        write_file(filename, self.node.code)
\ No newline at end of file
+        write_source(filename, self.node.code, encoding=self._encoding)
\ No newline at end of file
@@ -1,76 +1,101 @@
-from typing import List, Optional
+from typing import List
 
 import libcst as cst
 
 
 class CSTDropImplementation(cst.CSTTransformer):
+    # libcst trees are immutable, so the transformed tree shares every unchanged node
     def __init__(self, exception: List[str]) -> None:
         self.exception = exception
 
-    def visit_FunctionDef(self, node: cst.FunctionDef):
-        func_name = node.name.value
-        if func_name in self.exception:
-            return node
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        # Nested functions are dropped along with the body
+        return node.name.value in self.exception
 
-        else:
-            docstring = node.get_docstring()
-            if docstring:
-                # node.body = [cst.Expr(value=cst.Constant(value=docstring))]
-                # TODO
-                pass
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        if updated_node.name.value in self.exception:
+            return updated_node
+
+        body = []
+        if updated_node.get_docstring() is not None:
+            body = [updated_node.body.body[0]]
+
+        return updated_node.with_changes(
+            body=updated_node.body.with_changes(body=body)
+        )
 
-            else:
-                node.body = []
 
-            return node
-        
-        
 class CSTDropDirective(cst.CSTTransformer):
     def __init__(self, prefix: str):
         self.prefix = prefix
 
-    def visit_FunctionDef(self, node: cst.FunctionDef) -> cst.FunctionDef:
-        node.decorators = filter(self.filter_directive, node.decorators)
-        return node
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        decorators = [i for i in updated_node.decorators if self.filter_directive(i)]
+        return updated_node.with_changes(decorators=decorators)
 
-    def visit_ClassDef(self, node: cst.ClassDef) -> cst.ClassDef:
-        node.decorators = filter(self.filter_directive, node.decorators)
-        return node
+    def leave_ClassDef(
+        self, original_node: cst.ClassDef, updated_node: cst.ClassDef
+    ) -> cst.ClassDef:
+        decorators = [i for i in updated_node.decorators if self.filter_directive(i)]
+        return updated_node.with_changes(decorators=decorators)
 
-    def visit_Expr(self, node: cst.Expr) -> Optional[cst.Expr]:
-        try:
-            prefix, node_name = get_call_name(node.value)
-            if (prefix == self.prefix) and (node_name == "run"):
-                return None
+    def leave_SimpleStatementLine(
+        self, original_node: cst.SimpleStatementLine, updated_node: cst.SimpleStatementLine
+    ) -> cst.SimpleStatementLine | cst.RemovalSentinel:
+        # Statements joined with `;` are dropped one by one
+        body = [i for i in updated_node.body if not self.is_directive_statement(i)]
+        if not body:
+            return cst.RemoveFromParent()
 
-        except AttributeError:
-            return node
+        if len(body) == len(updated_node.body):
+            return updated_node
 
-    def visit_Import(self, node: cst.Import) -> Optional[cst.Import]:
-        if node.names[0].name.value.startswith(self.prefix):
-            return None
+        body[-1] = body[-1].with_changes(semicolon=cst.MaybeSentinel.DEFAULT)
+        return updated_node.with_changes(body=body)
 
-        else:
-            return node
+    def is_directive_statement(self, statement: cst.BaseSmallStatement) -> bool:
+        if isinstance(statement, cst.Expr):
+            try:
+                prefix, node_name = get_call_name(statement.value)
+                return (prefix == self.prefix) and (node_name == "run")
 
-    def visit_ImportFrom(self, node: cst.ImportFrom) -> Optional[cst.ImportFrom]:
-        if node.module.value.startswith(self.prefix):
-            return None
+            except AttributeError:
+                return False
 
-        else:
-            return node
+        elif isinstance(statement, cst.Import):
+            return get_full_name(statement.names[0].name).startswith(self.prefix)
+
+        elif isinstance(statement, cst.ImportFrom):
+            return (statement.module is not None) and get_full_name(
+                statement.module
+            ).startswith(self.prefix)
+
+        return False
 
     def filter_directive(self, decorator: cst.Decorator) -> bool:
         decorator_obj = decorator.decorator
-        if isinstance(decorator_obj, cst.Name):
+        if not isinstance(decorator_obj, cst.Call):
             return True
 
-        prefix, node_name = get_call_name(decorator_obj)
+        try:
+            prefix, node_name = get_call_name(decorator_obj)
+
+        except AttributeError:
+            return True
+
+        return prefix != self.prefix
+
+
+def get_full_name(node: cst.Name | cst.Attribute) -> str:
+    if isinstance(node, cst.Attribute):
+        return get_full_name(node.value) + "." + node.attr.value
 
-        if prefix == self.prefix:
-            return False
+    return node.value
 
-        return True    
 
 def get_call_name(node: cst.Call) -> str:
     func_obj = node.func
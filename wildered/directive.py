@@ -1,6 +1,7 @@
 import ast
 import inspect
 from abc import ABC
+from functools import lru_cache
 from typing import (
     ClassVar,
     List,
@@ -25,6 +26,7 @@ class Identifier(BaseModel):
 
     class Config:
         arbitrary_types_allowed = True
+        copy_on_model_validation = "none"
 
 
 class BaseDirectiveConfig(object):
@@ -71,6 +73,7 @@ def get_config_settings(obj: BaseDirectiveConfig):
     return defined_settings
 
 
+@lru_cache(maxsize=None)
 def get_config_object(cls):
     return [
         cls_attribute
@@ -2,13 +2,16 @@ from typing import Annotated, Callable, Sequence
 
 from pydantic import BaseModel
 
-from wildered.models import BaseEntity
+from wildered.models import BaseEntity, construct_model
 
 
 class EntityGroup(BaseModel):
     group_name: str
     entity_list: Sequence[BaseEntity]
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class EntityGrouper(BaseModel):
     group_func: Callable[[BaseEntity], Annotated[str, "Group name of the entity"]]
@@ -24,6 +27,6 @@ class EntityGrouper(BaseModel):
             group_map[group_name].append(entity)
 
         return [
-            EntityGroup(group_name=name, entity_list=entity_list)
+            construct_model(EntityGroup, group_name=name, entity_list=entity_list)
             for name, entity_list in group_map.items()
         ]
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from wildered.ast.symbols import FUNCTION_TYPES, Symbol, SymbolTable
+from wildered.logger import logger
+from wildered.utils import iter_python_files, read_file
+
+DEFAULT_INDEX_FILE = Path(".wildered/index.sqlite")
+INDEX_FORMAT = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    path TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    lineno INTEGER NOT NULL,
+    end_lineno INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (path, qualname)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols (qualname);
+"""
+
+
+class SymbolRecord(NamedTuple):
+    path: str
+    qualname: str
+    name: str
+    kind: str
+    lineno: int
+    end_lineno: int
+    signature: str
+    digest: str
+
+
+class IndexStats(NamedTuple):
+    indexed: int  # Files (re)parsed
+    unchanged: int
+    removed: int
+    failed: int
+
+
+def hash_text(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(i) for i in node.bases + node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+
+    return signature
+
+
+def extract_symbols(path: str, content: str) -> List[SymbolRecord]:
+    """Return a record for every top-level and nested definition in `content`."""
+    tree = ast.parse(content)
+    lines = content.splitlines(keepends=True)
+
+    def to_record(symbol: Symbol) -> SymbolRecord:
+        text = "".join(lines[symbol.lineno - 1 : symbol.end_lineno])
+        return SymbolRecord(
+            path=path,
+            qualname=symbol.qualname,
+            name=symbol.name,
+            kind="function" if isinstance(symbol.node, FUNCTION_TYPES) else "class",
+            lineno=symbol.lineno,
+            end_lineno=symbol.end_lineno,
+            signature=get_signature(symbol.node),
+            digest=hash_text(text),
+        )
+
+    return [to_record(symbol) for symbol in SymbolTable(tree)]
+
+
+class SymbolIndex:
+    """
+    A persistent SQLite index of the definitions in a project, used to resolve hints
+    without parsing the files they point to.
+    """
+
+    def __init__(self, database: Path | str = DEFAULT_INDEX_FILE) -> None:
+        self.database = Path(database)
+        self.database.parent.mkdir(exist_ok=True, parents=True)
+        self.connection = sqlite3.connect(self.database)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._check_format()
+
+    @classmethod
+    def open_default(cls) -> Optional[SymbolIndex]:
+        """Open the index in the .wildered directory if one has been built."""
+        if DEFAULT_INDEX_FILE.exists():
+            return cls(DEFAULT_INDEX_FILE)
+
+        return None
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> SymbolIndex:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def build(self, root: Path | str, rebuild: bool = False) -> IndexStats:
+        """
+        Index every Python file under `root`. Files whose size, mtime or content
+        hash did not change since the last build are skipped, unless `rebuild`.
+        """
+        root = Path(root).resolve()
+        with self.connection:
+            if rebuild:
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("DELETE FROM symbols")
+
+            known = self._get_known_files(root)
+            indexed = unchanged = failed = 0
+            for filename in iter_python_files(root):
+                path = str(filename.resolve())
+                status = self._index_file(path, known.pop(path, None))
+                if status is None:
+                    failed += 1
+
+                elif status:
+                    indexed += 1
+
+                else:
+                    unchanged += 1
+
+            # Whatever is left no longer exists
+            for path in known:
+                self._remove_file(path)
+
+        return IndexStats(
+            indexed=indexed, unchanged=unchanged, removed=len(known), failed=failed
+        )
+
+    def update_file(self, filename: Path | str) -> List[str]:
+        """
+        Re-index a single file and return the qualified names of the definitions
+        that were added, removed or whose content changed.
+        """
+        path = str(Path(filename).resolve())
+        old_digests = {i.qualname: i.digest for i in self.get_symbols(path)}
+        with self.connection:
+            if not os.path.exists(path):
+                self._remove_file(path)
+
+            else:
+                self._index_file(path, self._get_file_row(path))
+
+        new_digests = {i.qualname: i.digest for i in self.get_symbols(path)}
+        return [
+            qualname
+            for qualname in sorted(old_digests.keys() | new_digests.keys())
+            if old_digests.get(qualname, None) != new_digests.get(qualname, None)
+        ]
+
+    def is_fresh(self, filename: Path | str) -> bool:
+        """Whether `filename` is indexed and unchanged since, judging by its stat."""
+        row = self._get_file_row(str(Path(filename).resolve()))
+        if row is None:
+            return False
+
+        try:
+            stat = os.stat(filename)
+
+        except OSError:
+            return False
+
+        return (stat.st_size, stat.st_mtime_ns) == row[:2]
+
+    def lookup(self, name: str) -> List[SymbolRecord]:
+        """Return every definition named `name` (unqualified), top-level ones first."""
+        cursor = self.connection.execute(
+            "SELECT * FROM symbols WHERE name = ? "
+            "ORDER BY length(qualname) - length(name), path, lineno",
+            (name,),
+        )
+        return [SymbolRecord(*row) for row in cursor]
+
+    def find(self, filename: Path | str, qualname: str) -> Optional[SymbolRecord]:
+        row = self.connection.execute(
+            "SELECT * FROM symbols WHERE path = ? AND qualname = ?",
+            (str(Path(filename).resolve()), qualname),
+        ).fetchone()
+        return SymbolRecord(*row) if row else None
+
+    def get_symbols(self, filename: Path | str) -> List[SymbolRecord]:
+        cursor = self.connection.execute(
+            "SELECT * FROM symbols WHERE path = ? ORDER BY lineno",
+            (str(Path(filename).resolve()),),
+        )
+        return [SymbolRecord(*row) for row in cursor]
+
+    def resolve(
+        self, name: str, near: Optional[Path | str] = None
+    ) -> Optional[SymbolRecord]:
+        """
+        Resolve an unqualified top-level `name`, preferring definitions in `near`
+        and then the ones sharing the longest path prefix with it.
+        """
+        cursor = self.connection.execute(
+            "SELECT * FROM symbols WHERE qualname = ? ORDER BY path, lineno", (name,)
+        )
+        candidates = [SymbolRecord(*row) for row in cursor]
+        if not candidates:
+            return None
+
+        if near is None:
+            return candidates[0]
+
+        near_parts = Path(near).resolve().parts
+
+        def closeness(record: SymbolRecord) -> int:
+            common = 0
+            for i, j in zip(Path(record.path).parts, near_parts):
+                if i != j:
+                    break
+                common += 1
+
+            return common
+
+        return max(candidates, key=closeness)
+
+    def _check_format(self) -> None:
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'format'"
+        ).fetchone()
+        if row is None or row[0] != INDEX_FORMAT:
+            with self.connection:
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("DELETE FROM symbols")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('format', ?)", (INDEX_FORMAT,)
+                )
+
+    def _get_known_files(self, root: Path) -> Dict[str, Tuple[int, int, str]]:
+        prefix = os.path.join(str(root), "") if root.is_dir() else str(root)
+        cursor = self.connection.execute(
+            "SELECT path, size, mtime_ns, digest FROM files "
+            "WHERE substr(path, 1, length(?1)) = ?1",
+            (prefix,),
+        )
+        return {row[0]: row[1:] for row in cursor}
+
+    def _get_file_row(self, path: str) -> Optional[Tuple[int, int, str]]:
+        return self.connection.execute(
+            "SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)
+        ).fetchone()
+
+    def _index_file(
+        self, path: str, row: Optional[Tuple[int, int, str]]
+    ) -> Optional[bool]:
+        """Return whether the file was re-indexed, or None when it cannot be parsed."""
+        try:
+            stat = os.stat(path)
+
+        except OSError as e:
+            logger.debug(f"Unable to index {path}: {e}")
+            self._remove_file(path)
+            return None
+
+        if row is not None and (stat.st_size, stat.st_mtime_ns) == tuple(row[:2]):
+            return False
+
+        try:
+            content = read_file(path)
+
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug(f"Unable to index {path}: {e}")
+            self._remove_file(path)
+            return None
+
+        digest = hash_text(content)
+        if row is None or row[2] != digest:
+            try:
+                records = extract_symbols(path, content)
+
+            except (SyntaxError, ValueError) as e:
+                logger.debug(f"Unable to index {path}: {e}")
+                self._remove_file(path)
+                return None
+
+            self.connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+            self._insert_symbols(records)
+            reindexed = True
+
+        else:
+            reindexed = False
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest),
+        )
+        return reindexed
+
+    def _insert_symbols(self, records: Iterable[SymbolRecord]) -> None:
+        # Redefinitions keep the first definition, like SymbolTable
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records
+        )
+
+    def _remove_file(self, path: str) -> None:
+        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        self.connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+
+
+_symbol_index: Optional[SymbolIndex] = None
+
+
+def use_symbol_index(index: Optional[SymbolIndex]) -> None:
+    """Set the process-wide index used for hint resolution, or None to stop using one."""
+    global _symbol_index
+    _symbol_index = index
+
+
+def get_symbol_index() -> Optional[SymbolIndex]:
+    return _symbol_index
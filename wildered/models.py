@@ -1,16 +1,36 @@
 from __future__ import annotations
 
 from abc import ABC, abstractclassmethod
-from typing import Any, Dict, List, Optional, Sequence, Type
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Type, TypeVar
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, PrivateAttr, validator
 
 from wildered.directive import Directive, DirectiveConfig, DirectiveContext
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_fields_sets: Dict[Type[BaseModel], Set[str]] = {}
+
+
+def construct_model(model_cls: Type[ModelT], **values: Any) -> ModelT:
+    """
+    Create a model from values that are already known to be valid, skipping
+    validation. All instances of a class share one `__fields_set__` listing every
+    field. Assignments only ever add a field name to it, so the shared set never
+    changes, and no instance needs a set of its own.
+    """
+    fields_set = _fields_sets.get(model_cls, None)
+    if fields_set is None:
+        fields_set = _fields_sets[model_cls] = set(model_cls.__fields__)
+
+    return model_cls.construct(_fields_set=fields_set, **values)
+
 
 class BaseSourceCode(BaseModel, ABC):
     class Config:
         arbitrary_types_allowed = True
+        # Source code objects are shared, never copy them into other models
+        copy_on_model_validation = "none"
 
     @abstractclassmethod
     def save(self, filename: str):
@@ -29,9 +49,12 @@ class BaseEntity(BaseModel, ABC):
     directives: Dict[str, List[Directive]]
     parser: BaseDirectiveParser
     _context: DirectiveContext
+    _ancestor: Optional[List[BaseEntity]] = PrivateAttr(default=None)
 
     class Config:
         arbitrary_types_allowed = True
+        # Keep `wrapping_node` pointing at the entity itself rather than a copy
+        copy_on_model_validation = "none"
 
     def save(self, *args, **kwargs) -> None:
         self.source.save(*args, **kwargs)
@@ -48,22 +71,47 @@ class BaseEntity(BaseModel, ABC):
 
     @property
     def ancestor(self) -> List[BaseEntity]:
-        ancestor_list = []
-        cur_node = self
-        while cur_node.wrapping_node is not None:
-            ancestor_list.append(cur_node.wrapping_node)
-            cur_node = cur_node.wrapping_node
+        """Enclosing entities from the innermost outwards, computed once per entity."""
+        if self._ancestor is None:
+            if self.wrapping_node is None:
+                self._ancestor = []
 
-        return ancestor_list
+            else:
+                self._ancestor = [self.wrapping_node] + self.wrapping_node.ancestor
+
+        return self._ancestor
+
+    @property
+    def qualname(self) -> str:
+        """Qualified name of the entity, such as `Class.method`"""
+        return ".".join([i.name for i in reversed(self.ancestor)] + [self.name])
 
 
 class BaseDirectiveParser(BaseModel, ABC):
     prefix_name: str
     directives: List[Type[Directive]]
+    _directive_table: Optional[Dict[str, Tuple[Type[Directive], str]]] = PrivateAttr(
+        default=None
+    )
 
     class Config:
         arbitrary_types_allowed = True
 
+    @property
+    def directive_table(self) -> Dict[str, Tuple[Type[Directive], str]]:
+        """Maps every alias to its directive class and name, built once per parser."""
+        if self._directive_table is None:
+            table = {}
+            for directive_cls in self.directives:
+                config = directive_cls.config
+                for alias in config.alias:
+                    # Earlier directives take precedence on conflicting aliases
+                    table.setdefault(alias, (directive_cls, config.name))
+
+            self._directive_table = table
+
+        return self._directive_table
+
     @validator("directives")
     def check_uniqueness(cls, v: List[Type[Directive]]) -> List[Type[Directive]]:
         existing_name = []
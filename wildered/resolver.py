@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import os
+from importlib.machinery import PathFinder
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from wildered.utils import apply_relative_path
+
+
+def get_default_roots() -> List[Path]:
+    """The working directory, along with its `src` directory in a src layout."""
+    roots = [Path.cwd()]
+    if (roots[0] / "src").is_dir():
+        roots.append(roots[0] / "src")
+
+    return roots
+
+
+class ImportResolver:
+    """
+    Resolves imported modules to the files of the project, using the finders of
+    `importlib` without executing any module. Absolute imports are looked up next
+    to the importing file first, as they would be for a script, then in `roots`.
+    Lookups and resolved paths are memoised for the lifetime of the resolver,
+    typically a single scan, or until `invalidate` is called.
+    """
+
+    def __init__(self, roots: Optional[Sequence[Path | str]] = None) -> None:
+        roots = roots if roots else get_default_roots()
+        self.roots = [Path(i).resolve() for i in roots]
+        self._modules: Dict[Tuple[Tuple[str, ...], str], Optional[Path]] = {}
+        self._paths: Dict[Path, Path] = {}
+
+    def invalidate(self) -> None:
+        """Forget every lookup, e.g. after files were added to or removed."""
+        self._modules.clear()
+        self._paths.clear()
+        # The finders cache directory listings, which may predate files created since
+        PathFinder.invalidate_caches()
+
+    def resolve_path(self, path: Path | str) -> Path:
+        path = Path(path)
+        if path not in self._paths:
+            self._paths[path] = path.resolve()
+
+        return self._paths[path]
+
+    def resolve(
+        self, module: Optional[str], level: int = 0, base: Optional[Path | str] = None
+    ) -> Optional[Path]:
+        """
+        Return the file of `module` imported from the file `base`, with `level`
+        leading dots, or None when it is not a file of the project. Packages resolve
+        to their `__init__.py`, namespace packages to None.
+        """
+        if level > 0:
+            if base is None:
+                return None
+
+            package = self.resolve_path(base).parent
+            for _ in range(level - 1):
+                package = package.parent
+
+            if not module:
+                return self._find_init(package)
+
+            locations = [package]
+
+        else:
+            if not module:
+                return None
+
+            locations = [self.resolve_path(base).parent] if base else []
+            locations.extend(i for i in self.roots if i not in locations)
+
+        return self._find(tuple(str(i) for i in locations), module)
+
+    def resolve_hint_path(self, hint_path: str, base: Path | str) -> Optional[Path]:
+        """
+        Resolve the file part of a string hint, a path relative to the directory of
+        `base` or else a dotted module name.
+        """
+        if hint_path.endswith(".py") or ("/" in hint_path) or (os.sep in hint_path):
+            return apply_relative_path(
+                relative_path=Path(hint_path),
+                absolute_base_path=self.resolve_path(base).parent,
+            )
+
+        return self.resolve(hint_path, level=0, base=base)
+
+    def _find(self, locations: Tuple[str, ...], module: str) -> Optional[Path]:
+        key = (locations, module)
+        if key in self._modules:
+            return self._modules[key]
+
+        path: Optional[List[str]] = list(locations)
+        origin = None
+        for part in module.split("."):
+            spec = PathFinder.find_spec(part, path) if path else None
+            if spec is None:
+                origin = None
+                break
+
+            # Namespace packages have no origin, nor anything to extract
+            origin = spec.origin if spec.has_location else None
+            path = list(spec.submodule_search_locations or [])
+
+        result = self.resolve_path(origin) if origin and origin.endswith(".py") else None
+        self._modules[key] = result
+        return result
+
+    def _find_init(self, package: Path) -> Optional[Path]:
+        key = ((str(package),), "")
+        if key not in self._modules:
+            init = package / "__init__.py"
+            self._modules[key] = init if init.is_file() else None
+
+        return self._modules[key]
+
+
+_import_resolver: Optional[ImportResolver] = None
+_default_resolver: Optional[ImportResolver] = None
+
+
+def use_import_resolver(resolver: Optional[ImportResolver]) -> None:
+    """Set the resolver shared for the duration of a scan, or None to stop sharing one."""
+    global _import_resolver
+    _import_resolver = resolver
+
+
+def get_import_resolver() -> ImportResolver:
+    """
+    The shared resolver, or else a default one for the working directory, kept
+    across calls until the working directory changes.
+    """
+    global _default_resolver
+    if _import_resolver:
+        return _import_resolver
+
+    roots = [i.resolve() for i in get_default_roots()]
+    if (_default_resolver is None) or (_default_resolver.roots != roots):
+        _default_resolver = ImportResolver(roots)
+
+    return _default_resolver
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import ast
+import json
+import sys
+from functools import lru_cache
+from importlib.machinery import PathFinder
+from importlib.metadata import PackageNotFoundError, packages_distributions, version
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from wildered.ast.symbols import SymbolTable
+from wildered.ast.utils import RenderFilter, build_skeleton
+from wildered.cache import get_default_cache_dir
+from wildered.logger import logger
+from wildered.utils import read_file, write_file
+
+# How many `from x import name` re-exports to follow to the definition of a name
+MAX_REEXPORTS = 4
+
+
+def find_library_source(module: str) -> Optional[Path]:
+    """
+    Find the stub or source of an installed `module` through the finders of
+    `importlib`, without importing it or its parent packages. A `.pyi` stub next
+    to the module, or in a `-stubs` package, is preferred over its source.
+    """
+    parts = module.split(".")
+    spec = PathFinder.find_spec(parts[0])
+    for part in parts[1:]:
+        if (spec is None) or (spec.submodule_search_locations is None):
+            # Only packages have submodules
+            spec = None
+            break
+
+        spec = PathFinder.find_spec(part, spec.submodule_search_locations)
+
+    if (spec is not None) and spec.has_location and spec.origin:
+        origin = Path(spec.origin)
+        # Compiled modules may ship their source next to them, e.g. `name.cpython-311.so`
+        stem = origin.name.split(".")[0]
+        for candidate in [origin.with_name(f"{stem}.pyi"), origin.with_name(f"{stem}.py")]:
+            if candidate.is_file():
+                return candidate
+
+    top, _, rest = module.partition(".")
+    for entry in sys.path:
+        stub_package = Path(entry if entry else ".") / f"{top}-stubs"
+        if not stub_package.is_dir():
+            continue
+
+        stub = stub_package.joinpath(*rest.split(".")) if rest else stub_package
+        for candidate in [stub.with_suffix(".pyi"), stub / "__init__.pyi"]:
+            if candidate.is_file():
+                return candidate
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_package_version(package: str) -> str:
+    """Version of the distribution providing the top-level `package`, or of Python."""
+    for distribution in packages_distributions().get(package, []):
+        try:
+            return f"{distribution}-{version(distribution)}"
+
+        except PackageNotFoundError:
+            continue
+
+    # The standard library, or a package installed without metadata
+    return f"python-{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def resolve_relative_module(module: Optional[str], level: int, package: str) -> str:
+    """Absolute name of `from <level dots><module> import` found in `package`."""
+    if level == 0:
+        return module if module else ""
+
+    parts = package.split(".")
+    parts = parts[: len(parts) - (level - 1)]
+    return ".".join(parts + ([module] if module else []))
+
+
+def extract_stub(module: str, entity_name: str) -> Optional[str]:
+    """
+    Return the signatures and docstrings of `entity_name` in the installed `module`,
+    following re-exports such as `from .main import *` to its definition, or of the
+    whole module when `entity_name` is empty. Returns None when the entity cannot
+    be found.
+    """
+    seen = set()
+    pending = [(module, 0)]
+    while pending:
+        cur_module, depth = pending.pop(0)
+        if (cur_module in seen) or (depth > MAX_REEXPORTS):
+            continue
+
+        seen.add(cur_module)
+        filename = find_library_source(cur_module)
+        if filename is None:
+            continue
+
+        try:
+            tree = ast.parse(read_file(filename))
+
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+            logger.debug(f"Unable to read {filename}: {e}")
+            continue
+
+        if not entity_name:
+            return f"# From {cur_module}\n{ast.unparse(build_skeleton(tree))}"
+
+        symbol = SymbolTable(tree).symbols.get(entity_name, None)
+        if symbol is not None:
+            code = ast.unparse(RenderFilter(drop_implementation=True).apply(symbol.node))
+            return f"# From {cur_module}\n{code}"
+
+        # The package of a module is the module itself for `__init__` files
+        package = cur_module if filename.stem == "__init__" else cur_module.rpartition(".")[0]
+        for node in tree.body:
+            if not isinstance(node, ast.ImportFrom):
+                continue
+
+            names = [i.name for i in node.names]
+            if (entity_name in names) or ("*" in names):
+                target = resolve_relative_module(node.module, node.level, package)
+                if target:
+                    pending.append((target, depth + 1))
+
+    return None
+
+
+class StubCache:
+    """
+    An on-disk cache of the stubs extracted from installed packages, one file per
+    package and version, so that a stub is extracted once per version installed.
+    """
+
+    def __init__(self, directory: Optional[Path | str] = None) -> None:
+        self.directory = (
+            Path(directory) if directory else get_default_cache_dir("stubs")
+        )
+        self._packages: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def get(self, module: str, entity_name: str) -> Optional[str]:
+        package = module.partition(".")[0]
+        stubs, filename = self._load(package)
+        key = f"{module}:{entity_name}"
+        if key not in stubs:
+            stubs[key] = extract_stub(module, entity_name)
+            self.directory.mkdir(exist_ok=True, parents=True)
+            write_file(filename, json.dumps(stubs))
+
+        return stubs[key]
+
+    def _load(self, package: str) -> Tuple[Dict[str, Optional[str]], Path]:
+        filename = self.directory / f"{package}-{get_package_version(package)}.json"
+        if package not in self._packages:
+            try:
+                self._packages[package] = json.loads(read_file(filename))
+
+            except (OSError, ValueError):
+                self._packages[package] = {}
+
+        return self._packages[package], filename
+
+
+_stub_cache: Optional[StubCache] = None
+
+
+def enable_stub_cache(directory: Optional[Path | str] = None) -> StubCache:
+    global _stub_cache
+    _stub_cache = StubCache(directory=directory)
+    return _stub_cache
+
+
+def disable_stub_cache() -> None:
+    global _stub_cache
+    _stub_cache = None
+
+
+def get_library_stub(module: str, entity_name: str) -> Optional[str]:
+    """The stub of `entity_name` in `module`, from the stub cache when it is enabled."""
+    if _stub_cache is not None:
+        return _stub_cache.get(module, entity_name)
+
+    return extract_stub(module, entity_name)
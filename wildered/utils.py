@@ -1,17 +1,16 @@
-from pathlib import Path
-
+from __future__ import annotations
 
-def resolve_module_filepath(
-    module_name: str, relative_level: int, absolute_base_path: Path
-) -> str:
-    relative_path = ""
-    for i in range(relative_level):
-        relative_path += "../"
+import codecs
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
 
-    relative_path += module_name
-    return apply_relative_path(
-        relative_path=Path(relative_path), absolute_base_path=absolute_base_path
-    ).with_suffix(".py")
+# PEP 263, on the first or second line
+CODING_COOKIE = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)")
+ENCODING_SAMPLE_SIZE = 64 * 1024
 
 
 def apply_relative_path(relative_path: Path, absolute_base_path: Path) -> Path:
@@ -32,14 +31,289 @@ def apply_relative_path(relative_path: Path, absolute_base_path: Path) -> Path:
     return result_path.resolve()
 
 
+class SourceFile(NamedTuple):
+    """A file read once, shared by the prefilter, the parsers and the source slices."""
+
+    data: bytes
+    text: str  # With universal newlines, like files opened in text mode
+    encoding: str
+
+    @property
+    def utf8(self) -> bytes:
+        """The utf-8 encoding of `text`, which is `data` itself in the common case."""
+        if (self.encoding == "utf-8") and (b"\r" not in self.data):
+            return self.data
+
+        return self.text.encode("utf-8")
+
+
+def read_source(filepath: str) -> SourceFile:
+    # Files written during a batch are read back as they will be once committed
+    batch = get_write_batch()
+    if (batch is not None) and (filepath in batch):
+        text, encoding = batch.read(filepath)
+        return SourceFile(data=text.encode(encoding), text=text, encoding=encoding)
+
+    with open(filepath, "rb") as f:
+        data = f.read()
+
+    text, encoding = decode_source(data)
+    return SourceFile(data=data, text=text, encoding=encoding)
+
+
 def read_file(filepath: str) -> str:
-    with open(filepath, "r") as f:
-        text = f.read()
-        return text
+    return read_source(filepath).text
+
+
+def decode_source(data: bytes) -> Tuple[str, str]:
+    """
+    Decode the content of a Python file, returning the text and its encoding. The
+    encoding is taken from a utf-8 BOM or a PEP 263 coding cookie. Otherwise strict
+    utf-8 is tried, and only when it fails is the encoding detected from a sample.
+    """
+    encoding = get_declared_encoding(data)
+    if encoding is None:
+        try:
+            text, encoding = data.decode("utf-8"), "utf-8"
+
+        except UnicodeDecodeError:
+            text, encoding = decode_detected(data)
+
+    else:
+        text = data.decode(encoding)
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    return text, encoding
+
+
+def get_declared_encoding(data: bytes) -> Optional[str]:
+    if data.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    for line in data.split(b"\n", 2)[:2]:
+        match = CODING_COOKIE.match(line)
+        if match is not None:
+            try:
+                return codecs.lookup(match.group(1).decode("ascii")).name
+
+            except LookupError:
+                # Python refuses such files, leave the error to the parser
+                return None
+
+        # The second line is only considered after a comment or blank line
+        if line.strip() and not line.lstrip().startswith(b"#"):
+            break
+
+    return None
+
+
+def decode_detected(data: bytes) -> Tuple[str, str]:
+    # Only needed for the rare files that are not utf-8, hence the late import
+    import chardet
+
+    encoding = chardet.detect(data[:ENCODING_SAMPLE_SIZE])["encoding"]
+    if encoding is not None:
+        try:
+            return data.decode(encoding), encoding
+
+        except UnicodeDecodeError:
+            pass
+
+    # The sample was not representative of the whole file
+    encoding = chardet.detect(data)["encoding"]
+    if encoding is None:
+        raise UnicodeDecodeError("utf-8", data, 0, len(data), "Unable to detect the encoding")
+
+    return data.decode(encoding), encoding
+
+
+def write_file(filepath: str, content: str, encoding: str = "utf-8") -> None:
+    """
+    Write `content` to a temporary file next to `filepath` and rename it over
+    `filepath`, so that an interrupted write never leaves a half-written file.
+    """
+    WriteBatch().write(filepath, content, encoding=encoding).commit()
+
+
+def write_source(filepath: str, content: str, encoding: str = "utf-8") -> None:
+    """Write a source file, into the active write batch if there is one."""
+    batch = get_write_batch()
+    if batch is not None:
+        batch.write(filepath, content, encoding=encoding)
+
+    else:
+        write_file(filepath, content, encoding=encoding)
+
+
+class WriteBatch:
+    """
+    Buffers the content of the files written during a run. On commit every file is
+    written to a temporary file in its directory, the temporary files are synced to
+    disk together and then renamed over their targets. With `all_or_nothing`, the
+    targets renamed already are restored when a later one fails.
+    """
+
+    def __init__(self, all_or_nothing: bool = False) -> None:
+        self.all_or_nothing = all_or_nothing
+        self.files: Dict[Path, Tuple[str, str]] = {}  # Content and encoding
 
+    def __contains__(self, filepath: str) -> bool:
+        return Path(filepath).resolve() in self.files
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def read(self, filepath: str) -> Tuple[str, str]:
+        return self.files[Path(filepath).resolve()]
+
+    def write(self, filepath: str, content: str, encoding: str = "utf-8") -> WriteBatch:
+        self.files[Path(filepath).resolve()] = (content, encoding)
+        return self
+
+    def discard(self) -> None:
+        self.files.clear()
+
+    def commit(self) -> None:
+        temp_files = {}
+        try:
+            for filepath, (content, encoding) in self.files.items():
+                temp_files[filepath] = self._write_temp(filepath, content, encoding)
+
+            # Synced together, so that the disk is flushed once rather than per file
+            for temp_file in temp_files.values():
+                fd = os.open(temp_file, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+
+                finally:
+                    os.close(fd)
+
+            self._rename(temp_files)
+
+        finally:
+            for temp_file in temp_files.values():
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+        self._sync_directories(temp_files.keys())
+        self.files.clear()
+
+    def _write_temp(self, filepath: Path, content: str, encoding: str) -> Path:
+        filepath.parent.mkdir(exist_ok=True, parents=True)
+        temp_file = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+        with open(temp_file, "w", encoding=encoding) as f:
+            f.write(content)
+
+        if filepath.exists():
+            os.chmod(temp_file, filepath.stat().st_mode)
+
+        return temp_file
+
+    def _rename(self, temp_files: Dict[Path, Path]) -> None:
+        if not self.all_or_nothing:
+            for filepath, temp_file in temp_files.items():
+                os.replace(temp_file, filepath)
+
+            return
+
+        backups: Dict[Path, Optional[Path]] = {}
+        try:
+            for filepath, temp_file in temp_files.items():
+                backups[filepath] = None
+                if filepath.exists():
+                    # Linked rather than moved, so that the target never goes missing
+                    backup = filepath.with_name(f".{filepath.name}.{os.getpid()}.bak")
+                    try:
+                        os.link(filepath, backup)
+
+                    except OSError:
+                        shutil.copy2(filepath, backup)
+
+                    backups[filepath] = backup
+
+                os.replace(temp_file, filepath)
+
+        except OSError:
+            for filepath, backup in backups.items():
+                if backup is not None:
+                    os.replace(backup, filepath)
+
+                elif filepath.exists():
+                    os.remove(filepath)
+
+            raise
+
+        for backup in backups.values():
+            if backup is not None:
+                os.remove(backup)
+
+    def _sync_directories(self, filepaths: Iterable[Path]) -> None:
+        # Persist the renames, once per directory
+        for directory in {i.parent for i in filepaths}:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+
+            except OSError:
+                # Directories cannot be opened on some platforms, e.g. Windows
+                continue
+
+            try:
+                os.fsync(fd)
+
+            finally:
+                os.close(fd)
+
+
+_write_batch: Optional[WriteBatch] = None
+
+
+def get_write_batch() -> Optional[WriteBatch]:
+    return _write_batch
+
+
+@contextmanager
+def batch_writes(all_or_nothing: bool = False) -> Iterator[WriteBatch]:
+    """
+    Buffer the source files written by `write_source` in the block and commit them
+    together at its end. When the block raises, the buffered files are still
+    written, unless `all_or_nothing`.
+    """
+    global _write_batch
+    previous = _write_batch
+    batch = _write_batch = WriteBatch(all_or_nothing=all_or_nothing)
+    try:
+        yield batch
+
+    except BaseException:
+        if all_or_nothing:
+            batch.discard()
+
+        raise
+
+    finally:
+        _write_batch = previous
+        batch.commit()
+
+
+IGNORED_DIRECTORIES = {"__pycache__", "node_modules", "site-packages"}
+
+
+def iter_python_files(root: Path | str) -> Iterator[Path]:
+    """
+    Yield every Python file under `root`, skipping hidden directories (such as .git,
+    .venv and .wildered) and caches. `root` itself may also be a single file.
+    """
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
 
-def write_file(filepath: str, content: str) -> None:
-    filepath = Path(filepath)
-    filepath.parent.mkdir(exist_ok=True, parents=True)
-    with open(filepath, "w") as f:
-        f.write(content)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            i for i in dirnames if not i.startswith(".") and i not in IGNORED_DIRECTORIES
+        )
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                yield Path(dirpath) / filename